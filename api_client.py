@@ -0,0 +1,206 @@
+"""Posts records to the logging API, counting the outcome of each post and pausing sends while the API is down, see
+circuit_breaker.py"""
+
+import os
+import time
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_level import LoggingLevel
+    from logging_transport import HttpTransport
+    from flight_recorder import FlightRecorder
+    from logger_stats import API_FAILURES, API_SENT, LoggerStats
+    from circuit_breaker import CircuitBreaker, CircuitState
+    from logger_config import LoggerConfig
+else:
+    from .logging_level import LoggingLevel  # type: ignore[no-redef]
+    from .logging_transport import HttpTransport  # type: ignore[no-redef]
+    from .flight_recorder import FlightRecorder  # type: ignore[no-redef]
+    from .logger_stats import API_FAILURES, API_SENT, LoggerStats  # type: ignore[no-redef]
+    from .circuit_breaker import CircuitBreaker, CircuitState  # type: ignore[no-redef]
+    from .logger_config import LoggerConfig  # type: ignore[no-redef]
+
+# Imported when first used, as it pulls in asyncio, which only some configurations need
+if TYPE_CHECKING:
+    if os.getenv("STANDALONE", None) is not None:
+        from async_transport import AsyncHttpTransport
+    else:
+        from .async_transport import AsyncHttpTransport  # type: ignore[no-redef]
+
+
+class ApiClient:
+    """Posts to url for device_id, as config.http sets. Outcomes are counted in stats, if collected. report is called
+    with messages about the API, to log locally"""
+
+    def __init__(
+        self,
+        url: str,
+        device_id: str,
+        config: LoggerConfig,
+        stats: Optional[LoggerStats],
+        report: Callable[[str, LoggingLevel], None],
+    ) -> None:
+        self.url = url
+        self.device_id = device_id
+        self.http = config.http
+        self.stats = stats
+        self.report = report
+
+        # When set, recent log calls at every level, even those not written anywhere, are kept to send with errors
+        self.flight_recorder: Optional[FlightRecorder] = None
+        if config.flight_recorder.size > 0:
+            self.flight_recorder = FlightRecorder(config.flight_recorder.size, config.flight_recorder.level)
+
+        # When set, sends are skipped while the API is down. Records that would have been sent meanwhile go to the spool,
+        # if enabled, and are otherwise only in the local log, and counted as lost
+        self.circuit_breaker: Optional[CircuitBreaker] = None
+        if config.circuit.failure_threshold > 0:
+            self.circuit_breaker = CircuitBreaker(config.circuit, on_change=self._report_circuit)
+
+        # In milliseconds. Sends finish in any order on several threads, so it is only moved forward, under the lock
+        self.last_log_message_sent_ts = 0
+        # Made on first use, as it imports requests
+        self._transport: Optional[HttpTransport] = None
+        self._async_transport: Optional["AsyncHttpTransport"] = None
+        # Taken to make a transport, and to move last_log_message_sent_ts on
+        self.lock = threading.Lock()
+
+    @property
+    def transport(self) -> HttpTransport:
+        """The transport for API posts, made on first use"""
+
+        if self._transport is None:
+            with self.lock:
+                if self._transport is None:
+                    http = self.http
+                    self._transport = HttpTransport(
+                        pool_size=http.pool_size, max_retries=http.max_retries, compress_threshold=http.compress_threshold, timeout=http.timeout
+                    )
+        return self._transport
+
+    @property
+    def bytes_sent(self) -> int:
+        return 0 if self._transport is None else self._transport.bytes_sent
+
+    def available(self) -> bool:
+        """Returns False while the circuit breaker is holding sends back"""
+
+        return self.circuit_breaker is None or self.circuit_breaker.allow()
+
+    def build_record(self, message: str, log_level: LoggingLevel, attach_recent: bool = False) -> Dict[str, Any]:
+        """Returns the record the API takes for one log call, with the flight recorder's snapshot as "recent_records" if
+        attach_recent and the recorder is enabled"""
+
+        data = {
+            "device_id": self.device_id,
+            "log_timestamp": round(time.time() * 1000),
+            "log_message": message,
+            "log_level": log_level.name,
+        }
+        if attach_recent and self.flight_recorder is not None:
+            data["recent_records"] = self.flight_recorder.snapshot()
+
+        return data
+
+    def post(self, payload: Any) -> Any:
+        """Posts a record or batch of records to the API, counting the outcome and timing it"""
+
+        start = time.monotonic()
+        try:
+            result = self.transport.post(self.url, payload)
+        except OSError:
+            self._count_post(payload, None, start)
+            raise
+        self._count_post(payload, result.status_code, start)
+
+        return result
+
+    def send_batch(self, batch: List[Dict[str, Any]]) -> bool:
+        """Sends a batch of log records to the API as a JSON array of the same objects a single send posts. Called from
+        the log shipper's worker thread. Returns False without sending while the circuit breaker is open"""
+
+        if not self.available():
+            return False
+
+        result = self.post(batch)
+        self.mark_sent()
+
+        if result.status_code != 200:
+            self.report(f"Failed to send log batch to API: {result.status_code} - {result.text}", LoggingLevel.ERROR)
+            return False
+
+        return True
+
+    async def send_batch_async(self, batch: List[Dict[str, Any]]) -> bool:
+        """Sends a batch of log records to the API as send_batch does, on the event loop. Called by the asyncio shipper"""
+
+        if not self.available():
+            return False
+
+        start = time.monotonic()
+        try:
+            result = await self.async_transport().post(self.url, batch)
+        except OSError:
+            self._count_post(batch, None, start)
+            raise
+        self._count_post(batch, result.status_code, start)
+        self.mark_sent()
+
+        if result.status_code != 200:
+            self.report(f"Failed to send log batch to API: {result.status_code} - {result.text}", LoggingLevel.ERROR)
+            return False
+
+        return True
+
+    def async_transport(self) -> "AsyncHttpTransport":
+        """Returns the transport for posts from an event loop, making it on first use. Its thread pool isn't tied to a
+        loop, so one serves every loop"""
+
+        if self._async_transport is None:
+            if os.getenv("STANDALONE", None) is not None:
+                from async_transport import AsyncHttpTransport  # pylint: disable=import-outside-toplevel
+            else:
+                from .async_transport import AsyncHttpTransport  # type: ignore[no-redef] # pylint: disable=import-outside-toplevel
+
+            self._async_transport = AsyncHttpTransport(self.transport, pool_size=self.http.pool_size)
+        return self._async_transport
+
+    def mark_sent(self) -> None:
+        now = round(time.time() * 1000)
+        with self.lock:
+            if now > self.last_log_message_sent_ts:
+                self.last_log_message_sent_ts = now
+
+    def close(self) -> None:
+        if self._async_transport is not None:
+            self._async_transport.close()
+        if self._transport is not None:
+            self._transport.close()
+
+    def _count_post(self, payload: Any, status_code: Optional[int], start: float) -> None:
+        """Counts the outcome of a post started at start, by time.monotonic(), and reports it to the circuit breaker.
+        status_code is None if it raised"""
+
+        breaker = self.circuit_breaker
+        if breaker is not None:
+            # Anything but a server error means the API is up
+            if status_code is None or status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+        if self.stats is None:
+            return
+
+        self.stats.api_latency.observe(time.monotonic() - start)
+        if status_code == 200:
+            self.stats.increment(API_SENT, len(payload) if isinstance(payload, list) else 1)
+        else:
+            self.stats.increment(API_FAILURES)
+
+    def _report_circuit(self, state: CircuitState, open_for: float) -> None:
+        if state == CircuitState.OPEN:
+            self.report(f"Logging API is failing, pausing sends for {open_for:.1f}s", LoggingLevel.WARNING)
+        elif state == CircuitState.CLOSED:
+            self.report("Logging API is back, resuming sends", LoggingLevel.NOTICE)
@@ -0,0 +1,163 @@
+"""asyncio counterpart of the log shipper. Records are queued without blocking and sent in batches by a task on the
+event loop, with a bounded number of batches in flight at once."""
+
+import os
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+if os.getenv("STANDALONE", None) is not None:
+    from logger_config import ShipperConfig
+    from log_shipper import BatchQueue
+else:
+    from .logger_config import ShipperConfig  # type: ignore[no-redef]
+    from .log_shipper import BatchQueue  # type: ignore[no-redef]
+
+
+class AsyncLogShipper:
+    """Bounded in-memory queue drained by a task on the event loop the shipper is started on. Batches are sent when
+    batch_size records are queued or batch_interval seconds have passed since the first record of the batch was queued,
+    whichever is first, with up to max_concurrency batches in flight. send_batch is awaited for each batch, and should
+    raise or return False on failure. Batches that fail are handed to on_failure. All methods must be called on the
+    shipper's event loop"""
+
+    def __init__(
+        self,
+        send_batch: Callable[[List[Dict[str, Any]]], Awaitable[bool]],
+        config: ShipperConfig = ShipperConfig(),
+        max_concurrency: int = 2,
+        on_error: Optional[Callable[[str], None]] = None,
+        on_failure: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    ) -> None:
+        self.send_batch = send_batch
+        self.on_error = on_error
+        self.on_failure = on_failure
+
+        self.queue = BatchQueue(config)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flush_waiters = 0
+        self._sends: Set["asyncio.Task[None]"] = set()
+        self._worker: Optional["asyncio.Task[None]"] = None
+        # These bind to the event loop they are first used on, the one the shipper is started on
+        self._wakeup = asyncio.Event()
+        self._changed = asyncio.Condition()
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    def start(self) -> None:
+        """Starts the worker task on the running event loop"""
+
+        if self._worker is not None:
+            return
+
+        self.loop = asyncio.get_running_loop()
+        self._worker = self.loop.create_task(self._run())
+
+    def enqueue(self, record: Dict[str, Any]) -> bool:
+        """Queues a record for sending. Never blocks. Returns False if the record was dropped"""
+
+        if not self.queue.add(record):
+            return False
+        # Wake the worker for the first record of a batch, and again once the batch is full
+        if self.queue.wakes_worker:
+            self._wakeup.set()
+
+        return True
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.queue.records)
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """Sends everything queued without waiting for batches to fill, and waits for it to be sent. Returns True if the
+        queue drained in time"""
+
+        if self._worker is None:
+            return not self.queue.records
+
+        self._flush_waiters += 1
+        self._wakeup.set()
+        try:
+            async with self._changed:
+                await asyncio.wait_for(self._changed.wait_for(lambda: self.queue.drained), timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._flush_waiters -= 1
+
+        return True
+
+    async def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Flushes outstanding records and stops the worker task"""
+
+        if self._worker is None:
+            return
+
+        await self.flush(timeout)
+        self._worker.cancel()
+        for task in [self._worker, *self._sends]:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+    def take_pending(self) -> List[Dict[str, Any]]:
+        """Removes and returns the records still queued, for sending some other way once the event loop has stopped"""
+
+        return self.queue.take_all()
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        """Waits until a batch is due, then takes it off the queue"""
+
+        queue = self.queue
+        while not queue.records:
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+        # Wait for the batch to fill, or for the window opened by the first record to close
+        assert self.loop is not None
+        deadline = self.loop.time() + queue.config.batch_interval
+        while not queue.full_batch and not self._flush_waiters:
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                break
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+
+        return queue.take_batch()
+
+    async def _run(self) -> None:
+        assert self.loop is not None
+        while True:
+            # Wait for a free slot before taking a batch, so records queue up here rather than in tasks
+            await self._slots.acquire()
+            try:
+                batch = await self._next_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = self.loop.create_task(self._send(batch))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+
+    async def _send(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            success = await self.send_batch(batch)
+        except Exception as error:  # pylint: disable=broad-except
+            success = False
+            self._report_error(f"Failed to send log batch to API: {error}")
+        finally:
+            self._slots.release()
+
+        if not success and self.on_failure is not None:
+            self.on_failure(batch)
+
+        self.queue.done(batch, success)
+        async with self._changed:
+            self._changed.notify_all()
+
+    def _report_error(self, message: str) -> None:
+        if self.on_error is not None:
+            self.on_error(message)
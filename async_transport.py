@@ -0,0 +1,38 @@
+"""Remote logging from asyncio code. Posts go through the same pooled HttpTransport as every other send, run on a small
+thread pool, so posting never blocks the event loop, and retries, compression, TLS and HTTP itself are handled in one
+place."""
+
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_transport import HttpTransport
+else:
+    from .logging_transport import HttpTransport  # type: ignore[no-redef]
+
+if TYPE_CHECKING:
+    import requests
+
+
+class AsyncHttpTransport:
+    """Posts with transport from a pool of pool_size threads, which should match the transport's connection pool, so
+    there are never more posts in flight than connections to carry them. Failures raise OSError, as requests' exceptions
+    do. Usable from any event loop"""
+
+    def __init__(self, transport: HttpTransport, pool_size: int = 2) -> None:
+        self.transport = transport
+        self.pool_size = pool_size
+
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="birdbot-async-post")
+
+    async def post(self, url: str, payload: Any) -> "requests.Response":
+        """Posts payload as JSON, as HttpTransport.post does, without blocking the running event loop"""
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.transport.post, url, payload)
+
+    def close(self) -> None:
+        """Waits for posts in flight, then stops the threads. The transport is left open for its owner to close"""
+
+        self._executor.shutdown(wait=True)
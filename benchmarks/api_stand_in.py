@@ -0,0 +1,132 @@
+"""Local stand-in for the logging API, used by the benchmarks and tests. Speaks HTTP/1.1 so clients can keep
+connections alive, accepts gzipped bodies and records what it receives, JSON records in received and anything else,
+such as log file chunks, in uploads. Latency, error responses and hangs can be
+injected, and changed while it runs."""
+
+import time
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes, which stalls kept-alive connections on delayed ACKs otherwise
+    disable_nagle_algorithm = True
+    server: "_StandInServer"
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connection_count += 1
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+
+        with self.server.lock:
+            self.server.request_count += 1
+            # Spread failures evenly, so error_rate 0.25 fails every fourth request
+            count = self.server.request_count
+            failed = int(count * self.server.error_rate) != int((count - 1) * self.server.error_rate)
+            if self.headers.get("Content-Type", "application/json") == "application/json":
+                self.server.received.append(json.loads(body))
+            else:
+                self.server.uploads.append((dict(self.headers), body, failed or bool(self.server.hang)))
+
+        if self.server.hang:
+            # Longer than the client waits, so it times out
+            time.sleep(self.server.hang)
+            self.close_connection = True
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        status_code = self.server.error_status if failed else 200
+        response = b"OK" if status_code == 200 else b"Injected error"
+        self.send_response(status_code)
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+        pass
+
+
+class _StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float, error_rate: float, error_status: int, hang: float) -> None:
+        super().__init__(("127.0.0.1", 0), _StandInHandler)
+        self.lock = threading.Lock()
+        self.connection_count = 0
+        self.request_count = 0
+        self.received: List[Any] = []
+        # Headers, decoded body and whether it was failed, of each request that wasn't JSON
+        self.uploads: List[Tuple[Dict[str, str], bytes, bool]] = []
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.hang = hang
+
+
+class ApiStandIn:
+    """Runs the stand-in server on a background thread. Use as a context manager. Each response is delayed by latency
+    seconds, error_rate of them are answered with error_status, and if hang is set no response is sent for hang seconds,
+    then the connection is closed"""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, error_status: int = 500, hang: float = 0.0) -> None:
+        self.server = _StandInServer(latency, error_rate, error_status, hang)
+        self._thread: Optional[threading.Thread] = None
+
+    def inject(self, latency: Optional[float] = None, error_rate: Optional[float] = None, hang: Optional[float] = None) -> None:
+        """Changes the injected faults for requests from now on"""
+
+        with self.server.lock:
+            if latency is not None:
+                self.server.latency = latency
+            if error_rate is not None:
+                self.server.error_rate = error_rate
+            if hang is not None:
+                self.server.hang = hang
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host!s}:{port}/log"
+
+    @property
+    def connection_count(self) -> int:
+        return self.server.connection_count
+
+    @property
+    def request_count(self) -> int:
+        return self.server.request_count
+
+    @property
+    def received(self) -> List[Any]:
+        return self.server.received
+
+    @property
+    def uploads(self) -> List[Tuple[Dict[str, str], bytes, bool]]:
+        return self.server.uploads
+
+    def start(self) -> "ApiStandIn":
+        self._thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), name="api-stand-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "ApiStandIn":
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
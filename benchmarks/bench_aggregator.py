@@ -0,0 +1,79 @@
+"""Per-call overhead of logging through the multi-process aggregator: log_info written to the file locally, sent to a
+collector running in another process, and written locally again after failing to reach a collector that is gone.
+
+Wall time includes waiting for the collector whenever the socket's queue (net.unix.max_dgram_qlen) is full, and on a
+single core the collector's own work, so the CPU time of the logging thread is given as the client's overhead.
+"""
+
+import os
+import time
+import multiprocessing
+from multiprocessing.synchronize import Event
+from typing import Callable, Tuple
+
+from benchmarks.suite import LOGGING_DIRECTORY, installed
+from benchmarks.common import time_per_call
+
+import birdbot_logger  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logging_utils import BirdbotLoggerUtils  # noqa: E402
+from logger_config import AggregatorConfig, LoggerConfig  # noqa: E402
+
+ITERATIONS = 50000
+SOCKET_PATH = os.path.join(LOGGING_DIRECTORY, "birdbot.sock")
+
+
+def _log() -> None:
+    birdbot_logger.log_info("Processed frame %d", args=(42,))
+
+
+def _time_per_call(function: Callable[[], object], iterations: int) -> Tuple[float, float]:
+    """Returns the mean wall time and CPU time of the calling thread per call, in microseconds"""
+
+    cpu_start = time.thread_time()
+    wall = time_per_call(function, iterations)
+    return wall, (time.thread_time() - cpu_start) / iterations * 1e6
+
+
+def _collect(ready: Event, stop: Event, received: "multiprocessing.Queue[int]") -> None:
+    collector = BirdbotLoggerUtils(
+        logging_directory=os.path.join(LOGGING_DIRECTORY, "collector"),
+        logging_level=LoggingLevel.INFO,
+        enable_remote_logging=False,
+        quiet=True,
+        config=LoggerConfig(aggregator=AggregatorConfig(socket=SOCKET_PATH, collector=True)),
+    )
+    ready.set()
+    stop.wait()
+    collector.shutdown()
+    assert collector.remote.collector is not None
+    received.put(collector.remote.collector.received_count)
+
+
+def main() -> None:
+    with installed(file_sink=True, quiet=True):
+        local, local_cpu = _time_per_call(_log, ITERATIONS)
+    print(f"{'local file':<28} {local:6.2f} us/call wall {local_cpu:6.2f} us/call CPU")
+
+    context = multiprocessing.get_context("fork")
+    ready, stop, received = context.Event(), context.Event(), context.Queue()
+    collector = context.Process(target=_collect, args=(ready, stop, received))
+    collector.start()
+    ready.wait()
+
+    with installed(file_sink=True, quiet=True, config=LoggerConfig(aggregator=AggregatorConfig(socket=SOCKET_PATH))) as utils:
+        forwarded, forwarded_cpu = _time_per_call(_log, ITERATIONS)
+        stop.set()
+        received_count = received.get()
+        collector.join()
+
+        fallback, fallback_cpu = _time_per_call(_log, ITERATIONS)
+        assert utils.remote.aggregator_client is not None
+        fallback_count = utils.remote.aggregator_client.fallback_count
+
+    print(f"{'sent to collector':<28} {forwarded:6.2f} us/call wall {forwarded_cpu:6.2f} us/call CPU, {received_count} of {ITERATIONS} received")
+    print(f"{'collector gone, local file':<28} {fallback:6.2f} us/call wall {fallback_cpu:6.2f} us/call CPU, {fallback_count} fallbacks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Event loop lag under a storm of errors sent to the API: log_error, which posts each record before returning, against
+alog_error, which queues it for the asyncio shipper. Lag is how late a task sleeping 1ms at a time wakes up, against the
+stand-in API answering after 5ms"""
+
+import time
+import asyncio
+from typing import Awaitable, Callable, List
+
+from benchmarks.suite import installed
+from benchmarks.api_stand_in import ApiStandIn
+
+import birdbot_logger  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import LoggerConfig, ShipperConfig  # noqa: E402
+
+RECORDS = 200
+TICK = 0.001  # In seconds
+
+
+async def _storm(log: Callable[[], Awaitable[None]]) -> List[float]:
+    """Returns the lag of each tick while RECORDS records are logged, yielding to the loop between them, in ms"""
+
+    lags: List[float] = []
+    done = False
+
+    async def tick() -> None:
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append((time.perf_counter() - start - TICK) * 1000)
+
+    ticker = asyncio.create_task(tick())
+    for _ in range(RECORDS):
+        await log()
+        await asyncio.sleep(0)
+    done = True
+    await ticker
+    await birdbot_logger.aflush(timeout=30)
+
+    return sorted(lags)
+
+
+async def _log_error() -> None:
+    birdbot_logger.log_error("Classifier failed")
+
+
+async def _alog_error() -> None:
+    await birdbot_logger.alog_error("Classifier failed")
+
+
+def main() -> None:
+    for name, log in (("log_error", _log_error), ("alog_error", _alog_error)):
+        with ApiStandIn(latency=0.005) as api:
+            with installed(
+                logging_level=LoggingLevel.ERROR,
+                quiet=True,
+                enable_remote_logging=True,
+                logging_api_url=api.url,
+                config=LoggerConfig(shipper=ShipperConfig(batch_interval=0.01)),
+            ):
+                start = time.perf_counter()
+                lags = asyncio.run(_storm(log))
+                elapsed = time.perf_counter() - start
+            received = sum(len(body) if isinstance(body, list) else 1 for body in api.received)
+
+        print(
+            f"{name:<12} lag p50 {lags[len(lags) // 2]:7.2f} ms  p99 {lags[len(lags) * 99 // 100]:7.2f} ms  max {lags[-1]:7.2f} ms"
+            f"  storm {elapsed * 1000:7.1f} ms  {received} of {RECORDS} received"
+        )
+
+
+if __name__ == "__main__":
+    main()
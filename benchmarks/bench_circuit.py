@@ -0,0 +1,53 @@
+"""Caller latency of log_error while the API hangs, then while it answers every request with a 500, with and without the
+circuit breaker. Without it every call waits for the API. With it only the calls until it opens do, and the others spool
+their records"""
+
+import time
+from typing import List
+
+from benchmarks.suite import installed
+from benchmarks.api_stand_in import ApiStandIn
+
+import birdbot_logger  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import CircuitConfig, HttpConfig, LoggerConfig, SpoolConfig  # noqa: E402
+
+CALLS = 20
+TIMEOUT = 0.2  # In seconds
+
+
+def _latencies() -> List[float]:
+    """Returns the latency of each of CALLS log_error calls, in ms"""
+
+    latencies = []
+    for index in range(CALLS):
+        start = time.perf_counter()
+        birdbot_logger.log_error("Classifier failed %d", args=(index,))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main() -> None:
+    results = []
+    for fault, injected in (("hang", {"hang": 1.0}), ("500", {"error_rate": 1.0})):
+        for name, threshold in (("no breaker", 0), ("breaker", 3)):
+            with ApiStandIn(**injected) as api:  # type: ignore[arg-type]
+                with installed(
+                    logging_level=LoggingLevel.ERROR,
+                    quiet=True,
+                    enable_remote_logging=True,
+                    logging_api_url=api.url,
+                    config=LoggerConfig(
+                        spool=SpoolConfig(enabled=True), http=HttpConfig(timeout=TIMEOUT), circuit=CircuitConfig(failure_threshold=threshold, backoff=60)
+                    ),
+                ):
+                    latencies = _latencies()
+            results.append((f"{fault}, {name}", latencies))
+
+    for name, latencies in results:
+        after = sorted(latencies[3:])
+        print(f"{name:<18} first 3 calls {sum(latencies[:3]):7.1f} ms  later calls p50 {after[len(after) // 2]:7.2f} ms  max {after[-1]:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
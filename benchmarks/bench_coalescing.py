@@ -0,0 +1,64 @@
+"""Counts console, file and API writes for a failing sensor workload, with and without repeat coalescing"""
+
+import io
+import time
+import logging
+import contextlib
+from typing import Any, Optional
+from unittest.mock import MagicMock
+
+from benchmarks.common import install_stub_config
+
+install_stub_config()
+
+import birdbot_logger  # noqa: E402
+from log_coalescer import LogCoalescer  # noqa: E402
+
+RECORDS = 20000
+
+
+class _CountingHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.count += 1
+
+
+def _run(coalescer: Optional[LogCoalescer]) -> None:
+    utils = birdbot_logger.birdbot_logger
+    utils.log_coalescer = coalescer
+    post: Any = MagicMock()
+    post.return_value.status_code = 200
+    utils.remote.api.transport.post = post  # type: ignore[method-assign]
+    file_writes = _CountingHandler()
+    logging.getLogger("birdbot_logger").addHandler(file_writes)
+
+    console = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(console):
+        for index in range(RECORDS):
+            if index % 100 == 0:
+                birdbot_logger.log_info(f"Processed frame batch {index // 100}")
+            else:
+                birdbot_logger.log_error("Camera sensor read failed: I2C timeout")
+        birdbot_logger.flush()
+    elapsed = time.perf_counter() - start
+
+    logging.getLogger("birdbot_logger").removeHandler(file_writes)
+    name = "coalescing on" if coalescer else "coalescing off"
+    print(
+        f"{name:<16} console {console.getvalue().count(chr(10)):6d}  file {file_writes.count:6d}  api {post.call_count:6d}  "
+        f"{elapsed / RECORDS * 1e6:7.1f} us/record"
+    )
+
+
+def main() -> None:
+    print(f"{RECORDS} records, 99% one repeated error")
+    _run(None)
+    _run(LogCoalescer(window=60))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Per-record cost of console output, printing with a flush per record against the buffered ConsoleSink, to /dev/null
+and to a pseudo-terminal"""
+
+import os
+import threading
+from typing import Callable, TextIO
+
+from benchmarks.common import install_stub_config, time_per_call
+
+install_stub_config()
+
+from console_sink import ConsoleSink  # noqa: E402
+from log_record import TimestampCache, LogRecord  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logging_utils import COLOUR_CODES  # noqa: E402
+
+ITERATIONS = 50000
+
+
+def _drain(fd: int) -> None:
+    """Reads the terminal side of the pty so writes to it never block"""
+
+    try:
+        while os.read(fd, 65536):
+            pass
+    except OSError:
+        pass
+
+
+def _bench(stream: TextIO) -> Callable[[str], None]:
+    timestamp_cache = TimestampCache()
+
+    def make_record() -> LogRecord:
+        now, time_text = timestamp_cache.now()
+        message = "Processed frame"
+        return LogRecord(LoggingLevel.INFO, message, now, time_text, f"{time_text}: INFO: {message}")
+
+    sink = ConsoleSink(COLOUR_CODES, stream=stream)
+
+    def print_record() -> None:
+        record = make_record()
+        prefix, suffix = COLOUR_CODES[record.logging_level]
+        print(f"{record.time_text}: {record.logging_level.name}: {prefix}{record.message}{suffix}", file=stream, flush=True)
+
+    def run(name: str) -> None:
+        print(f"{name + ': print':<28} {time_per_call(print_record, ITERATIONS):8.2f} us/record")
+        print(f"{name + ': ConsoleSink':<28} {time_per_call(lambda: sink.write(make_record()), ITERATIONS):8.2f} us/record")
+        sink.flush()
+
+    return run
+
+
+def main() -> None:
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        _bench(devnull)("/dev/null")
+
+    controller, terminal = os.openpty()
+    threading.Thread(target=_drain, args=(controller,), daemon=True).start()
+    with open(terminal, "w", encoding="utf-8") as pty:
+        _bench(pty)("pty")
+    os.close(controller)
+
+
+if __name__ == "__main__":
+    main()
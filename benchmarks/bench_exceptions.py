@@ -0,0 +1,71 @@
+"""A crash loop logging the same exception, as log_error(traceback.format_exc()) against log_exception(): time per call
+writing to the file, and API bytes per call sent to a local stand-in. log_exception formats the traceback and sends it
+once, then one line per repeat"""
+
+import time
+import traceback
+from typing import Callable
+
+from benchmarks.suite import installed
+from benchmarks.api_stand_in import ApiStandIn
+from benchmarks.common import time_per_call
+
+import birdbot_logger  # noqa: E402
+from logger_config import HttpConfig, LoggerConfig  # noqa: E402
+
+ITERATIONS = 2000
+API_ITERATIONS = 200
+
+
+def _fail(depth: int) -> None:
+    if depth:
+        _fail(depth - 1)
+    raise TimeoutError(f"Model didn't answer within {time.monotonic():.3f}s")
+
+
+def _formatted() -> None:
+    try:
+        _fail(8)
+    except TimeoutError:
+        birdbot_logger.log_error(f"Classifier failed: {traceback.format_exc()}", send_to_api=False)
+
+
+def _grouped() -> None:
+    try:
+        _fail(8)
+    except TimeoutError:
+        birdbot_logger.log_exception("Classifier failed", send_to_api=False)
+
+
+def _to_api(log: Callable[..., None], *args: object) -> Callable[[], None]:
+    def call() -> None:
+        try:
+            _fail(8)
+        except TimeoutError:
+            log(*args)
+
+    return call
+
+
+def main() -> None:
+    results = []
+    for name, call in (("log_error(format_exc())", _formatted), ("log_exception", _grouped)):
+        with installed(file_sink=True, quiet=True):
+            results.append(f"{name:<24} {time_per_call(call, ITERATIONS):7.1f} us/call to file")
+
+    for name, call in (
+        ("log_error(format_exc())", _to_api(lambda: birdbot_logger.log_error(f"Classifier failed: {traceback.format_exc()}"))),
+        ("log_exception", _to_api(birdbot_logger.log_exception, "Classifier failed")),
+    ):
+        with ApiStandIn() as api, installed(
+            quiet=True, enable_remote_logging=True, logging_api_url=api.url, config=LoggerConfig(http=HttpConfig(compress_threshold=None))
+        ) as utils:
+            for _ in range(API_ITERATIONS):
+                call()
+            results.append(f"{name:<24} {utils.remote.api.transport.bytes_sent / API_ITERATIONS:7.0f} API bytes/call")
+
+    print("\n".join(results))
+
+
+if __name__ == "__main__":
+    main()
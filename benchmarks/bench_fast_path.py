@@ -0,0 +1,41 @@
+"""Per-call cost of a log_debug call that is disabled by the configured level, before and after the level fast path"""
+
+import logging
+from typing import Any
+
+from benchmarks.common import install_stub_config, time_per_call
+
+install_stub_config()
+
+import birdbot_logger  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+
+ITERATIONS = 200000
+
+
+def _previous_log_debug(message: Any) -> None:
+    """log_debug as it was before the fast path: formats the message, then the logging module drops it"""
+
+    birdbot_logger.birdbot_logger.write_to_console(message, LoggingLevel.DEBUG)
+    try:
+        logging.getLogger("birdbot_logger").debug(birdbot_logger.birdbot_logger.format_text(message))
+    except Exception as error:
+        print(f"Error while logging: {error}")
+
+
+def main() -> None:
+    birdbot_logger.set_logging_level(LoggingLevel.INFO)
+    frame = 42
+
+    cases = [
+        ("before: log_debug(f-string)", lambda: _previous_log_debug(f"Processed frame {frame}")),
+        ("after: log_debug(f-string)", lambda: birdbot_logger.log_debug(f"Processed frame {frame}")),
+        ("after: log_debug(format, args)", lambda: birdbot_logger.log_debug("Processed frame %d", args=(frame,))),
+        ("after: log_debug(callable)", lambda: birdbot_logger.log_debug(lambda: f"Processed frame {frame}")),
+    ]
+    for name, call in cases:
+        print(f"{name:<34} {time_per_call(call, ITERATIONS) * 1000:8.1f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
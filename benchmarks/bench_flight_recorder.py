@@ -0,0 +1,48 @@
+"""Cost of the flight recorder: per-call latency of a log_debug call that no sink writes, with and without the recorder,
+and the memory a full ring holds"""
+
+import sys
+import tracemalloc
+
+from benchmarks.common import install_stub_config, time_per_call
+
+install_stub_config()
+
+import birdbot_logger  # noqa: E402
+from flight_recorder import FlightRecorder  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+
+ITERATIONS = 200000
+
+
+def main() -> None:
+    birdbot_logger.set_logging_level(LoggingLevel.INFO)
+    frame = 42
+
+    recorder = FlightRecorder(capacity=256)
+    cases = [
+        ("log_debug, no recorder", lambda: birdbot_logger.log_debug("Processed frame %d", args=(frame,))),
+        ("log_debug, recorded", lambda: birdbot_logger.log_debug("Processed frame %d", args=(frame,))),
+        ("FlightRecorder.record", lambda: recorder.record(LoggingLevel.DEBUG, "Processed frame %d", (frame,))),
+    ]
+    for name, call in cases:
+        if name == "log_debug, recorded":
+            birdbot_logger.birdbot_logger.remote.api.flight_recorder = recorder
+            birdbot_logger._refresh_level_cache()  # pylint: disable=protected-access
+        print(f"{name:<40} {time_per_call(call, ITERATIONS) * 1000:8.1f} ns/call")
+    print(f"{'snapshot of 256':<40} {time_per_call(recorder.snapshot, 1000):8.1f} us/call")
+
+    for capacity in (256, 4096):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        recorder = FlightRecorder(capacity=capacity)
+        for index in range(capacity * 2):
+            recorder.record(LoggingLevel.DEBUG, "Processed frame %d", (index,))
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        slots_size = sys.getsizeof(recorder._slots)  # pylint: disable=protected-access
+        print(f"{f'memory, {capacity} slots full':<40} {used / 1024:8.1f} KiB ({used / capacity:.0f} bytes/slot, list {slots_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
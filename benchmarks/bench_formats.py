@@ -0,0 +1,53 @@
+"""Write cost and read throughput of the text, JSON lines and binary log file formats"""
+
+import os
+import time
+import tempfile
+
+from benchmarks.common import install_stub_config, time_per_call
+
+install_stub_config()
+
+from log_format import FILE_EXTENSIONS, LogFormat, make_encoder, read_records  # noqa: E402
+from log_record import LogRecord, TimestampCache  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+
+WRITE_ITERATIONS = 200000
+READ_RECORDS = 500000
+
+
+def main() -> None:
+    timestamp_cache = TimestampCache()
+    levels = list(LoggingLevel)
+
+    def make_record(index: int) -> LogRecord:
+        now, time_text = timestamp_cache.now()
+        logging_level = levels[index % len(levels)]
+        message = f"Processed frame {index} from camera 2, 3 birds detected"
+        return LogRecord(logging_level, message, now, time_text, f"{time_text}: {logging_level.name}: {message}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for log_format in LogFormat:
+            encode = make_encoder(log_format, "bench-device")
+            path = os.path.join(directory, "19-08-23-birdbot" + FILE_EXTENSIONS[log_format])
+            record = make_record(0)
+
+            with open(path, "wb") as log_file:
+                write_cost = time_per_call(lambda: log_file.write(encode(record)), WRITE_ITERATIONS)
+            with open(path, "wb") as log_file:
+                for index in range(READ_RECORDS):
+                    log_file.write(encode(make_record(index)))
+
+            size = os.path.getsize(path)
+            start = time.perf_counter()
+            count = sum(1 for _ in read_records(path))
+            elapsed = time.perf_counter() - start
+
+            print(
+                f"{log_format.value:<7} write {write_cost:6.2f} us/record   read {count / elapsed / 1e6:5.2f} M records/s "
+                f"{size / elapsed / 1e6:6.1f} MB/s   {size / count:5.1f} bytes/record"
+            )
+
+
+if __name__ == "__main__":
+    main()
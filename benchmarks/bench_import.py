@@ -0,0 +1,60 @@
+"""Cost of importing the logger: cumulative import time of birdbot_logger and the heaviest modules it pulls in, from
+python -X importtime in a fresh interpreter, and the time to make the logger and write the first record"""
+
+import os
+import sys
+import tempfile
+import subprocess
+from typing import Dict, List
+
+RUNS = 5
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["birdbot_logger", "logging_utils", "requests", "asyncio", "socket", "logging"]
+FIRST_RECORD = """
+import sys
+import time
+start = time.perf_counter()
+import birdbot_logger
+imported = time.perf_counter()
+birdbot_logger.log_info("first")
+print((imported - start) * 1e6, (time.perf_counter() - imported) * 1e6, file=sys.stderr)
+"""
+
+
+def _run(code: str, directory: str, *options: str) -> subprocess.CompletedProcess:  # type: ignore[type-arg]
+    environment = dict(os.environ, STANDALONE="True", PYTHONPATH=os.pathsep.join([directory, PACKAGE_DIRECTORY]))
+    return subprocess.run([sys.executable, *options, "-c", code], cwd=directory, env=environment, capture_output=True, text=True, check=True)
+
+
+def _import_times(directory: str) -> Dict[str, int]:
+    """Returns the cumulative import time of each module in MODULES that was imported, in microseconds"""
+
+    times: Dict[str, int] = {}
+    for line in _run("import birdbot_logger", directory, "-X", "importtime").stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() in MODULES:
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "config.py"), "w", encoding="utf-8") as config:
+            config.write(
+                f"from logging_level import LoggingLevel\nLOGGING_DIRECTORY = {os.path.join(directory, 'logs')!r}\n"
+                "CONFIGURED_LOGGING_LEVEL = LoggingLevel.INFO\nENABLE_REMOTE_LOGGING = False\nREMOTE_LOGGING_RATE_LIMIT = 0\n"
+                "LOGGING_API_URL = ''\nDEVICE_ID = 'bench'\n"
+            )
+
+        runs: List[Dict[str, int]] = [_import_times(directory) for _ in range(RUNS)]
+        for module in MODULES:
+            times = sorted(run[module] for run in runs if module in run)
+            print(f"import {module:<24} {times[len(times) // 2] / 1000:8.1f} ms" if times else f"import {module:<24}      not imported")
+
+        first = sorted(tuple(float(value) for value in _run(FIRST_RECORD, directory).stderr.split()) for _ in range(RUNS))
+        print(f"{'import, then first log_info':<31} {first[len(first) // 2][0] / 1000:8.1f} ms {first[len(first) // 2][1] / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
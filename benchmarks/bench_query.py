@@ -0,0 +1,58 @@
+"""Time to find a five minute window in a day of logs, scanning the whole file against seeking with the sidecar index"""
+
+import os
+import time
+import tempfile
+from datetime import datetime
+
+from benchmarks.common import install_stub_config
+
+install_stub_config()
+
+from log_format import FILE_EXTENSIONS, LogFormat, make_encoder  # noqa: E402
+from log_index import LogIndexWriter, index_path  # noqa: E402
+from log_query import query_file  # noqa: E402
+from log_record import LogRecord, TIMESTAMP_FORMAT  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+
+RECORDS = 864000  # Ten a second for a day
+WINDOW = 300  # In seconds
+
+
+def main() -> None:
+    start = datetime(2023, 8, 19).timestamp()
+    window_start_ms = int((start + 86400 * 0.75) * 1000)
+    window_end_ms = window_start_ms + WINDOW * 1000
+
+    with tempfile.TemporaryDirectory() as directory:
+        for log_format in LogFormat:
+            path = os.path.join(directory, "19-08-23-birdbot" + FILE_EXTENSIONS[log_format])
+            encode = make_encoder(log_format, "bench-device")
+            index = LogIndexWriter(path)
+            time_text = ""
+            with open(path, "wb") as log_file:
+                for number in range(RECORDS):
+                    created = start + number / 10
+                    if number % 10 == 0:
+                        time_text = datetime.fromtimestamp(created).strftime(TIMESTAMP_FORMAT)
+                    message = f"Processed frame {number}"
+                    data = encode(LogRecord(LoggingLevel.INFO, message, created, time_text, f"{time_text}: INFO: {message}"))
+                    log_file.write(data)
+                    index.note(created, len(data))
+            index.close()
+
+            timings = []
+            for label in ("full scan", "indexed"):
+                if label == "full scan":
+                    os.rename(index_path(path), index_path(path) + ".off")
+                begin = time.perf_counter()
+                count = sum(1 for _ in query_file(path, window_start_ms, window_end_ms))
+                timings.append(f"{label} {(time.perf_counter() - begin) * 1000:8.1f} ms")
+                if label == "full scan":
+                    os.rename(index_path(path) + ".off", index_path(path))
+
+            print(f"{log_format.value:<7} {count} records in window   " + "   ".join(timings))
+
+
+if __name__ == "__main__":
+    main()
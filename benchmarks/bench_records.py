@@ -0,0 +1,43 @@
+"""Throughput of an enabled log_info, before and after building one shared record per call. Console output goes to
+os.devnull so the terminal doesn't dominate"""
+
+import os
+import logging
+import contextlib
+from typing import Any
+
+from benchmarks.common import install_stub_config, time_per_call
+
+install_stub_config()
+
+import birdbot_logger  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+
+ITERATIONS = 50000
+
+
+def _previous_log_info(message: Any) -> None:
+    """log_info as it was before shared records: the message is formatted for the console and again for the file, and
+    written through the logging module"""
+
+    if LoggingLevel.INFO >= birdbot_logger.birdbot_logger.logging_level:
+        print(birdbot_logger.birdbot_logger.format_text(message, colour=True, logging_level=LoggingLevel.INFO))
+    try:
+        logging.getLogger("birdbot_logger").info(birdbot_logger.birdbot_logger.format_text(message))
+    except Exception as error:
+        print(f"Error while logging: {error}")
+
+
+def main() -> None:
+    birdbot_logger.set_logging_level(LoggingLevel.INFO)
+
+    with open(os.devnull, "w", encoding="utf-8") as null, contextlib.redirect_stdout(null):
+        before = time_per_call(lambda: _previous_log_info("Processed frame 42"), ITERATIONS)
+        after = time_per_call(lambda: birdbot_logger.log_info("Processed frame 42"), ITERATIONS)
+
+    print(f"before: log_info  {before:6.2f} us/call  {1e6 / before:9.0f} records/s")
+    print(f"after:  log_info  {after:6.2f} us/call  {1e6 / after:9.0f} records/s  ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
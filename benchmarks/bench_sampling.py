@@ -0,0 +1,40 @@
+"""Cost of sampling: per-call latency of log_debug to the file with every call written, with 1 in 10 and 1 in 100 calls
+written, and of LogSampler.sample itself for a call that is sampled out, keyed by template or by call site"""
+
+from benchmarks.suite import installed
+from benchmarks.common import time_per_call
+
+import birdbot_logger  # noqa: E402
+from log_sampler import LogSampler  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import LoggerConfig, SamplingConfig  # noqa: E402
+
+ITERATIONS = 100000
+
+
+def _log_debug() -> None:
+    birdbot_logger.log_debug("Processed frame %d", args=(42,))
+
+
+def main() -> None:
+    results = []
+    for name, rates in (("no sampling", None), ("1 in 10", {LoggingLevel.DEBUG: 10}), ("1 in 100", {LoggingLevel.DEBUG: 100})):
+        with installed(file_sink=True, quiet=True, config=LoggerConfig(sampling=SamplingConfig(rates=rates))):
+            results.append((f"log_debug, {name}", time_per_call(_log_debug, ITERATIONS)))
+
+    sampler = LogSampler({LoggingLevel.DEBUG: 1000000})
+    sampler.sample(LoggingLevel.DEBUG, depth=0)
+    sampler.sample(LoggingLevel.DEBUG, "Processed frame %d", (42,))
+    cases = [
+        ("LogSampler.sample, template", lambda: sampler.sample(LoggingLevel.DEBUG, "Processed frame %d", (42,))),
+        ("LogSampler.sample, call site", lambda: sampler.sample(LoggingLevel.DEBUG, depth=0)),
+    ]
+    for name, call in cases:
+        results.append((f"{name}, sampled out", time_per_call(call, ITERATIONS)))
+
+    for name, micros in results:
+        print(f"{name:<40} {micros * 1000:8.1f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
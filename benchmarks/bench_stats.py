@@ -0,0 +1,48 @@
+"""Overhead of the stats counters: log_info to the file with and without stats collection, from one thread and from
+several at once"""
+
+import time
+import threading
+
+from benchmarks.suite import installed
+from benchmarks.common import time_per_call
+
+import birdbot_logger  # noqa: E402
+from logger_config import LoggerConfig, StatsConfig  # noqa: E402
+
+ITERATIONS = 50000
+THREADS = 8
+
+
+def _threaded(calls_per_thread: int) -> float:
+    """Returns the mean wall time per call in microseconds, over THREADS threads logging at once"""
+
+    barrier = threading.Barrier(THREADS + 1)
+
+    def run() -> None:
+        barrier.wait()
+        for _ in range(calls_per_thread):
+            birdbot_logger.log_info("Processed frame %d", args=(42,))
+
+    threads = [threading.Thread(target=run) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+
+    return (time.perf_counter() - start) / (calls_per_thread * THREADS) * 1e6
+
+
+def main() -> None:
+    for collect_stats in (False, True):
+        with installed(file_sink=True, quiet=True, config=LoggerConfig(stats=StatsConfig(collect=collect_stats))):
+            single = time_per_call(lambda: birdbot_logger.log_info("Processed frame %d", args=(42,)), ITERATIONS)
+            threaded = _threaded(ITERATIONS // THREADS)
+        label = "stats on" if collect_stats else "stats off"
+        print(f"{label:<10} 1 thread {single:6.2f} us/call   {THREADS} threads {threaded:6.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
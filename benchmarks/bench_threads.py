@@ -0,0 +1,95 @@
+"""Throughput of log_info from 1 to 32 threads at once, each record written to the file and sent to a local stand-in
+API in background batches. Fails if the throughput of any thread count is under MIN_EFFICIENCY of the ideal, or if any
+record doesn't reach the API exactly once.
+
+The ideal is the one thread throughput times the threads that can run Python at once: the thread count, up to the CPU
+count, without the GIL, and one with it. With the GIL, scaling means total throughput holds up as threads are added
+rather than collapsing under contention."""
+
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from typing import Dict, List
+
+from benchmarks.suite import installed
+from benchmarks.api_stand_in import ApiStandIn
+
+import birdbot_logger  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import LoggerConfig, ShipperConfig  # noqa: E402
+
+RECORDS = 20000
+THREAD_COUNTS = [1, 2, 4, 8, 16, 32]
+MIN_EFFICIENCY = 0.7
+
+
+def _parallelism(threads: int) -> int:
+    gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    return 1 if gil_enabled else min(threads, os.cpu_count() or 1)
+
+
+def _run(threads: int) -> Dict[str, float]:
+    """Returns the records per second the log calls took, having checked every record reached the API once"""
+
+    per_thread = RECORDS // threads
+    start_barrier = threading.Barrier(threads + 1)
+
+    def worker(index: int) -> None:
+        start_barrier.wait()
+        for record in range(per_thread):
+            birdbot_logger.log_info("worker %d record %d", send_to_api=True, args=(index, record))
+
+    with ApiStandIn() as api:
+        with installed(
+            file_sink=True,
+            logging_level=LoggingLevel.INFO,
+            quiet=True,
+            enable_remote_logging=True,
+            logging_api_url=api.url,
+            config=LoggerConfig(shipper=ShipperConfig(background=True, batch_size=500, max_queue_size=RECORDS)),
+        ):
+            workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+            for thread in workers:
+                thread.start()
+            start_barrier.wait()
+            start = time.perf_counter()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            birdbot_logger.flush()
+
+        sent = Counter(record["log_message"] for batch in api.received for record in batch)
+
+    expected = {f"worker {index} record {record}" for index in range(threads) for record in range(per_thread)}
+    lost = len(expected - set(sent))
+    duplicated = sum(count - 1 for count in sent.values() if count > 1)
+    unexpected = len(set(sent) - expected)
+    return {"throughput": per_thread * threads / elapsed, "lost": lost, "duplicated": duplicated, "unexpected": unexpected}
+
+
+def main() -> None:
+    # Discarded, so the one thread run doesn't pay for opening files and connections
+    _run(1)
+    results = {threads: _run(threads) for threads in THREAD_COUNTS}
+    base = results[1]["throughput"]
+
+    failures: List[str] = []
+    for threads, result in results.items():
+        efficiency = result["throughput"] / (base * _parallelism(threads))
+        print(
+            f"{threads:2d} threads {result['throughput']:9.0f} records/s  efficiency {efficiency:5.0%}"
+            f"  lost {result['lost']:.0f}  duplicated {result['duplicated']:.0f}"
+        )
+        if efficiency < MIN_EFFICIENCY:
+            failures.append(f"{threads} threads ran at {efficiency:.0%} of the ideal")
+        if result["lost"] or result["duplicated"] or result["unexpected"]:
+            failures.append(f"{threads} threads lost {result['lost']:.0f} and duplicated {result['duplicated']:.0f} API sends")
+
+    if failures:
+        sys.exit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
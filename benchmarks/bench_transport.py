@@ -0,0 +1,50 @@
+"""Compares the pooled HttpTransport with a plain requests.post per log against a local stand-in API"""
+
+import time
+from typing import Any, Callable, Dict
+
+import requests
+
+from benchmarks.api_stand_in import ApiStandIn
+from logging_transport import HttpTransport
+
+ITERATIONS = 500
+
+
+def _record(message: str) -> Dict[str, Any]:
+    return {"device_id": "bench", "log_timestamp": 0, "log_message": message, "log_level": "INFO"}
+
+
+def _run(name: str, send: Callable[[str, object], object], payload: object) -> None:
+    with ApiStandIn() as api:
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            send(api.url, payload)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<32} {elapsed / ITERATIONS * 1e6:9.1f} us/call  {api.connection_count:4d} connections")
+
+
+def main() -> None:
+    small = _record("Camera frame dropped")
+    large = [_record(f"Classifier failed on frame {index}: timeout waiting for model") for index in range(200)]
+
+    _run("requests.post (small)", lambda url, payload: requests.post(url, json=payload, timeout=10), small)
+
+    pooled = HttpTransport()
+    _run("HttpTransport (small)", pooled.post, small)
+    pooled.close()
+
+    _run("requests.post (200 record batch)", lambda url, payload: requests.post(url, json=payload, timeout=10), large)
+
+    for threshold in (None, 1024):
+        transport = HttpTransport(compress_threshold=threshold)
+        _run(f"HttpTransport (batch, gzip>{threshold})", transport.post, large)
+        print(
+            f"{'':<32} {transport.bytes_sent / transport.requests_sent:9.0f} bytes/request on the wire"
+            f" ({transport.bytes_uncompressed / transport.requests_sent:.0f} uncompressed)"
+        )
+        transport.close()
+
+
+if __name__ == "__main__":
+    main()
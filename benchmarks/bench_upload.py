@@ -0,0 +1,64 @@
+"""Latency of log_error sends to the API while a day's log file uploads in the background, against none uploading, and
+the upload's throughput against its cap. The upload has its own connection and is paced, so sends shouldn't slow"""
+
+import os
+import time
+import tempfile
+from typing import List
+
+from benchmarks.suite import installed
+from benchmarks.api_stand_in import ApiStandIn
+
+import birdbot_logger  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import LoggerConfig, UploadConfig  # noqa: E402
+
+CALLS = 200
+FILE_BYTES = 8 * 1024 * 1024
+CAP = 1024 * 1024  # In bytes per second
+
+
+def _latencies() -> List[float]:
+    """Returns the sorted latency of each of CALLS log_error calls, in ms"""
+
+    latencies = []
+    for index in range(CALLS):
+        start = time.perf_counter()
+        birdbot_logger.log_error("Classifier failed %d", args=(index,))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)
+
+
+def main() -> None:
+    results = []
+    with tempfile.TemporaryDirectory() as directory, ApiStandIn() as api:
+        path = os.path.join(directory, "19-08-23-birdbot.log")
+        with open(path, "wb") as log_file:
+            # Half compressible, roughly as a real log is
+            for index in range(FILE_BYTES // 4096):
+                log_file.write(os.urandom(1024).hex().encode() + b"%06d: INFO: frame processed\n" % index * 73)
+
+        for uploading in (False, True):
+            with installed(
+                logging_level=LoggingLevel.ERROR,
+                quiet=True,
+                enable_remote_logging=True,
+                logging_api_url=api.url,
+                config=LoggerConfig(upload=UploadConfig(max_bytes_per_second=CAP)),
+            ):
+                start = time.monotonic()
+                if uploading:
+                    birdbot_logger.upload_log_file(path=path)
+                latencies = _latencies()
+                uploader = birdbot_logger.birdbot_logger.remote.uploader
+                sent = uploader.bytes_sent if uploader is not None else 0
+                rate = sent / (time.monotonic() - start)
+            results.append(("uploading" if uploading else "idle", latencies, rate))
+
+    for name, latencies, rate in results:
+        p50, p99 = latencies[len(latencies) // 2], latencies[len(latencies) * 99 // 100]
+        print(f"{name:<10} p50 {p50:6.2f} ms  p99 {p99:6.2f} ms  upload {rate / 1024:7.0f} KiB/s of {CAP // 1024}")
+
+
+if __name__ == "__main__":
+    main()
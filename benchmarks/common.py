@@ -0,0 +1,37 @@
+"""Shared set up for the benchmarks"""
+
+import os
+import sys
+import time
+import types
+import tempfile
+from typing import Callable
+
+os.environ["STANDALONE"] = "True"
+
+from logging_level import LoggingLevel  # noqa: E402
+
+
+def install_stub_config(logging_api_url: str = "http://127.0.0.1:9/log", enable_remote_logging: bool = True) -> str:
+    """Provides the config module the logger expects from its parent project, logging into a fresh temporary directory
+    which is returned"""
+
+    config = types.ModuleType("config")
+    config.LOGGING_DIRECTORY = tempfile.mkdtemp(prefix="birdbot-bench-")  # type: ignore[attr-defined]
+    config.CONFIGURED_LOGGING_LEVEL = LoggingLevel.INFO  # type: ignore[attr-defined]
+    config.ENABLE_REMOTE_LOGGING = enable_remote_logging  # type: ignore[attr-defined]
+    config.REMOTE_LOGGING_RATE_LIMIT = 0  # type: ignore[attr-defined]
+    config.LOGGING_API_URL = logging_api_url  # type: ignore[attr-defined]
+    config.DEVICE_ID = "bench"  # type: ignore[attr-defined]
+    sys.modules["config"] = config
+
+    return str(config.LOGGING_DIRECTORY)
+
+
+def time_per_call(function: Callable[[], object], iterations: int) -> float:
+    """Returns the mean wall time of function in microseconds"""
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start) / iterations * 1e6
@@ -0,0 +1,266 @@
+"""Benchmark suite for the logging hot paths. Measures per-call latency and throughput of each log_* function with its
+level enabled and disabled, to the console, the file and the API, against a local stand-in that can inject latency,
+errors and timeouts, and under contention from several threads. Results are written as JSON with the commit they were
+measured at, and can be compared with an earlier run to catch regressions.
+
+Usage: python -m benchmarks.suite [--output results.json] [--compare baseline.json] [--threshold 0.2] [--quick]
+                                  [--filter TEXT]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import functools
+import platform
+import threading
+import contextlib
+import subprocess
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from benchmarks.api_stand_in import ApiStandIn
+from benchmarks.common import install_stub_config
+
+LOGGING_DIRECTORY = install_stub_config()
+
+import birdbot_logger  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logging_utils import BirdbotLoggerUtils  # noqa: E402
+from logger_config import FileConfig, HttpConfig, LoggerConfig, ShipperConfig  # noqa: E402
+
+LOG_FUNCTIONS: Dict[LoggingLevel, Callable[..., None]] = {
+    LoggingLevel.DEBUG: birdbot_logger.log_debug,
+    LoggingLevel.INFO: birdbot_logger.log_info,
+    LoggingLevel.NOTICE: birdbot_logger.log_notice,
+    LoggingLevel.WARNING: birdbot_logger.log_warning,
+    LoggingLevel.ERROR: birdbot_logger.log_error,
+}
+
+# Faults injected by the stand-in for the remote cases: (latency, error_rate, hang). The client times out after 50ms
+REMOTE_FAULTS = {
+    "ok": (0.0, 0.0, 0.0),
+    "latency 5ms": (0.005, 0.0, 0.0),
+    "errors 50%": (0.0, 0.5, 0.0),
+    "timeouts": (0.0, 0.0, 0.2),
+}
+HTTP_TIMEOUT = 0.05
+THREAD_COUNTS = [1, 2, 4, 8, 16]
+
+
+class Suite:
+    def __init__(self, quick: bool, name_filter: Optional[str]) -> None:
+        self.scale = 0.1 if quick else 1.0
+        self.name_filter = name_filter
+        self.results: List[Dict[str, Any]] = []
+
+    def iterations(self, count: int) -> int:
+        return max(1, int(count * self.scale))
+
+    def wanted(self, name: str) -> bool:
+        return self.name_filter is None or self.name_filter in name
+
+    def measure(self, name: str, call: Callable[[], None], iterations: int, repeats: int = 5, latencies: bool = False) -> None:
+        """Records the median over repeats of the mean time per call. With latencies, every call is timed as well and
+        the 50th and 99th percentiles are recorded"""
+
+        if not self.wanted(name):
+            return
+
+        iterations = self.iterations(iterations)
+        samples: List[float] = []
+        call_times: List[int] = []
+        for _ in range(repeats):
+            start = time.perf_counter_ns()
+            if latencies:
+                for _ in range(iterations):
+                    call_start = time.perf_counter_ns()
+                    call()
+                    call_times.append(time.perf_counter_ns() - call_start)
+            else:
+                for _ in range(iterations):
+                    call()
+            samples.append((time.perf_counter_ns() - start) / iterations)
+
+        ns_per_call = sorted(samples)[len(samples) // 2]
+        result: Dict[str, Any] = {
+            "name": name,
+            "iterations": iterations * repeats,
+            "ns_per_call": round(ns_per_call, 1),
+            "calls_per_second": round(1e9 / ns_per_call),
+        }
+        if call_times:
+            call_times.sort()
+            result["p50_ns"] = call_times[len(call_times) // 2]
+            result["p99_ns"] = call_times[min(len(call_times) - 1, len(call_times) * 99 // 100)]
+        self.add(result)
+
+    def add(self, result: Dict[str, Any]) -> None:
+        self.results.append(result)
+        print(f"{result['name']:<60} {result['ns_per_call'] / 1000:10.2f} us/call {result['calls_per_second']:>10} calls/s", file=sys.stderr)
+
+
+@contextlib.contextmanager
+def installed(file_sink: bool = False, **kwargs: Any) -> Iterator[BirdbotLoggerUtils]:
+    """Makes a logger with kwargs the one the log_* functions use, with the file sink on or off, and console output
+    thrown away"""
+
+    kwargs.setdefault("logging_level", LoggingLevel.DEBUG)
+    kwargs.setdefault("enable_remote_logging", False)
+    utils = birdbot_logger.configure(logging_directory=LOGGING_DIRECTORY, remote_logging_rate_limit=0, device_id="bench", **kwargs)
+    utils.sinks.enable("file", file_sink)
+
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            yield utils
+        finally:
+            utils.shutdown()
+
+
+def bench_levels(suite: Suite) -> None:
+    """Each log_* function with its level disabled, and enabled to the console, the file or both"""
+
+    sinks: Dict[str, Dict[str, Any]] = {
+        "console": {"file_sink": False},
+        "file": {"file_sink": True, "quiet": True},
+        "console+file": {"file_sink": True},
+        "async file": {"file_sink": True, "quiet": True, "config": LoggerConfig(file=FileConfig(async_writes=True))},
+    }
+
+    for level, log in LOG_FUNCTIONS.items():
+        if level < LoggingLevel.ERROR:
+            with installed(logging_level=LoggingLevel.ERROR):
+                suite.measure(f"{log.__name__}/disabled", functools.partial(log, "Processed frame %d", args=(42,)), 200000)
+
+        for sink, kwargs in sinks.items():
+            with installed(**kwargs):
+                if level == LoggingLevel.ERROR:
+                    suite.measure(f"{log.__name__}/{sink}", functools.partial(log, "Processed frame %d", send_to_api=False, args=(42,)), 20000)
+                else:
+                    suite.measure(f"{log.__name__}/{sink}", functools.partial(log, "Processed frame %d", args=(42,)), 20000)
+
+
+def bench_remote(suite: Suite) -> None:
+    """log_error sent to the stand-in, posting inline and through the background shipper, under each injected fault"""
+
+    for fault, (latency, error_rate, hang) in REMOTE_FAULTS.items():
+        for delivery, background in (("sync", False), ("background", True)):
+            name = f"log_error/remote {delivery}/{fault}"
+            if not suite.wanted(name):
+                continue
+            with ApiStandIn(latency=latency, error_rate=error_rate, hang=hang) as api:
+                with installed(
+                    logging_level=LoggingLevel.ERROR,
+                    quiet=True,
+                    enable_remote_logging=True,
+                    logging_api_url=api.url,
+                    config=LoggerConfig(http=HttpConfig(timeout=HTTP_TIMEOUT), shipper=ShipperConfig(background=background)),
+                ):
+                    iterations = 20 if hang and not background else 200
+                    suite.measure(name, lambda: birdbot_logger.log_error("Classifier failed"), iterations, repeats=3, latencies=True)
+
+
+def bench_contention(suite: Suite) -> None:
+    """Total throughput of log_info to the file from several threads at once"""
+
+    calls_per_thread = suite.iterations(20000)
+    for sink, kwargs in (("file", {}), ("async file", {"config": LoggerConfig(file=FileConfig(async_writes=True))})):
+        for thread_count in THREAD_COUNTS:
+            name = f"log_info/{sink}/{thread_count} threads"
+            if not suite.wanted(name):
+                continue
+            with installed(file_sink=True, quiet=True, **kwargs) as utils:
+                barrier = threading.Barrier(thread_count + 1)
+
+                def run(barrier: threading.Barrier) -> None:
+                    barrier.wait()
+                    for _ in range(calls_per_thread):
+                        birdbot_logger.log_info("Processed frame %d", args=(42,))
+
+                threads = [threading.Thread(target=run, args=(barrier,)) for _ in range(thread_count)]
+                for thread in threads:
+                    thread.start()
+                barrier.wait()
+                start = time.perf_counter_ns()
+                for thread in threads:
+                    thread.join()
+                utils.flush()
+                elapsed = time.perf_counter_ns() - start
+
+            total_calls = calls_per_thread * thread_count
+            suite.add(
+                {
+                    "name": name,
+                    "iterations": total_calls,
+                    "ns_per_call": round(elapsed / total_calls, 1),
+                    "calls_per_second": round(total_calls / elapsed * 1e9),
+                    "threads": thread_count,
+                }
+            )
+
+
+def metadata() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+
+    return {
+        "commit": commit,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, threshold: float) -> bool:
+    """Prints each case against the baseline run. Returns False if any is more than threshold slower"""
+
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    baseline_results = {result["name"]: result for result in baseline["results"]}
+
+    print(f"Compared with {baseline['meta']['commit']} ({baseline['meta']['date']}):", file=sys.stderr)
+    passed = True
+    for result in results:
+        previous = baseline_results.get(result["name"])
+        if previous is None:
+            continue
+        ratio = result["ns_per_call"] / previous["ns_per_call"]
+        regressed = ratio > 1 + threshold
+        passed = passed and not regressed
+        print(f"{result['name']:<60} {ratio:6.2f}x{'  REGRESSION' if regressed else ''}", file=sys.stderr)
+
+    return passed
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="benchmarks.suite", description="Benchmarks the logging hot paths")
+    parser.add_argument("--output", help="Write the results as JSON here, instead of to stdout")
+    parser.add_argument("--compare", help="Results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown that counts as a regression, 0.2 is 20%%")
+    parser.add_argument("--quick", action="store_true", help="Run a tenth of the iterations")
+    parser.add_argument("--filter", help="Only run cases whose name contains this text")
+    arguments = parser.parse_args(argv)
+
+    suite = Suite(arguments.quick, arguments.filter)
+    bench_levels(suite)
+    bench_remote(suite)
+    bench_contention(suite)
+
+    output = json.dumps({"meta": metadata(), "results": suite.results}, indent=2)
+    if arguments.output:
+        with open(arguments.output, "w", encoding="utf-8") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+    if arguments.compare and not compare(suite.results, arguments.compare, arguments.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
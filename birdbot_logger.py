@@ -2,75 +2,455 @@
 submodule. Main entry point."""
 
 import os
-import logging
-from typing import Any
+import sys
+import atexit
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 if os.getenv("STANDALONE", None) is not None:
     from logging_level import LoggingLevel
     from logging_utils import BirdbotLoggerUtils
+    from log_coalescer import RepeatSummary
+    from log_sampler import format_sampled
+    from log_record import LogRecord
+    from flight_recorder import FlightRecorder
 else:
     from .logging_level import LoggingLevel  # type: ignore[no-redef]
     from .logging_utils import BirdbotLoggerUtils  # type: ignore[no-redef]
+    from .log_coalescer import RepeatSummary  # type: ignore[no-redef]
+    from .log_sampler import format_sampled  # type: ignore[no-redef]
+    from .log_record import LogRecord  # type: ignore[no-redef]
+    from .flight_recorder import FlightRecorder  # type: ignore[no-redef]
 
 
-birdbot_logger = BirdbotLoggerUtils()
+class _DeferredLogger:
+    """Stands in for birdbot_logger until it is made, which the first access to it from outside does"""
 
+    def __getattr__(self, name: str) -> Any:
+        _ensure_configured()
+        return getattr(birdbot_logger, name)
 
-# Not in the class so we can access cleanly from other modules without initialising
-def log_debug(message: Any) -> None:
-    """Logs debug messages"""
+    def __setattr__(self, name: str, value: Any) -> None:
+        _ensure_configured()
+        setattr(birdbot_logger, name, value)
 
-    birdbot_logger.write_to_console(message, LoggingLevel.DEBUG)
-    try:
-        logging.getLogger("birdbot_logger").debug(birdbot_logger.format_text(message))
-    except Exception as error:
-        print(f"Error while logging: {error}")
 
+# Made by configure(), or from config.py by the first call that needs it, so importing this module has no side effects
+birdbot_logger: BirdbotLoggerUtils = _DeferredLogger()  # type: ignore[assignment]
+_configured = False
+_configure_lock = threading.RLock()
 
-def log_info(message: Any, send_to_api: bool = False) -> None:
-    """Logs information messages"""
+# Lowest level any local sink will write, cached as a plain int so a disabled log_* call costs one comparison. Refreshed
+# whenever the sinks change. Records below it are still built if they are going to the API. _min_level also covers the
+# flight recorder, which records calls below _sink_level without building a record. Every call gets through until the
+# logger is made
+_sink_level = int(LoggingLevel.DEBUG)
+_min_level = int(LoggingLevel.DEBUG)
+# The logger's flight recorder, if enabled, cached with the levels as every log call checks it
+_flight_recorder: Optional[FlightRecorder] = None
+_DEBUG, _INFO, _NOTICE, _WARNING = int(LoggingLevel.DEBUG), int(LoggingLevel.INFO), int(LoggingLevel.NOTICE), int(LoggingLevel.WARNING)
+
+
+def _refresh_level_cache() -> None:
+    global _sink_level, _min_level, _flight_recorder  # pylint: disable=global-statement
+
+    _sink_level = birdbot_logger.sinks.min_level
+    _min_level = _sink_level
+    _flight_recorder = birdbot_logger.remote.api.flight_recorder
+    if _flight_recorder is not None:
+        _min_level = min(_min_level, int(_flight_recorder.level))
+
+
+def configure(**kwargs: Any) -> BirdbotLoggerUtils:
+    """Makes the logger the log_* functions use, with kwargs as for BirdbotLoggerUtils. Settings not given are read from
+    config.py, or take their defaults without one. A logger made before is shut down and replaced. Without a call to
+    this, the logger is made on first use"""
+
+    global birdbot_logger, _configured  # pylint: disable=global-statement
+
+    with _configure_lock:
+        if _configured:
+            previous = birdbot_logger
+            if previous.log_coalescer is not None:
+                _write_summaries(previous.log_coalescer.drain())
+            previous.shutdown()
+
+        birdbot_logger = BirdbotLoggerUtils(**kwargs)
+        # DEBUG records are never sent
+        birdbot_logger.sinks.add("api", _send_to_api, LoggingLevel.INFO, remote=True)
+        if birdbot_logger.remote.datagram is not None:
+            # Records below config.datagram.below go by datagram instead
+            birdbot_logger.sinks.add("datagram", _send_datagram, LoggingLevel.INFO, remote=True)
+            birdbot_logger.sinks.set_level("api", max(LoggingLevel.INFO, birdbot_logger.remote.config.datagram.below))
+        birdbot_logger.sinks.on_change = _refresh_level_cache
+        _configured = True
+        _refresh_level_cache()
+
+    return birdbot_logger
+
+
+def _ensure_configured() -> None:
+    with _configure_lock:
+        if not _configured:
+            configure()
+
+
+def set_logging_level(logging_level: LoggingLevel) -> None:
+    """Changes the level for console and file output"""
+
+    _ensure_configured()
+    birdbot_logger.set_logging_level(logging_level)
+
+
+def set_quiet(quiet: bool) -> None:
+    """Turns console output off, or back on. File and API output are unaffected"""
+
+    _ensure_configured()
+    birdbot_logger.set_quiet(quiet)
+
+
+def add_sink(name: str, write: Callable[[LogRecord], None], logging_level: LoggingLevel) -> None:
+    """Writes every record at logging_level and above to write as well, from the thread that logged it. Replaces the
+    sink already called name, including the built in "console", "file" and "error_file" """
+
+    _ensure_configured()
+    birdbot_logger.sinks.add(name, write, logging_level)
+
+
+def remove_sink(name: str) -> bool:
+    """Stops writing records to a sink. Returns False if there is none called name"""
+
+    _ensure_configured()
+    return birdbot_logger.sinks.remove(name)
+
+
+def set_sink_level(name: str, logging_level: LoggingLevel) -> None:
+    """Changes the lowest level written to one sink. Raises KeyError if there is none called name"""
+
+    _ensure_configured()
+    birdbot_logger.sinks.set_level(name, logging_level)
 
-    birdbot_logger.write_to_console(message, LoggingLevel.INFO)
+
+def _write(message: Any, logging_level: LoggingLevel, send_to_api: bool, asynchronous: bool = False) -> None:
+    """Writes a record to the sinks for its level, and if asked to the remote ones, such as the API. In a client process
+    of the aggregator, the record is sent to the collector instead, unless it can't be reached. If asynchronous, remote
+    sinks mustn't block the running event loop"""
+
+    if birdbot_logger.remote.aggregator_client is not None and birdbot_logger.forward_to_aggregator(message, logging_level, send_to_api):
+        return
+
+    record = birdbot_logger.make_record(message, logging_level)
+    sinks = birdbot_logger.sinks
     try:
-        logging.getLogger("birdbot_logger").info(birdbot_logger.format_text(message))
+        for write in sinks.local[logging_level]:
+            write(record)
         if send_to_api and birdbot_logger.enable_remote_logging:
-            birdbot_logger.send_log_to_api(message, LoggingLevel.INFO, log_info, log_notice, override_rate_limit=True)
+            for send in sinks.remote[logging_level]:
+                send(record, asynchronous)
     except Exception as error:
         print(f"Error while logging: {error}")
 
 
-def log_notice(message: Any, send_to_api: bool = False) -> None:
-    """Logs information messages but in green"""
+def _write_summaries(summaries: List[RepeatSummary], asynchronous: bool = False) -> None:
+    for summary in summaries:
+        _write(summary.format_message(), summary.logging_level, summary.send_to_api, asynchronous)
+
+
+def _log(message: Any, logging_level: LoggingLevel, send_to_api: bool = False, args: Tuple[Any, ...] = (), asynchronous: bool = False) -> None:
+    """Drops the call if it is sampled out, otherwise renders a deferred message and passes the record through the
+    repeat coalescer, if enabled, in front of all sinks. The flight recorder, if enabled, gets the rendered message, or
+    the call unrendered if it is only wanted by the recorder or sampled out, so a deferred message is rendered once at
+    most"""
+
+    if not _configured:
+        _ensure_configured()
+        # The levels are now known
+        if logging_level < _min_level and not (send_to_api and birdbot_logger.enable_remote_logging):
+            return
+
+    flight_recorder = _flight_recorder
+    if flight_recorder is not None:
+        if logging_level < flight_recorder.level:
+            flight_recorder = None
+        # Only wanted by the recorder
+        if logging_level < _sink_level and not (send_to_api and birdbot_logger.enable_remote_logging):
+            if flight_recorder is not None:
+                flight_recorder.record(logging_level, message, args)
+            return
+
+    sample_rate = 1
+    log_sampler = birdbot_logger.log_sampler
+    if log_sampler is not None:
+        # The call site is the caller of the log_* or alog_* function
+        sample_rate = log_sampler.sample(logging_level, message, args, depth=2)
+        if not sample_rate:
+            if flight_recorder is not None:
+                flight_recorder.record(logging_level, message, args)
+            return
 
-    birdbot_logger.write_to_console(message, LoggingLevel.NOTICE)
     try:
-        logging.getLogger("birdbot_logger").info(birdbot_logger.format_text(message))
-        if send_to_api and birdbot_logger.enable_remote_logging:
-            birdbot_logger.send_log_to_api(message, LoggingLevel.NOTICE, log_notice, log_notice, override_rate_limit=True)
+        if args:
+            message = message % args
+        elif callable(message):
+            deferred = message
+            message = message()
+            # The traceback is already in the record itself, so the recorder keeps the exception's one-line form rather
+            # than resend it with every snapshot
+            if flight_recorder is not None and isinstance(deferred, _ExceptionMessage):
+                flight_recorder.record(logging_level, deferred.summary)
+                flight_recorder = None
     except Exception as error:
+        if flight_recorder is not None:
+            flight_recorder.record(logging_level, message, args)
         print(f"Error while logging: {error}")
+        return
+
+    if flight_recorder is not None:
+        flight_recorder.record(logging_level, message)
+
+    if sample_rate > 1:
+        message = format_sampled(str(message), sample_rate)
 
+    if birdbot_logger.log_coalescer is not None:
+        emit, summaries = birdbot_logger.log_coalescer.admit(logging_level, str(message), send_to_api)
+        _write_summaries(summaries, asynchronous)
+        if not emit:
+            return
+
+    _write(message, logging_level, send_to_api, asynchronous)
+
+
+# Not in the class so we can access cleanly from other modules without initialising. message can be deferred, either as
+# a callable returning the message or as a %-format string with args, and is then only rendered if it will be written.
+def log_debug(message: Any, args: Tuple[Any, ...] = ()) -> None:
+    """Logs debug messages"""
 
-def log_warning(message: Any, send_to_api: bool = False) -> None:
+    if _min_level > _DEBUG:
+        return
+    _log(message, LoggingLevel.DEBUG, args=args)
+
+
+def log_info(message: Any, send_to_api: bool = False, args: Tuple[Any, ...] = ()) -> None:
+    """Logs information messages"""
+
+    if _min_level > _INFO and not (send_to_api and birdbot_logger.enable_remote_logging):
+        return
+    _log(message, LoggingLevel.INFO, send_to_api, args)
+
+
+def log_notice(message: Any, send_to_api: bool = False, args: Tuple[Any, ...] = ()) -> None:
+    """Logs information messages but in green"""
+
+    if _min_level > _NOTICE and not (send_to_api and birdbot_logger.enable_remote_logging):
+        return
+    _log(message, LoggingLevel.NOTICE, send_to_api, args)
+
+
+def log_warning(message: Any, send_to_api: bool = False, args: Tuple[Any, ...] = ()) -> None:
     """Logs warning messages"""
 
-    birdbot_logger.write_to_console(message, LoggingLevel.WARNING)
-    try:
-        logging.getLogger("birdbot_logger").warning(birdbot_logger.format_text(message))
-        if send_to_api and birdbot_logger.enable_remote_logging:
-            birdbot_logger.send_log_to_api(message, LoggingLevel.WARNING, log_warning, log_notice, override_rate_limit=True)
-    except Exception as error:
-        print(f"Error while logging: {error}")
+    if _min_level > _WARNING and not (send_to_api and birdbot_logger.enable_remote_logging):
+        return
+    _log(message, LoggingLevel.WARNING, send_to_api, args)
 
 
-def log_error(message: Any, send_to_api: bool = True) -> None:
+def log_error(message: Any, send_to_api: bool = True, args: Tuple[Any, ...] = ()) -> None:
     """Logs error messages. Send to api is used to prevent infinite loops when sending errors to api, overrides
     enable_remote_logging"""
 
-    birdbot_logger.write_to_console(message, LoggingLevel.ERROR)
+    _log(message, LoggingLevel.ERROR, send_to_api, args)
+
+
+def log_exception(
+    message: Any = "",
+    exception: Optional[BaseException] = None,
+    logging_level: LoggingLevel = LoggingLevel.ERROR,
+    send_to_api: bool = True,
+    args: Tuple[Any, ...] = (),
+) -> None:
+    """Logs exception, by default the one being handled, after message. Its traceback is logged the first time it is
+    seen in exception_window, and repeats are logged as one line with its fingerprint and a count. The traceback is only
+    ever formatted once"""
+
+    if exception is None:
+        exception = sys.exc_info()[1]
+    if logging_level < _min_level and not (send_to_api and birdbot_logger.enable_remote_logging):
+        return
+    _log(_ExceptionMessage(message, exception, args), logging_level, send_to_api)
+
+
+class _ExceptionMessage:
+    """The deferred message of log_exception, so the exception is only captured once the record is known to be written,
+    and calls dropped by level or sampling aren't counted. Once called, summary is the message in one line, for the
+    flight recorder"""
+
+    __slots__ = ("message", "exception", "args", "summary")
+
+    def __init__(self, message: Any, exception: Optional[BaseException], args: Tuple[Any, ...]) -> None:
+        self.message = message
+        self.exception = exception
+        self.args = args
+        self.summary = ""
+
+    def __call__(self) -> str:
+        text = str(self.message % self.args if self.args else self.message)
+        if self.exception is None:
+            self.summary = text
+            return text
+        captured = birdbot_logger.exception_grouper.capture(self.exception)
+        self.summary = captured.format_summary(text)
+        return captured.format_message(text)
+
+
+# asyncio counterparts of the log_* functions, for use from coroutines on a running event loop. Console and file output
+# are the same, but records for the API are queued and sent by a task on the loop, so the loop is never blocked on the
+# network. Failures to send are logged locally. Await aflush() before the loop stops to make sure everything is sent.
+async def alog_debug(message: Any, args: Tuple[Any, ...] = ()) -> None:
+    """Logs debug messages"""
+
+    if _min_level > _DEBUG:
+        return
+    _log(message, LoggingLevel.DEBUG, args=args, asynchronous=True)
+
+
+async def alog_info(message: Any, send_to_api: bool = False, args: Tuple[Any, ...] = ()) -> None:
+    """Logs information messages"""
+
+    if _min_level > _INFO and not (send_to_api and birdbot_logger.enable_remote_logging):
+        return
+    _log(message, LoggingLevel.INFO, send_to_api, args, asynchronous=True)
+
+
+async def alog_notice(message: Any, send_to_api: bool = False, args: Tuple[Any, ...] = ()) -> None:
+    """Logs information messages but in green"""
+
+    if _min_level > _NOTICE and not (send_to_api and birdbot_logger.enable_remote_logging):
+        return
+    _log(message, LoggingLevel.NOTICE, send_to_api, args, asynchronous=True)
+
+
+async def alog_warning(message: Any, send_to_api: bool = False, args: Tuple[Any, ...] = ()) -> None:
+    """Logs warning messages"""
+
+    if _min_level > _WARNING and not (send_to_api and birdbot_logger.enable_remote_logging):
+        return
+    _log(message, LoggingLevel.WARNING, send_to_api, args, asynchronous=True)
+
+
+async def alog_error(message: Any, send_to_api: bool = True, args: Tuple[Any, ...] = ()) -> None:
+    """Logs error messages. The record is queued for the API, not sent before this returns"""
+
+    _log(message, LoggingLevel.ERROR, send_to_api, args, asynchronous=True)
+
+
+async def alog_exception(
+    message: Any = "",
+    exception: Optional[BaseException] = None,
+    logging_level: LoggingLevel = LoggingLevel.ERROR,
+    send_to_api: bool = True,
+    args: Tuple[Any, ...] = (),
+) -> None:
+    """As log_exception. The record is queued for the API, not sent before this returns"""
+
+    if exception is None:
+        exception = sys.exc_info()[1]
+    if logging_level < _min_level and not (send_to_api and birdbot_logger.enable_remote_logging):
+        return
+    _log(_ExceptionMessage(message, exception, args), logging_level, send_to_api, asynchronous=True)
+
+
+# Used to report failures sending a record to the API at the record's own level. DEBUG records are never sent
+_ERROR_LOGGERS: Dict[LoggingLevel, Callable[[str, bool], None]] = {
+    LoggingLevel.INFO: log_info,
+    LoggingLevel.NOTICE: log_notice,
+    LoggingLevel.WARNING: log_warning,
+    LoggingLevel.ERROR: log_error,
+}
+
+
+def _send_to_api(record: LogRecord, asynchronous: bool) -> None:
+    """The API sink. Failures to send are logged at the record's level, without going back to the API. From a coroutine
+    the record is queued for the running event loop's shipper instead"""
+
+    if asynchronous:
+        birdbot_logger.send_log_to_api_async(record.message, record.logging_level)
+    else:
+        birdbot_logger.send_log_to_api(record.message, record.logging_level, _ERROR_LOGGERS[record.logging_level], log_notice)
+
+
+def _send_datagram(record: LogRecord, _asynchronous: bool) -> None:
+    """The datagram sink, for records below config.datagram.below. Never blocks, so is the same from a coroutine"""
+
+    if record.logging_level < birdbot_logger.remote.config.datagram.below:
+        birdbot_logger.send_log_datagram(record)
+
+
+def send_recent_records(message: str = "Recent log records") -> None:
+    """Sends the flight recorder's snapshot of recent log calls to the API now, with message, regardless of the rate
+    limit"""
+
+    if not _configured or _flight_recorder is None or not birdbot_logger.enable_remote_logging:
+        return
+
     try:
-        logging.getLogger("birdbot_logger").error(birdbot_logger.format_text(message))
-        if send_to_api and birdbot_logger.enable_remote_logging:
-            birdbot_logger.send_log_to_api(message, LoggingLevel.ERROR, log_error, log_notice)
+        birdbot_logger.send_log_to_api(
+            message, LoggingLevel.NOTICE, _ERROR_LOGGERS[LoggingLevel.NOTICE], log_notice, override_rate_limit=True, attach_recent=True
+        )
     except Exception as error:
         print(f"Error while logging: {error}")
+
+
+def get_stats() -> Dict[str, Any]:
+    """Returns a snapshot of the logger's counters, latencies and queue depths"""
+
+    _ensure_configured()
+    return birdbot_logger.get_stats()
+
+
+def upload_log_file(date: Optional[datetime] = None, start: int = 0, end: Optional[int] = None, path: Optional[str] = None) -> Optional[str]:
+    """Queues the log file for date, by default today's, or the file at path, to be uploaded to the API in the background,
+    from byte start up to end. Interrupted uploads resume where they stopped. Returns the path queued, or None if remote
+    logging is disabled"""
+
+    _ensure_configured()
+    return birdbot_logger.upload_log_file(date, start, end, path)
+
+
+def flush(timeout: Optional[float] = None) -> bool:
+    """Writes out held back repeats and waits for queued remote logs to be sent. Returns True if everything was sent
+    before the timeout"""
+
+    if not _configured:
+        return True
+    if birdbot_logger.log_coalescer is not None:
+        _write_summaries(birdbot_logger.log_coalescer.drain())
+
+    return birdbot_logger.flush(timeout)
+
+
+async def aflush(timeout: Optional[float] = None) -> bool:
+    """As flush, without blocking the running event loop. Also waits for records queued by the alog_* functions to be
+    sent"""
+
+    if not _configured:
+        return True
+    if birdbot_logger.log_coalescer is not None:
+        _write_summaries(birdbot_logger.log_coalescer.drain(), asynchronous=True)
+
+    return await birdbot_logger.flush_async(timeout)
+
+
+def shutdown() -> None:
+    """Writes out held back repeats, sends any queued remote logs and stops background delivery. Runs automatically at
+    interpreter exit"""
+
+    if not _configured:
+        return
+    if birdbot_logger.log_coalescer is not None:
+        _write_summaries(birdbot_logger.log_coalescer.drain())
+
+    birdbot_logger.shutdown()
+
+
+atexit.register(shutdown)
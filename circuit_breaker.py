@@ -0,0 +1,98 @@
+"""Circuit breaker for remote delivery, so an API that hangs or fails costs the logging call nothing once it is known to
+be down. After failure_threshold consecutive failures the circuit opens, and sends are skipped for a backoff that
+doubles with each failed probe, up to max_backoff, less a random jitter so devices that lost the API together don't
+retry together. Once it has passed, the circuit half-opens and a single send is let through as a probe. Its success
+closes the circuit, its failure opens it again."""
+
+import os
+import time
+import random
+import threading
+from enum import Enum
+from typing import Callable, Optional
+
+if os.getenv("STANDALONE", None) is not None:
+    from logger_config import CircuitConfig
+else:
+    from .logger_config import CircuitConfig  # type: ignore[no-redef]
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Callers ask allow() before each send, and report its outcome with record_success() or record_failure(). on_change
+    is called with the new state and the seconds it stays open for, 0 unless it opened"""
+
+    def __init__(self, config: CircuitConfig = CircuitConfig(), on_change: Optional[Callable[[CircuitState, float], None]] = None) -> None:
+        self.config = config
+        self.on_change = on_change
+
+        self.state = CircuitState.CLOSED
+        self.open_count = 0
+        self.short_circuited_count = 0
+
+        self._failures = 0
+        # Times in a row the circuit has opened without a successful send in between
+        self._consecutive_opens = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Returns True if a send may go ahead. While half open, only the probe gets True"""
+
+        if self.state == CircuitState.CLOSED:
+            return True
+
+        with self._lock:
+            # Closed meanwhile by another thread's send
+            if self.closed:
+                return True
+            now = time.monotonic()
+            if now < self._retry_at:
+                self.short_circuited_count += 1
+                return False
+            # A probe that is never reported is given up on after max_backoff, and another let through
+            self.state = CircuitState.HALF_OPEN
+            self._retry_at = now + self.config.max_backoff
+        self._changed(0)
+
+        return True
+
+    @property
+    def closed(self) -> bool:
+        return self.state == CircuitState.CLOSED
+
+    def record_success(self) -> None:
+        if self.state == CircuitState.CLOSED and not self._failures:
+            return
+
+        with self._lock:
+            changed = self.state != CircuitState.CLOSED
+            self.state = CircuitState.CLOSED
+            self._failures = 0
+            self._consecutive_opens = 0
+        if changed:
+            self._changed(0)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == CircuitState.OPEN or (self.state == CircuitState.CLOSED and self._failures < self.config.failure_threshold):
+                return
+
+            config = self.config
+            delay = min(config.max_backoff, config.backoff * 2**self._consecutive_opens)
+            delay *= 1 - config.jitter * random.random()
+            self.state = CircuitState.OPEN
+            self.open_count += 1
+            self._consecutive_opens += 1
+            self._retry_at = time.monotonic() + delay
+        self._changed(delay)
+
+    def _changed(self, open_for: float) -> None:
+        if self.on_change is not None:
+            self.on_change(self.state, open_for)
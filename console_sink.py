@@ -0,0 +1,125 @@
+"""Buffered, TTY-aware console output. Lines are collected and written to the stream in batches, with one flush per
+batch instead of one per record"""
+
+import os
+import sys
+import time
+import atexit
+import threading
+from typing import Dict, List, Optional, TextIO, Tuple
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_level import LoggingLevel
+    from log_record import LogRecord
+else:
+    from .logging_level import LoggingLevel  # type: ignore[no-redef]
+    from .log_record import LogRecord  # type: ignore[no-redef]
+
+NO_COLOUR_CODES = {level: ("", "") for level in LoggingLevel}
+
+
+def use_colour(stream: Optional[TextIO] = None) -> bool:
+    """Returns whether output to stream, sys.stdout by default, should be coloured: only if it is a TTY, and NO_COLOR
+    isn't set in the environment, see no-color.org"""
+
+    if os.getenv("NO_COLOR"):
+        return False
+    target = stream or sys.stdout
+    return hasattr(target, "isatty") and target.isatty()
+
+
+class ConsoleSink:
+    """Writes records to stream, sys.stdout by default. Records at flush_level and above are written straight away,
+    along with anything buffered before them. Lower levels are written once max_buffered_bytes are waiting, or by a
+    background flusher at most flush_interval seconds after they were logged. colour defaults to use_colour(stream), so
+    output piped into journald or a file has no ANSI codes. colour_codes maps each level to the ANSI prefix and
+    suffix put around its message. Unless buffered, every record is written straight away, without a flush."""
+
+    def __init__(
+        self,
+        colour_codes: Dict[LoggingLevel, Tuple[str, str]],
+        stream: Optional[TextIO] = None,
+        colour: Optional[bool] = None,
+        flush_level: LoggingLevel = LoggingLevel.WARNING,
+        flush_interval: float = 0.2,  # In seconds
+        max_buffered_bytes: int = 16 * 1024,
+        buffered: bool = True,
+    ) -> None:
+        self.stream = stream
+        self.buffered = buffered
+        self.flush_level = flush_level
+        self.flush_interval = flush_interval
+        self.max_buffered_bytes = max_buffered_bytes
+
+        if colour is None:
+            colour = use_colour(self.stream)
+        self.colour_codes = colour_codes if colour else NO_COLOUR_CODES
+
+        self._buffer: List[str] = []
+        self._buffered_bytes = 0
+        self._lock = threading.Lock()
+        self._flush_scheduled = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        # Dropped by close, so sinks that are replaced don't pile up until exit
+        atexit.register(self.flush)
+
+    def write(self, record: LogRecord) -> None:
+        prefix, suffix = self.colour_codes[record.logging_level]
+        line = f"{record.time_text}: {record.logging_level.name}: {prefix}{record.message}{suffix}"
+        if not self.buffered:
+            if self.stream is None:
+                print(line)
+            else:
+                print(line, file=self.stream)
+            return
+
+        line += "\n"
+
+        with self._lock:
+            self._buffer.append(line)
+            self._buffered_bytes += len(line)
+            if record.logging_level >= self.flush_level or self._buffered_bytes >= self.max_buffered_bytes:
+                self._write_buffer()
+                return
+
+        if not self._flush_scheduled.is_set():
+            self._schedule_flush()
+
+    def flush(self) -> None:
+        """Writes out anything buffered"""
+
+        with self._lock:
+            self._write_buffer()
+
+    def close(self) -> None:
+        """Writes out anything buffered, and drops the flush registered to run at interpreter exit"""
+
+        self.flush()
+        atexit.unregister(self.flush)
+
+    def _write_buffer(self) -> None:
+        """Writes the buffer as one write and one flush. Caller holds the lock"""
+
+        if not self._buffer:
+            return
+
+        # Looked up per batch so redirect_stdout and test patches are respected
+        stream = self.stream or sys.stdout
+        stream.write("".join(self._buffer))
+        stream.flush()
+        self._buffer.clear()
+        self._buffered_bytes = 0
+
+    def _schedule_flush(self) -> None:
+        self._flush_scheduled.set()
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._run_flusher, name="birdbot-console-flusher", daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self) -> None:
+        while True:
+            self._flush_scheduled.wait()
+            # Give the batch time to fill before writing it out
+            time.sleep(self.flush_interval)
+            self._flush_scheduled.clear()
+            self.flush()
@@ -0,0 +1,296 @@
+"""Fire-and-forget remote transport for high-volume records, such as INFO telemetry, for which an HTTP request per record
+costs too much. Records are packed several to a datagram, of up to max_packet_size bytes, which over UDP by default
+fits an Ethernet MTU without fragmenting, and sent over UDP or a Unix datagram socket without waiting for any acknowledgement.
+A packet goes when the next record wouldn't fit in it, or at the next flush, every flush_interval. The records in a
+packet that is lost are lost, so anything that must arrive should go over HTTP.
+
+A packet is a header of magic, version and the device id's length, then the device id, then the records one after
+another, each a record header then the message as UTF-8. Messages too long for one packet are cut short.
+"""
+
+import os
+import socket
+import struct
+import threading
+from typing import Callable, List, NamedTuple, Optional, Tuple, Union
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_level import LoggingLevel
+else:
+    from .logging_level import LoggingLevel  # type: ignore[no-redef]
+
+# magic, version, device id length
+PACKET_HEADER = struct.Struct(">2sBB")
+# created (seconds since epoch), level, message length
+RECORD_HEADER = struct.Struct(">dBH")
+MAGIC = b"BL"
+VERSION = 1
+# A 1500 byte Ethernet MTU less the IPv4 and UDP headers
+UDP_PACKET_SIZE = 1472
+# Unix sockets have no MTU, and every packet costs a slot in the receiver's queue, so they take fuller ones
+UNIX_PACKET_SIZE = 16 * 1024
+# Largest packet the receiver takes
+MAX_PACKET_SIZE = 64 * 1024
+
+Address = Union[str, Tuple[str, int]]
+
+
+class DatagramRecord(NamedTuple):
+    device_id: str
+    logging_level: LoggingLevel
+    message: str
+    created: float  # Seconds since epoch
+
+
+def parse_address(address: str) -> Tuple[int, Address]:
+    """Returns the socket family and address for "udp://host:port" or "unix:///path/to/socket" """
+
+    if address.startswith("unix://"):
+        return socket.AF_UNIX, address.removeprefix("unix://")
+    if address.startswith("udp://"):
+        host, _, port = address.removeprefix("udp://").rpartition(":")
+        return socket.AF_INET, (host, int(port))
+    raise ValueError(f"Unsupported datagram address {address!r}, expected udp://host:port or unix:///path")
+
+
+def decode_packet(data: bytes) -> List[DatagramRecord]:
+    """Raises ValueError or struct.error if data isn't a whole packet"""
+
+    magic, version, device_id_length = PACKET_HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a version {VERSION} log packet")
+    start = PACKET_HEADER.size
+    offset = start + device_id_length
+    device_id = data[start:offset].decode("utf-8", "replace")
+
+    records = []
+    while offset < len(data):
+        created, logging_level, length = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        offset = start + length
+        if offset > len(data):
+            raise ValueError("Log packet cut short")
+        records.append(DatagramRecord(device_id, LoggingLevel(logging_level), data[start:offset].decode("utf-8", "replace"), created))
+
+    return records
+
+
+class _Packet:
+    """The packet being filled with records for device_id, up to max_packet_size bytes"""
+
+    def __init__(self, device_id: str, max_packet_size: int) -> None:
+        self.max_packet_size = max_packet_size
+
+        device = device_id.encode("utf-8")[:255]
+        self.header = PACKET_HEADER.pack(MAGIC, VERSION, len(device)) + device
+        # Longest message that fits in a packet on its own
+        self.max_message = max_packet_size - len(self.header) - RECORD_HEADER.size
+        if self.max_message <= 0:
+            raise ValueError(f"max_packet_size of {max_packet_size} leaves no room for records")
+        self.data = bytearray(self.header)
+        # Messages cut short to fit a packet. Counted under the transport's lock
+        self.truncated_count = 0
+
+    def encode(self, message: str) -> Tuple[bytes, bool]:
+        """Returns message as UTF-8, cut short to fit a packet, and whether it was. Needs no lock"""
+
+        data = message.encode("utf-8", "replace")
+        if len(data) > self.max_message:
+            return data[: self.max_message], True
+        return data, False
+
+    def fits(self, data: bytes) -> bool:
+        return len(self.data) + RECORD_HEADER.size + len(data) <= self.max_packet_size
+
+    def add(self, logging_level: LoggingLevel, data: bytes, created: float) -> None:
+        self.data += RECORD_HEADER.pack(created, logging_level, len(data))
+        self.data += data
+
+    @property
+    def empty(self) -> bool:
+        return len(self.data) == len(self.header)
+
+    def take(self) -> bytearray:
+        """Returns the packet, and starts the next"""
+
+        packet = self.data
+        self.data = bytearray(self.header)
+        return packet
+
+
+class DatagramTransport:
+    """Packs records for device_id into packets and sends them to address, see parse_address. Safe to use from several
+    threads. send never blocks or raises: packets the socket won't take are counted in send_failures and dropped"""
+
+    def __init__(self, address: str, device_id: str, max_packet_size: Optional[int] = None, flush_interval: float = 0.05) -> None:
+        family, self.address = parse_address(address)
+        if isinstance(self.address, tuple):
+            self.address = self._resolve(*self.address)
+        if max_packet_size is None:
+            max_packet_size = UNIX_PACKET_SIZE if family == socket.AF_UNIX else UDP_PACKET_SIZE
+        self.flush_interval = flush_interval  # In seconds
+
+        self.records_sent = 0
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        # Packets dropped because the socket wouldn't take them
+        self.send_failures = 0
+
+        self._packet = _Packet(device_id, max_packet_size)
+        self._lock = threading.Lock()
+
+        self._socket = socket.socket(family, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _resolve(host: str, port: int) -> Tuple[str, int]:
+        """Looks the host up once, so sendto doesn't for every packet. If it can't be yet, sendto keeps trying and the
+        packets it can't send are counted in send_failures"""
+
+        try:
+            address = socket.getaddrinfo(host, port, socket.AF_INET, socket.SOCK_DGRAM)[0][4]
+        except OSError:
+            return host, port
+        return str(address[0]), int(address[1])
+
+    @property
+    def truncated_count(self) -> int:
+        """Messages cut short to fit a packet"""
+
+        return self._packet.truncated_count
+
+    def send(self, logging_level: LoggingLevel, message: str, created: float) -> None:
+        packet = self._packet
+        data, truncated = packet.encode(message)
+
+        with self._lock:
+            if truncated:
+                packet.truncated_count += 1
+            if not packet.fits(data):
+                self._send_packet()
+            packet.add(logging_level, data, created)
+            self.records_sent += 1
+
+        if self._flusher is None:
+            self._start_flusher()
+
+    def flush(self) -> None:
+        """Sends the packet being filled, if it has any records"""
+
+        with self._lock:
+            if not self._packet.empty:
+                self._send_packet()
+
+    def _send_packet(self) -> None:
+        """Called with the lock held"""
+
+        packet = self._packet.take()
+        try:
+            self._socket.sendto(packet, self.address)
+        except OSError:
+            # No receiver, or its buffer is full. Either way the packet is lost
+            self.send_failures += 1
+        else:
+            self.packets_sent += 1
+            self.bytes_sent += len(packet)
+
+    def _start_flusher(self) -> None:
+        with self._lock:
+            if self._flusher is not None or self._stop.is_set():
+                return
+            self._flusher = threading.Thread(target=self._flush_periodically, name="birdbot-datagram-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_periodically(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        """Sends the packet being filled and closes the socket"""
+
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        self._socket.close()
+
+
+class DatagramReceiver:
+    """Small local receiver, for tests and benchmarks. Binds address, where a UDP port of 0 picks a free one, and on a
+    background thread hands each record received to handle, or keeps it in records if there is no handle"""
+
+    def __init__(self, address: str, handle: Optional[Callable[[DatagramRecord], None]] = None, buffer_bytes: int = 4 * 1024 * 1024) -> None:
+        self.family, bind_address = parse_address(address)
+        self.handle = handle if handle is not None else self._keep
+
+        self.records: List[DatagramRecord] = []
+        self.packet_count = 0
+        self.malformed_count = 0
+
+        self._stopping = False
+        self._socket = socket.socket(self.family, socket.SOCK_DGRAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, buffer_bytes)
+        if self.family == socket.AF_UNIX and os.path.exists(str(bind_address)):
+            os.unlink(str(bind_address))
+        self._socket.bind(bind_address)
+        self._thread = threading.Thread(target=self._run, name="birdbot-datagram-receiver", daemon=True)
+
+    @property
+    def address(self) -> str:
+        """The address bound, as passed to DatagramTransport"""
+
+        if self.family == socket.AF_UNIX:
+            return f"unix://{self._socket.getsockname()}"
+        host, port = self._socket.getsockname()[:2]
+        return f"udp://{host}:{port}"
+
+    def _keep(self, record: DatagramRecord) -> None:
+        self.records.append(record)
+
+    def start(self) -> "DatagramReceiver":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while True:
+            try:
+                data = self._socket.recv(MAX_PACKET_SIZE)
+            except OSError:
+                return
+            # close() wakes the thread with an empty datagram, queued behind any packets still to be handled
+            if not data and self._stopping:
+                return
+
+            try:
+                records = decode_packet(data)
+            except (struct.error, ValueError):
+                self.malformed_count += 1
+                continue
+
+            self.packet_count += 1
+            for record in records:
+                self.handle(record)
+
+    def close(self) -> None:
+        """Handles the packets already received, then stops and, for a Unix socket, removes it"""
+
+        self._stopping = True
+        name = self._socket.getsockname()
+        if self._thread.is_alive():
+            with socket.socket(self.family, socket.SOCK_DGRAM) as waker:
+                try:
+                    waker.sendto(b"", name)
+                except OSError:
+                    pass
+            self._thread.join()
+        self._socket.close()
+        if self.family == socket.AF_UNIX and os.path.exists(name):
+            os.unlink(name)
+
+    def __enter__(self) -> "DatagramReceiver":
+        return self.start()
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
@@ -0,0 +1,112 @@
+"""Grouping of logged exceptions by fingerprint, so a crash loop logs its traceback once per window rather than on every
+iteration. The fingerprint hashes the exception's type and its frames, each reduced to file name, function and line,
+for the exception and any it was raised from or while handling. Directories are left out, so the same fault groups
+together on devices with different install paths, and so is the message, which often carries values that vary. The
+formatted traceback is kept with the group, so it is only formatted once however often the exception recurs."""
+
+import os
+import time
+import threading
+import traceback
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple, Optional, Set
+
+
+class CapturedException(NamedTuple):
+    fingerprint: str
+    summary: str  # The last line of the traceback, "<type>: <message>"
+    traceback: Optional[str]  # Only for the first occurrence in a window
+    occurrences: int  # In the window, including this one
+    window_start: float  # Seconds since epoch
+
+    def format_message(self, message: str = "") -> str:
+        prefix = f"{message}: " if message else ""
+        if self.traceback is not None:
+            return f"{prefix}exception {self.fingerprint}\n{self.traceback}"
+        since = datetime.fromtimestamp(self.window_start).strftime("%H:%M:%S")
+        return f"{prefix}{self.summary} (exception {self.fingerprint}, {self.occurrences} times since {since})"
+
+    def format_summary(self, message: str = "") -> str:
+        """As format_message, but one line without the traceback even for the first occurrence"""
+
+        if self.traceback is None:
+            return self.format_message(message)
+        prefix = f"{message}: " if message else ""
+        return f"{prefix}{self.summary} (exception {self.fingerprint})"
+
+
+def fingerprint(exception: BaseException) -> str:
+    # Imported here, as loading OpenSSL would add a few ms to importing the logger
+    import hashlib  # pylint: disable=import-outside-toplevel
+
+    digest = hashlib.blake2b(digest_size=6)
+    seen: Set[int] = set()
+    current: Optional[BaseException] = exception
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        exception_type = type(current)
+        digest.update(f"{exception_type.__module__}.{exception_type.__qualname__}".encode())
+        frame = current.__traceback__
+        while frame is not None:
+            code = frame.tb_frame.f_code
+            digest.update(f"|{os.path.basename(code.co_filename)}:{code.co_name}:{frame.tb_lineno}".encode())
+            frame = frame.tb_next
+        current = current.__cause__ or (None if current.__suppress_context__ else current.__context__)
+
+    return digest.hexdigest()
+
+
+class _Group:
+    __slots__ = ("traceback", "window_start", "count")
+
+    def __init__(self, formatted: str, now: float) -> None:
+        self.traceback = formatted
+        self.window_start = now
+        self.count = 1
+
+
+class ExceptionGrouper:
+    """Tracks the exceptions seen in the last window seconds by fingerprint. The first occurrence in a window is captured
+    with its traceback, later ones with a count. At most max_entries groups are kept, least recently seen evicted first"""
+
+    def __init__(self, window: float = 3600.0, max_entries: int = 256) -> None:
+        self.window = window  # In seconds
+        self.max_entries = max_entries
+
+        # Tracebacks formatted, and occurrences logged without one
+        self.formatted_count = 0
+        self.repeat_count = 0
+        self._groups: "OrderedDict[str, _Group]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def capture(self, exception: BaseException) -> CapturedException:
+        key = fingerprint(exception)
+        summary = traceback.format_exception_only(type(exception), exception)[-1].strip()
+        now = time.time()
+
+        with self._lock:
+            group = self._groups.get(key)
+            if group is not None:
+                self._groups.move_to_end(key)
+                if now - group.window_start < self.window:
+                    group.count += 1
+                    self.repeat_count += 1
+                    return CapturedException(key, summary, None, group.count, group.window_start)
+                group.window_start = now
+                group.count = 1
+                return CapturedException(key, summary, group.traceback, 1, now)
+
+        # Formatted outside the lock, as it reads source files. Two threads may both format a new group, which is harmless
+        formatted = "".join(traceback.format_exception(type(exception), exception, exception.__traceback__)).rstrip()
+        with self._lock:
+            self.formatted_count += 1
+            self._groups[key] = _Group(formatted, now)
+            if len(self._groups) > self.max_entries:
+                self._groups.popitem(last=False)
+
+        return CapturedException(key, summary, formatted, 1, now)
+
+    @property
+    def group_count(self) -> int:
+        return len(self._groups)
@@ -0,0 +1,287 @@
+"""Asynchronous buffered log file writer. Records are queued to a dedicated thread which writes them in large batches,
+so slow storage (e.g. SD cards) never stalls the thread that logged.
+
+Durability by level:
+    DEBUG to WARNING: in the OS within flush_interval seconds, or sooner once flush_bytes are waiting. Lost if the
+    process dies before then.
+    ERROR: flushed to the OS as soon as the writer wakes, along with everything logged before it, and fsynced if
+    fsync_on_error is set. With block_on_error the log call also waits until that has happened.
+
+Records the file won't take, e.g. because the disk is full, are lost and counted in write_errors. The writer carries on
+and writes the records after them once the file takes them again.
+"""
+
+import os
+import atexit
+import threading
+from collections import deque
+from typing import BinaryIO, Callable, Deque, List, NamedTuple, Optional, Tuple, Union
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_level import LoggingLevel
+    from log_record import LogRecord
+    from log_format import encode_text
+    from log_index import LogIndexWriter
+    from logger_config import FileConfig
+else:
+    from .logging_level import LoggingLevel  # type: ignore[no-redef]
+    from .log_record import LogRecord  # type: ignore[no-redef]
+    from .log_format import encode_text  # type: ignore[no-redef]
+    from .log_index import LogIndexWriter  # type: ignore[no-redef]
+    from .logger_config import FileConfig  # type: ignore[no-redef]
+
+
+class _Reopen(NamedTuple):
+    """Queued between records to switch files at exactly that point in the stream"""
+
+    path: str
+    on_closed: Optional[Callable[[], None]] = None
+
+
+class _PendingWrites:
+    """What is queued for the writer thread, and why it should wake. Used under the writer's condition"""
+
+    def __init__(self) -> None:
+        self.entries: Deque[Union[bytes, _Reopen]] = deque()
+        self.bytes = 0
+        # Sequence number of the last record queued
+        self.queued_seq = 0
+        self.error_pending = False
+        self.flush_requested = False
+
+    def take(self) -> Tuple[List[Union[bytes, _Reopen]], int, bool]:
+        """Empties the queue. Returns what was in it, the sequence number of its last record and whether it held an
+        error"""
+
+        batch = list(self.entries)
+        self.entries.clear()
+        self.bytes = 0
+        urgent = self.error_pending
+        self.error_pending = False
+        self.flush_requested = False
+
+        return batch, self.queued_seq, urgent
+
+
+class _LogFile:
+    """The file the writer thread appends to. A write after a failure reopens it, so the writer carries on once the file
+    takes records again. on_error is called when a write fails after the last one succeeded"""
+
+    def __init__(self, path: str, buffering: int, on_error: Optional[Callable[[str], None]]) -> None:
+        self.path = path
+        self.buffering = buffering
+        self.on_error = on_error
+
+        self.write_errors = 0
+        self.records_written = 0
+        self.bytes_written = 0
+        # Set from a failed write until one succeeds, so a failing disk is reported once rather than for every batch
+        self.failing = False
+        self.stream = self._open(path)
+
+    def _open(self, path: str) -> BinaryIO:
+        return open(path, "ab", buffering=self.buffering)  # pylint: disable=consider-using-with
+
+    def write(self, chunk: List[bytes]) -> None:
+        if not chunk:
+            return
+        data = b"".join(chunk)
+        try:
+            if self.stream.closed:
+                self.stream = self._open(self.path)
+            self.stream.write(data)
+        except OSError as error:
+            self.failed(error)
+            return
+        self.records_written += len(chunk)
+        self.bytes_written += len(data)
+
+    def switch(self, reopen: _Reopen) -> None:
+        """Closes the file, calls on_closed, then opens the new path. A failure to open is retried by the next write"""
+
+        self.close()
+        if reopen.on_closed is not None:
+            reopen.on_closed()
+        self.path = reopen.path
+        try:
+            self.stream = self._open(reopen.path)
+        except OSError as error:
+            self.failed(error)
+
+    def flush(self, fsync: bool) -> None:
+        try:
+            if not self.stream.closed:
+                self.stream.flush()
+                if fsync:
+                    os.fsync(self.stream.fileno())
+        except OSError as error:
+            self.failed(error)
+
+    def close(self) -> None:
+        try:
+            self.stream.close()
+        except OSError as error:
+            self.failed(error)
+
+    def failed(self, error: OSError) -> None:
+        self.write_errors += 1
+        if self.failing:
+            return
+        self.failing = True
+        if self.on_error is not None:
+            self.on_error(f"Failed to write log file {self.path}: {error}")
+
+
+class AsyncFileWriter:
+    """Appends records to path from a background thread, encoded by encode (the text format by default). Records beyond
+    config.max_queue_size waiting to be written are dropped, except errors, and counted in dropped_count. If index is
+    set, records are noted in it in the order they are queued. on_error is called, from the writer thread, when a write
+    fails after the last one succeeded"""
+
+    def __init__(
+        self,
+        path: str,
+        config: FileConfig = FileConfig(),
+        encode: Callable[[LogRecord], bytes] = encode_text,
+        index: Optional[LogIndexWriter] = None,
+        on_error: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.path = path
+        self.config = config
+        self.encode = encode
+        self.index = index
+
+        self.dropped_count = 0
+
+        self._pending = _PendingWrites()
+        # Sequence number of the last record flushed to the OS
+        self._flushed_seq = 0
+        self._condition = threading.Condition()
+        self._stopping = False
+
+        self._file = _LogFile(path, max(config.flush_bytes, 8192), on_error)
+        self._worker = threading.Thread(target=self._run, name="birdbot-file-writer", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def write(self, record: LogRecord) -> None:
+        """Queues a record. Only waits if it is an error and block_on_error is set"""
+
+        data = self.encode(record)
+        is_error = record.logging_level >= LoggingLevel.ERROR
+        pending = self._pending
+
+        with self._condition:
+            if len(pending.entries) >= self.config.max_queue_size and not is_error:
+                self.dropped_count += 1
+                return
+
+            pending.entries.append(data)
+            pending.bytes += len(data)
+            pending.queued_seq += 1
+            if self.index is not None:
+                self.index.note(record.created, len(data))
+
+            if is_error:
+                pending.error_pending = True
+                self._condition.notify_all()
+                # The writer thread itself can log an error, through on_error, and mustn't wait for itself
+                if self.config.block_on_error and threading.current_thread() is not self._worker:
+                    sequence = pending.queued_seq
+                    while self._flushed_seq < sequence and self._worker.is_alive():
+                        self._condition.wait(self.config.flush_interval)
+            elif len(pending.entries) == 1 or pending.bytes >= self.config.flush_bytes:
+                # The first record starts the flush interval, and a full buffer ends it early
+                self._condition.notify_all()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending.entries)
+
+    @property
+    def write_errors(self) -> int:
+        return self._file.write_errors
+
+    @property
+    def records_written(self) -> int:
+        return self._file.records_written
+
+    @property
+    def bytes_written(self) -> int:
+        return self._file.bytes_written
+
+    def reopen(self, path: str, on_closed: Optional[Callable[[], None]] = None) -> None:
+        """Switches to path for records written from now on. The writer thread closes the current file once everything
+        queued before this call is written to it, then calls on_closed"""
+
+        with self._condition:
+            self.path = path
+            self._pending.entries.append(_Reopen(path, on_closed))
+            if self.index is not None:
+                self.index.reopen(path)
+            self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until everything queued so far is flushed to the OS. Returns False on timeout"""
+
+        with self._condition:
+            sequence = self._pending.queued_seq
+            self._pending.flush_requested = True
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: self._flushed_seq >= sequence or not self._worker.is_alive(), timeout)
+
+    def close(self) -> None:
+        """Writes out everything queued, then closes the file and stops the writer thread"""
+
+        with self._condition:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._condition.notify_all()
+        self._worker.join()
+        atexit.unregister(self.close)
+
+    def _write_batch(self, batch: List[Union[bytes, _Reopen]]) -> None:
+        """Writes queued records with as few writes as possible, switching files where a reopen was queued"""
+
+        chunk: List[bytes] = []
+        for entry in batch:
+            if isinstance(entry, bytes):
+                chunk.append(entry)
+                continue
+
+            self._file.write(chunk)
+            chunk = []
+            self._file.switch(entry)
+        self._file.write(chunk)
+
+    def _flush_due(self) -> bool:
+        pending = self._pending
+        return pending.error_pending or pending.flush_requested or self._stopping or pending.bytes >= self.config.flush_bytes
+
+    def _run(self) -> None:
+        pending = self._pending
+        while True:
+            with self._condition:
+                while not pending.entries and not pending.flush_requested and not self._stopping:
+                    self._condition.wait()
+                # Then until there is a batch worth writing, an error, or the interval is up
+                self._condition.wait_for(self._flush_due, self.config.flush_interval)
+
+                batch, sequence, urgent = pending.take()
+                stopping = self._stopping
+
+            write_errors = self._file.write_errors
+            self._write_batch(batch)
+            self._file.flush(urgent and self.config.fsync_on_error)
+            if batch and self._file.write_errors == write_errors:
+                self._file.failing = False
+
+            # Records that failed count as done, so nothing waits on them
+            with self._condition:
+                self._flushed_seq = sequence
+                self._condition.notify_all()
+
+            if stopping:
+                self._file.close()
+                return
@@ -0,0 +1,100 @@
+"""In-memory flight recorder: a fixed-size ring of the most recent log calls at every level, including DEBUG lines that
+are not written anywhere. A snapshot is attached to errors sent to the API, so the server sees what led up to them.
+
+Recording stores each call in a preallocated slot without taking a lock or rendering the message. A %-format string
+is kept with its args for rendering when a snapshot is taken, but only args that are immutable and hold no references,
+such as numbers and strings. Others are replaced by their repr, so later changes to them don't show and the ring never
+keeps them alive. Callable messages are never called, as they may be costly or have side effects, so only their name
+is kept. Text is cut to max_message_length as it is recorded, so the ring holds at most capacity slots of a small tuple
+and a few bounded strings each.
+"""
+
+import os
+import time
+import itertools
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_level import LoggingLevel
+else:
+    from .logging_level import LoggingLevel  # type: ignore[no-redef]
+
+# (sequence, created, logging_level, message, args)
+_Entry = Tuple[int, float, LoggingLevel, str, Tuple[Any, ...]]
+
+# Args of these exact types are kept as they are. Anything else is kept as its repr
+_KEPT_TYPES = frozenset((str, int, float, bool, bytes, type(None)))
+
+
+class FlightRecorder:
+    """Keeps the last capacity log calls at level and above"""
+
+    def __init__(self, capacity: int = 256, level: LoggingLevel = LoggingLevel.DEBUG, max_message_length: int = 1000) -> None:
+        self.capacity = capacity
+        self.level = level
+        self.max_message_length = max_message_length
+
+        self._slots: List[Optional[_Entry]] = [None] * capacity
+        # next() on itertools.count is atomic, so threads never share a slot without a lock
+        self._sequence = itertools.count()
+
+    def record(self, logging_level: LoggingLevel, message: Any, args: Tuple[Any, ...] = ()) -> None:
+        """Stores a log call, see the module docstring for what is kept of message and args"""
+
+        if not isinstance(message, str):
+            message, args = self._describe(message), ()
+        elif len(message) > self.max_message_length:
+            message = self._cut(message)
+        # Usually all kept, so checked before building a new tuple
+        for arg in args:
+            if type(arg) not in _KEPT_TYPES:
+                # A list is built faster than tuple() consumes a generator, and this runs on the logging call
+                args = tuple([arg if type(arg) in _KEPT_TYPES else self._repr(arg) for arg in args])  # pylint: disable=consider-using-generator
+                break
+
+        sequence = next(self._sequence)
+        self._slots[sequence % self.capacity] = (sequence, time.time(), logging_level, message, args)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Returns the recorded calls, oldest first, in the same shape as records sent to the API"""
+
+        entries = [entry for entry in list(self._slots) if entry is not None]
+        entries.sort(key=itemgetter(0))
+
+        return [
+            {
+                "log_timestamp": round(created * 1000),
+                "log_level": logging_level.name,
+                "log_message": self._render(message, args),
+            }
+            for _, created, logging_level, message, args in entries
+        ]
+
+    def clear(self) -> None:
+        self._slots[:] = [None] * self.capacity
+
+    def _cut(self, text: str) -> str:
+        return text[: self.max_message_length] + "..." if len(text) > self.max_message_length else text
+
+    def _describe(self, message: Any) -> str:
+        if callable(message):
+            return f"<deferred message from {getattr(message, '__qualname__', type(message).__name__)}>"
+        try:
+            return self._cut(str(message))
+        except Exception as error:  # pylint: disable=broad-except
+            return self._cut(f"<message could not be rendered: {error}>")
+
+    def _repr(self, value: Any) -> str:
+        try:
+            return self._cut(repr(value))
+        except Exception as error:  # pylint: disable=broad-except
+            return f"<{type(value).__name__} could not be rendered: {error}>"
+
+    def _render(self, message: str, args: Tuple[Any, ...]) -> str:
+        if not args:
+            return message
+        try:
+            return self._cut(message % args)
+        except (TypeError, ValueError, KeyError) as error:
+            return self._cut(f"<message could not be rendered: {error}>")
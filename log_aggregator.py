@@ -0,0 +1,213 @@
+"""Aggregation of log records from several processes on one device. Client processes send each record as one datagram
+over a local Unix socket to a single collector process, which owns the log file, the console and the API, so records
+from every process are written whole and share one rate limiter.
+
+A datagram is a record header, then the source name and the message as UTF-8. Datagrams are never split or merged, so
+no framing is needed, and a send either delivers the whole record or fails. A client whose collector is gone, or whose
+send times out because the collector is behind, reports the failure so the caller can write the record locally, and
+only tries the collector again after retry_interval.
+"""
+
+import os
+import time
+import errno
+import socket
+import struct
+import threading
+from typing import Callable, NamedTuple, Optional
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_level import LoggingLevel
+else:
+    from .logging_level import LoggingLevel  # type: ignore[no-redef]
+
+# created (seconds since epoch), level, send_to_api, source name length
+DATAGRAM_HEADER = struct.Struct(">dBBH")
+# Larger records are refused by the client and written locally
+MAX_DATAGRAM_SIZE = 64 * 1024
+
+
+class AggregatedRecord(NamedTuple):
+    logging_level: LoggingLevel
+    message: str
+    created: float  # Seconds since epoch, in the client process
+    send_to_api: bool
+    source: str  # Name of the client process, may be empty
+
+
+def encode_datagram(logging_level: LoggingLevel, message: str, created: float, send_to_api: bool, source: bytes = b"") -> bytes:
+    return DATAGRAM_HEADER.pack(created, logging_level, send_to_api, len(source)) + source + message.encode("utf-8", "replace")
+
+
+def decode_datagram(data: bytes) -> AggregatedRecord:
+    created, logging_level, send_to_api, source_length = DATAGRAM_HEADER.unpack_from(data)
+    source_start = DATAGRAM_HEADER.size
+    source_end = source_start + source_length
+    return AggregatedRecord(
+        LoggingLevel(logging_level),
+        data[source_end:].decode("utf-8", "replace"),
+        created,
+        bool(send_to_api),
+        data[source_start:source_end].decode("utf-8", "replace"),
+    )
+
+
+class AggregatorClient:
+    """Sends records to the collector listening on socket_path, tagged with source. Safe to use from several threads.
+    send_timeout and retry_interval are in seconds"""
+
+    def __init__(self, socket_path: str, source: str = "", send_timeout: float = 0.1, retry_interval: float = 1.0) -> None:
+        self.socket_path = socket_path
+        self.source = source.encode("utf-8")
+        self.send_timeout = send_timeout
+        self.retry_interval = retry_interval
+
+        self.fallback_count = 0
+
+        self._socket: Optional[socket.socket] = None
+        self._retry_at = 0.0  # time.monotonic() after which a failed collector is tried again
+        # Only taken to connect, disconnect and count fallbacks. Sends on a connected socket don't need it
+        self._lock = threading.Lock()
+
+    def send(self, logging_level: LoggingLevel, message: str, created: float, send_to_api: bool) -> bool:
+        """Sends one record. Returns False if the collector didn't take it, and the caller should write it locally"""
+
+        client = self._socket
+        if client is None:
+            # Checked before encoding, so falling back while the collector is gone costs little
+            if time.monotonic() < self._retry_at:
+                return self._fall_back()
+            with self._lock:
+                client = self._socket if self._socket is not None else self._connect()
+            if client is None:
+                return self._fall_back()
+
+        data = encode_datagram(logging_level, message, created, send_to_api, self.source)
+        if len(data) > MAX_DATAGRAM_SIZE:
+            return self._fall_back()
+
+        try:
+            client.send(data)
+        except OSError as error:
+            # On EMSGSIZE the collector is still there, it just can't take this record
+            if error.errno != errno.EMSGSIZE:
+                with self._lock:
+                    if self._socket is client:
+                        self._disconnect()
+            return self._fall_back()
+
+        return True
+
+    def _fall_back(self) -> bool:
+        with self._lock:
+            self.fallback_count += 1
+        return False
+
+    def _connect(self) -> Optional[socket.socket]:
+        if time.monotonic() < self._retry_at:
+            return None
+
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        client.settimeout(self.send_timeout)
+        try:
+            client.connect(self.socket_path)
+        except OSError:
+            client.close()
+            self._retry_at = time.monotonic() + self.retry_interval
+            return None
+
+        self._socket = client
+        return client
+
+    def _disconnect(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        self._retry_at = time.monotonic() + self.retry_interval
+
+    @property
+    def connected(self) -> bool:
+        return self._socket is not None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._socket is not None:
+                self._socket.close()
+                self._socket = None
+
+
+def _listening(socket_path: str) -> bool:
+    """Returns whether a socket is bound to socket_path. Connecting to one left behind by a process that has gone is
+    refused"""
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+class LogCollector:
+    """Receives records from clients on socket_path and hands each to handle, on a background thread. A stale socket
+    left by a collector that didn't shut down is replaced, but raises OSError with EADDRINUSE if another collector is
+    still listening on it"""
+
+    def __init__(self, socket_path: str, handle: Callable[[AggregatedRecord], None], on_error: Optional[Callable[[str], None]] = None) -> None:
+        self.socket_path = socket_path
+        self.handle = handle
+        self.on_error = on_error
+
+        self.received_count = 0
+
+        self._stopping = False
+        if os.path.exists(socket_path):
+            if _listening(socket_path):
+                raise OSError(errno.EADDRINUSE, "Another log collector is listening on the aggregator socket", socket_path)
+            os.unlink(socket_path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(socket_path)
+        self._thread = threading.Thread(target=self._run, name="birdbot-log-collector", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                data = self._socket.recv(MAX_DATAGRAM_SIZE)
+            except OSError:
+                return
+            # close() wakes the thread with an empty datagram, queued behind any records still to be handled
+            if not data and self._stopping:
+                return
+
+            try:
+                record = decode_datagram(data)
+            except (struct.error, ValueError):
+                if self.on_error is not None:
+                    self.on_error(f"Discarded malformed log record of {len(data)} bytes from aggregator socket")
+                continue
+
+            self.received_count += 1
+            # A failing sink mustn't stop the collector for every other process
+            try:
+                self.handle(record)
+            except Exception as error:  # pylint: disable=broad-except
+                if self.on_error is not None:
+                    self.on_error(f"Error while handling aggregated log record: {error}")
+
+    def close(self) -> None:
+        """Handles the records already received, then stops and removes the socket"""
+
+        self._stopping = True
+        if self._thread.is_alive():
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as waker:
+                try:
+                    waker.sendto(b"", self.socket_path)
+                except OSError:
+                    pass
+            self._thread.join()
+        self._socket.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
@@ -0,0 +1,118 @@
+"""Coalesces exact repeats of a log message, so a failing sensor logging the same error thousands of times a minute
+produces one record per window with a repeat count instead of thousands of console, file and API writes."""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, NamedTuple, Tuple
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_level import LoggingLevel
+else:
+    from .logging_level import LoggingLevel  # type: ignore[no-redef]
+
+
+class RepeatSummary(NamedTuple):
+    """A run of held back repeats of one message"""
+
+    logging_level: LoggingLevel
+    message: str
+    repeats: int
+    first_ts: float  # Seconds since epoch of the first held back repeat
+    last_ts: float  # Seconds since epoch of the last held back repeat
+    send_to_api: bool
+
+    def format_message(self) -> str:
+        first = datetime.fromtimestamp(self.first_ts).strftime("%d-%m-%Y %H:%M:%S")
+        last = datetime.fromtimestamp(self.last_ts).strftime("%d-%m-%Y %H:%M:%S")
+        return f"Last message repeated {self.repeats} times between {first} and {last}: {self.message}"
+
+
+class _Run:
+    __slots__ = ("window_start", "first_ts", "last_ts", "count", "send_to_api")
+
+    def __init__(self, now: float, send_to_api: bool) -> None:
+        self.window_start = now
+        self.first_ts = now
+        self.last_ts = now
+        self.count = 0
+        self.send_to_api = send_to_api
+
+
+class LogCoalescer:
+    """Tracks recently seen (level, message) pairs. The first occurrence is emitted as normal, repeats within window
+    seconds of it are held back and counted, and a RepeatSummary is produced when the window closes, when the message
+    goes quiet, or when the pair is evicted. At most max_entries pairs are tracked, least recently seen evicted first."""
+
+    def __init__(self, window: float = 60.0, max_entries: int = 1024) -> None:
+        self.window = window  # In seconds
+        self.max_entries = max_entries
+
+        self.held_back_count = 0
+        self._runs: "OrderedDict[Tuple[LoggingLevel, str], _Run]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def admit(self, logging_level: LoggingLevel, message: str, send_to_api: bool = False) -> Tuple[bool, List[RepeatSummary]]:
+        """Returns whether this record should be emitted now, and any summaries that are due and should be emitted
+        before it"""
+
+        now = time.time()
+        key = (logging_level, message)
+        summaries: List[RepeatSummary] = []
+
+        with self._lock:
+            self._expire(now, summaries)
+
+            run = self._runs.get(key)
+            if run is not None:
+                self._runs.move_to_end(key)
+                if run.count == 0:
+                    run.first_ts = now
+                run.count += 1
+                run.last_ts = now
+                run.send_to_api = run.send_to_api or send_to_api
+                self.held_back_count += 1
+
+                # Repeats that never stop still get reported once per window
+                if now - run.window_start >= self.window:
+                    summaries.append(self._summarise(key, run))
+                    run.window_start = now
+                    run.count = 0
+
+                return False, summaries
+
+            if len(self._runs) >= self.max_entries:
+                evicted_key, evicted_run = self._runs.popitem(last=False)
+                if evicted_run.count:
+                    summaries.append(self._summarise(evicted_key, evicted_run))
+
+            self._runs[key] = _Run(now, send_to_api)
+
+        return True, summaries
+
+    def _expire(self, now: float, summaries: List[RepeatSummary]) -> None:
+        """Drops runs that have been quiet for a whole window. Runs are kept least recently seen first, so this stops at
+        the first one that is still active"""
+
+        while self._runs:
+            key, run = next(iter(self._runs.items()))
+            if now - run.last_ts < self.window:
+                return
+            del self._runs[key]
+            if run.count:
+                summaries.append(self._summarise(key, run))
+
+    @staticmethod
+    def _summarise(key: Tuple[LoggingLevel, str], run: _Run) -> RepeatSummary:
+        return RepeatSummary(key[0], key[1], run.count, run.first_ts, run.last_ts, run.send_to_api)
+
+    def drain(self) -> List[RepeatSummary]:
+        """Returns summaries for every run with held back repeats and forgets all tracked messages"""
+
+        with self._lock:
+            summaries = [self._summarise(key, run) for key, run in self._runs.items() if run.count]
+            self._runs.clear()
+
+        return summaries
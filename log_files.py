@@ -0,0 +1,275 @@
+"""The daily log files. Records are written to the day's log file, and ERROR records also to its error log file if
+enabled. Both are named for the day they cover and switched at local midnight. Checking the record's timestamp against
+the next rollover is the only per-record cost."""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, List, Optional, Set, Tuple, Union
+
+if os.getenv("STANDALONE", None) is not None:
+    from log_record import LogRecord
+    from logging_level import convert_logging_level
+    from file_writer import AsyncFileWriter
+    from log_rotation import LogHousekeeper, next_midnight
+    from log_format import FILE_EXTENSIONS, make_encoder
+    from log_index import LogIndexWriter
+    from log_sinks import FileSink
+    from thread_buffers import ThreadBuffers
+    from logger_config import FileConfig, RetentionConfig
+else:
+    from .log_record import LogRecord  # type: ignore[no-redef]
+    from .logging_level import convert_logging_level  # type: ignore[no-redef]
+    from .file_writer import AsyncFileWriter  # type: ignore[no-redef]
+    from .log_rotation import LogHousekeeper, next_midnight  # type: ignore[no-redef]
+    from .log_format import FILE_EXTENSIONS, make_encoder  # type: ignore[no-redef]
+    from .log_index import LogIndexWriter  # type: ignore[no-redef]
+    from .log_sinks import FileSink  # type: ignore[no-redef]
+    from .thread_buffers import ThreadBuffers  # type: ignore[no-redef]
+    from .logger_config import FileConfig, RetentionConfig  # type: ignore[no-redef]
+
+
+class HandlerFileWriter:
+    """Writes records to path through a logging.FileHandler on the birdbot_logger logger, from the thread that logged
+    them. The file is opened by the first write, after make_directory is called. If index is set, records are noted in
+    it as they are written. Records also go through the logger to any other handler on it, or on the loggers it
+    propagates to, as they did when every record was logged through it"""
+
+    # Records are never queued, so none are dropped, and a failed write raises to the caller
+    dropped_count = 0
+    write_errors = 0
+    queue_depth = 0
+
+    def __init__(self, path: str, encode: Callable[[LogRecord], bytes], index: Optional[LogIndexWriter], make_directory: Callable[[], None]) -> None:
+        self.handler = logging.FileHandler(path, delay=True)
+        # Records handed to the logger by write are already in the file
+        self.handler.addFilter(lambda log_record: not getattr(log_record, "birdbot_written", False))
+        self.logger = logging.getLogger("birdbot_logger")
+        self.logger.addHandler(self.handler)
+        self.encode = encode
+        self.index = index
+        self.make_directory = make_directory
+
+        # Counted under the handler's lock
+        self.records_written = 0
+        self.bytes_written = 0
+        # Encoded records waiting for the handler, with their timestamps for the index, see write
+        self._staging: ThreadBuffers[Tuple[float, bytes]] = ThreadBuffers()
+
+    def write(self, record: LogRecord) -> None:
+        """Goes straight to the handler's file, as the record is already formatted and levels are checked by the
+        caller"""
+
+        handler = self.handler
+        if handler.lock is None:
+            return
+        # Encoded here, so threads don't wait on each other to do it. A thread that finds another writing leaves the
+        # record for it, rather than wait for the lock while the file is written
+        self._staging.combine((record.created, self.encode(record)), handler.lock, self._write_batch)
+        if self._other_handlers():
+            self._hand_on(record)
+
+    def _other_handlers(self) -> bool:
+        """Whether the logger would pass records to a handler other than this one, as Logger.callHandlers looks for
+        them"""
+
+        logger: Optional[logging.Logger] = self.logger
+        while logger is not None:
+            if any(handler is not self.handler for handler in logger.handlers):
+                return True
+            if not logger.propagate:
+                return False
+            logger = logger.parent
+        return False
+
+    def _hand_on(self, record: LogRecord) -> None:
+        """Logs record through the logger, with the text it was written to the file with"""
+
+        level = convert_logging_level(record.logging_level)
+        self.logger.handle(self.logger.makeRecord(self.logger.name, level, "(unknown file)", 0, record.text, (), None, extra={"birdbot_written": True}))
+
+    def _write_batch(self, batch: List[Tuple[float, bytes]]) -> None:
+        """Writes staged records to the handler's file in one write. Called with the handler's lock held"""
+
+        handler = self.handler
+        if not batch:
+            return
+        # As FileHandler.emit, open on the first write and reopen if the handler has been closed
+        if handler.stream is None:
+            self.make_directory()
+            handler.stream = handler._open()
+        # Written as bytes, so the index can count the offset of each record
+        data = batch[0][1] if len(batch) == 1 else b"".join(encoded for _, encoded in batch)
+        handler.stream.buffer.write(data)
+        handler.stream.buffer.flush()
+        if self.index is not None:
+            for created, encoded in batch:
+                self.index.note(created, len(encoded))
+        self.records_written += len(batch)
+        self.bytes_written += len(data)
+
+    def _write_staged_records(self) -> None:
+        """Writes records other threads staged while the handler's lock was held by something other than a write, such
+        as handler.close() or logging.shutdown(), which leave them for the next write"""
+
+        if not self._staging.pending:
+            return
+        self.handler.acquire()
+        try:
+            self._write_batch(self._staging.drain())
+        finally:
+            self.handler.release()
+
+    def reopen(self, path: str, on_closed: Optional[Callable[[], None]] = None) -> None:
+        """Switches to path, which is opened by the next write, then calls on_closed"""
+
+        handler = self.handler
+        handler.acquire()
+        try:
+            # Until the rollover moves on, other threads only stage records from before the switch, which belong to the
+            # closing file, so they are written before it is closed
+            self._write_batch(self._staging.drain())
+            if handler.stream is not None:
+                handler.stream.close()
+                handler.stream = None
+            handler.baseFilename = os.path.abspath(path)
+            if self.index is not None:
+                self.index.reopen(path)
+        finally:
+            handler.release()
+
+        if on_closed is not None:
+            on_closed()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:  # pylint: disable=unused-argument
+        """Writes staged records. Records are otherwise flushed as they are written, so this never waits"""
+
+        self._write_staged_records()
+        return True
+
+    def close(self) -> None:
+        self._write_staged_records()
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+
+class LogFiles:
+    """The log files under directory, encoded as config.log_format for device_id. The directory and files are made by
+    the first write, unless a feature opens files up front. Records are written by an AsyncFileWriter if
+    config.async_writes, and otherwise by a HandlerFileWriter. on_error is called when a background write fails"""
+
+    def __init__(
+        self,
+        directory: str,
+        device_id: str,
+        config: FileConfig = FileConfig(),
+        retention: RetentionConfig = RetentionConfig(),
+        on_error: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.directory = directory
+        # Format of the daily log files, see log_format.py
+        self.log_format = config.log_format
+        self.encode = make_encoder(config.log_format, device_id)
+
+        housekeeping = retention.max_age_days is not None or retention.max_total_bytes is not None or retention.compress
+        self.path = self.file_name(error=False)
+        if config.async_writes or config.index_interval > 0 or housekeeping:
+            self.make_directory()
+        self._next_rollover = next_midnight(time.time())
+        self._rollover_lock = threading.Lock()
+        self.index = LogIndexWriter(self.path, config.index_interval) if config.index_interval > 0 else None
+        # Opened by the first error
+        self.error_sink = FileSink(self.file_name(error=True), self.encode) if config.error_log_file else None
+
+        self.writer: Union[AsyncFileWriter, HandlerFileWriter]
+        if config.async_writes:
+            self.writer = AsyncFileWriter(self.path, config, self.encode, self.index, on_error)
+        else:
+            self.writer = HandlerFileWriter(self.path, self.encode, self.index, self.make_directory)
+
+        # When set, closed days are compressed and old logs deleted on a background thread after each rollover
+        self.housekeeper: Optional[LogHousekeeper] = None
+        if housekeeping:
+            self.housekeeper = LogHousekeeper(
+                directory,
+                self._active_files,
+                max_age_days=retention.max_age_days,
+                max_total_bytes=retention.max_total_bytes,
+                compress=retention.compress,
+            )
+            self.housekeeper.start()
+
+    def write(self, record: LogRecord) -> None:
+        """Writes record to the log file"""
+
+        if record.created >= self._next_rollover:
+            self._rollover(record.created)
+        self.writer.write(record)
+
+    def write_error(self, record: LogRecord) -> None:
+        """Writes record to the error log file"""
+
+        if record.created >= self._next_rollover:
+            self._rollover(record.created)
+        if self.error_sink is not None:
+            self.error_sink.write(record)
+
+    def file_name(self, error: bool, date: Optional[datetime] = None) -> str:
+        """Generates log file name from date, by default the current date. The extension depends on the log format"""
+
+        current_date = date or datetime.now()
+        extension = FILE_EXTENSIONS[self.log_format]
+
+        if error:
+            return os.path.join(self.directory, current_date.strftime("%d-%m-%y-birdbot-error") + extension)
+        return os.path.join(self.directory, current_date.strftime("%d-%m-%y-birdbot") + extension)
+
+    def make_directory(self) -> None:
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory, exist_ok=True)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until everything written so far is flushed to the OS. Returns False on timeout"""
+
+        flushed = self.writer.flush(timeout)
+        if self.index is not None:
+            self.index.flush()
+
+        return flushed
+
+    def close(self) -> None:
+        """Writes out queued records, then closes the files and stops the background threads"""
+
+        self.writer.close()
+        if self.index is not None:
+            self.index.close()
+        if self.housekeeper is not None:
+            self.housekeeper.close()
+        if self.error_sink is not None:
+            self.error_sink.close()
+
+    def _active_files(self) -> Set[str]:
+        """Files the housekeeper leaves alone"""
+
+        if self.error_sink is None:
+            return {self.path}
+        return {self.path, self.error_sink.path}
+
+    def _rollover(self, created: float) -> None:
+        """Switches to the log files for the day of created, then lets the housekeeper deal with the closed files once
+        everything before the switch is written to them"""
+
+        with self._rollover_lock:
+            if created < self._next_rollover:
+                return
+
+            date = datetime.fromtimestamp(created)
+            if self.error_sink is not None:
+                self.error_sink.reopen(self.file_name(error=True, date=date))
+            self.path = self.file_name(error=False, date=date)
+            # Records may still be queued for the closed file, so the writer calls the housekeeper once they are written,
+            # rather than it compress the file under them
+            self.writer.reopen(self.path, on_closed=None if self.housekeeper is None else self.housekeeper.trigger)
+            self._next_rollover = next_midnight(created)
@@ -0,0 +1,193 @@
+"""On-disk log file formats, and a streaming reader for all of them.
+
+TEXT is the original "dd-mm-YYYY HH:MM:SS: LEVEL: message" line format. It is easy to read but slow to parse back, and
+a message with newlines in it can't be told apart from several records.
+
+JSON_LINES writes one compact JSON object per line: {"ts":<epoch ms>,"level":"<LEVEL>","device_id":"...","msg":"..."}.
+
+BINARY writes length-prefixed frames. Each is a big-endian header of body length (uint32), epoch ms (int64), level
+(uint8) and device_id length (uint16), followed by the body: device_id then message, both UTF-8.
+"""
+
+import os
+import re
+import gzip
+import json
+import struct
+from enum import Enum
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional, cast
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_level import LoggingLevel
+    from log_record import LogRecord, TIMESTAMP_FORMAT
+else:
+    from .logging_level import LoggingLevel  # type: ignore[no-redef]
+    from .log_record import LogRecord, TIMESTAMP_FORMAT  # type: ignore[no-redef]
+
+
+class LogFormat(Enum):
+    TEXT = "text"
+    JSON_LINES = "jsonl"
+    BINARY = "binary"
+
+
+# Extension of the daily log files written in each format
+FILE_EXTENSIONS = {
+    LogFormat.TEXT: ".log",
+    LogFormat.JSON_LINES: ".jsonl",
+    LogFormat.BINARY: ".binlog",
+}
+
+BINARY_HEADER = struct.Struct(">IqBH")
+
+_LEVELS = {int(level): level for level in LoggingLevel}
+_LEVEL_NAMES = {level.name: level for level in LoggingLevel}
+# "dd-mm-YYYY HH:MM:SS: LEVEL: " at the start of a text record. Lines without it continue the previous record
+TEXT_PREFIX = re.compile(r"(\d{2}-\d{2}-\d{4} \d{2}:\d{2}:\d{2}): (" + "|".join(_LEVEL_NAMES) + "): ")
+
+
+class StructuredRecord(NamedTuple):
+    """A record as read back from a log file"""
+
+    timestamp_ms: int  # Milliseconds since epoch
+    logging_level: LoggingLevel
+    device_id: str  # Empty for TEXT files, which don't store it
+    message: str
+
+
+def encode_text(record: LogRecord) -> bytes:
+    return (record.text + "\n").encode("utf-8")
+
+
+def make_encoder(log_format: LogFormat, device_id: str) -> Callable[[LogRecord], bytes]:
+    """Returns a function encoding a record as one entry of a log file in log_format"""
+
+    if log_format == LogFormat.JSON_LINES:
+        device_json = json.dumps(device_id, ensure_ascii=False)
+
+        def encode_json_line(record: LogRecord) -> bytes:
+            message_json = json.dumps(str(record.message), ensure_ascii=False)
+            line = f'{{"ts":{int(record.created * 1000)},"level":"{record.logging_level.name}","device_id":{device_json},"msg":{message_json}}}\n'
+            return line.encode("utf-8")
+
+        return encode_json_line
+
+    if log_format == LogFormat.BINARY:
+        device_bytes = device_id.encode("utf-8")
+        pack = BINARY_HEADER.pack
+
+        def encode_binary(record: LogRecord) -> bytes:
+            message_bytes = str(record.message).encode("utf-8")
+            header = pack(len(device_bytes) + len(message_bytes), int(record.created * 1000), int(record.logging_level), len(device_bytes))
+            return header + device_bytes + message_bytes
+
+        return encode_binary
+
+    return encode_text
+
+
+def detect_format(path: str) -> LogFormat:
+    """Returns the format of a log file from its extension, ignoring a trailing .gz"""
+
+    name = path[:-3] if path.endswith(".gz") else path
+    for log_format, extension in FILE_EXTENSIONS.items():
+        if name.endswith(extension):
+            return log_format
+
+    raise ValueError(f"Unknown log file format: {path}")
+
+
+def read_records(path: str, log_format: Optional[LogFormat] = None, chunk_size: int = 1024 * 1024) -> Iterator[StructuredRecord]:
+    """Yields the records in a log file, optionally gzipped, one at a time. Memory use is bounded by chunk_size and the
+    longest record, however large the file. A record cut short at the end of the file, e.g. by a crash, is skipped"""
+
+    log_format = log_format or detect_format(path)
+    opener = gzip.open if path.endswith(".gz") else open
+
+    with opener(path, "rb") as file:
+        stream = cast(BinaryIO, file)
+        if log_format == LogFormat.BINARY:
+            yield from read_binary(stream, chunk_size)
+        elif log_format == LogFormat.JSON_LINES:
+            yield from read_json_lines(stream)
+        else:
+            yield from read_text(stream)
+
+
+def read_binary(stream: BinaryIO, chunk_size: int = 1024 * 1024) -> Iterator[StructuredRecord]:
+    header_size = BINARY_HEADER.size
+    unpack_from = BINARY_HEADER.unpack_from
+    # Nearly every record has the same device_id, so it is only decoded once
+    device_ids: Dict[bytes, str] = {}
+    buffer = b""
+    offset = 0
+
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        buffer = buffer[offset:] + chunk
+        offset = 0
+
+        while len(buffer) - offset >= header_size:
+            body_length, timestamp_ms, level, device_length = unpack_from(buffer, offset)
+            start = offset + header_size
+            end = start + body_length
+            if end > len(buffer):
+                break
+
+            device_end = start + device_length
+            device_bytes = buffer[start:device_end]
+            device_id = device_ids.get(device_bytes)
+            if device_id is None:
+                device_id = device_ids[device_bytes] = device_bytes.decode("utf-8")
+
+            yield StructuredRecord(timestamp_ms, _LEVELS[level], device_id, buffer[device_end:end].decode("utf-8"))
+            offset = end
+
+
+def read_json_lines(stream: BinaryIO) -> Iterator[StructuredRecord]:
+    # readline rather than iterating, so memory-mapped files can be read too
+    for line in iter(stream.readline, b""):
+        if not line.endswith(b"\n"):
+            return
+        entry = json.loads(line)
+        yield StructuredRecord(entry["ts"], _LEVEL_NAMES[entry["level"]], entry["device_id"], entry["msg"])
+
+
+def read_text(stream: BinaryIO) -> Iterator[StructuredRecord]:
+    """Parses TEXT records. Lines that don't start with a timestamp and level are taken as part of the message before"""
+
+    # Timestamps only have one second resolution, so the last one parsed is kept
+    last_time_text, last_timestamp_ms = "", 0
+    current: Optional[StructuredRecord] = None
+    continuation: List[str] = []
+
+    for raw_line in iter(stream.readline, b""):
+        line = raw_line.decode("utf-8", errors="replace").rstrip("\n")
+        match = TEXT_PREFIX.match(line)
+        if match is None:
+            if current is not None:
+                continuation.append(line)
+            continue
+
+        if current is not None:
+            yield _with_continuation(current, continuation)
+            continuation = []
+
+        time_text = match.group(1)
+        if time_text != last_time_text:
+            last_time_text, last_timestamp_ms = time_text, int(datetime.strptime(time_text, TIMESTAMP_FORMAT).timestamp() * 1000)
+        message_start = match.end()
+        current = StructuredRecord(last_timestamp_ms, _LEVEL_NAMES[match.group(2)], "", line[message_start:])
+
+    if current is not None:
+        yield _with_continuation(current, continuation)
+
+
+def _with_continuation(record: StructuredRecord, continuation: List[str]) -> StructuredRecord:
+    if not continuation:
+        return record
+
+    return record._replace(message="\n".join([record.message, *continuation]))
@@ -0,0 +1,149 @@
+"""Sparse sidecar index for daily log files. "<log file>.idx" holds a (timestamp ms, byte offset) entry for every Nth
+record, so a time range can be found by a binary search and a short scan instead of reading the whole file.
+
+The index is only a hint. It is appended to as the logger writes, may lag behind or be missing entirely after a crash,
+and can always be rebuilt from the log file with build_index().
+"""
+
+import os
+import gzip
+import struct
+import bisect
+from datetime import datetime
+from typing import BinaryIO, Iterator, List, Optional, Tuple, cast
+
+if os.getenv("STANDALONE", None) is not None:
+    from log_format import BINARY_HEADER, TEXT_PREFIX, LogFormat, detect_format
+    from log_record import TIMESTAMP_FORMAT
+else:
+    from .log_format import BINARY_HEADER, TEXT_PREFIX, LogFormat, detect_format  # type: ignore[no-redef]
+    from .log_record import TIMESTAMP_FORMAT  # type: ignore[no-redef]
+
+INDEX_SUFFIX = ".idx"
+INDEX_ENTRY = struct.Struct(">qQ")
+
+
+def index_path(log_path: str) -> str:
+    """Returns the index file for a log file. A compressed log keeps the index of the file it was made from"""
+
+    name = log_path[:-3] if log_path.endswith(".gz") else log_path
+    return name + INDEX_SUFFIX
+
+
+class LogIndexWriter:
+    """Appends an index entry for every interval records written to the log file. Offsets are counted from the lengths
+    passed to note(), starting at the size of the log file when it was opened, so note() must be called in the order
+    records are written"""
+
+    def __init__(self, log_path: str, interval: int = 256) -> None:
+        self.interval = interval
+        self._count = 0
+        self._offset = 0
+        self._file: Optional[BinaryIO] = None
+        self.reopen(log_path)
+
+    def reopen(self, log_path: str) -> None:
+        """Switches to indexing log_path, e.g. after a rollover"""
+
+        self.close()
+        self.log_path = log_path
+        self._offset = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+        self._count = 0
+        self._file = open(index_path(log_path), "ab")  # pylint: disable=consider-using-with
+
+    def note(self, created: float, length: int) -> None:
+        """Counts a record of length bytes written at the current end of the log file"""
+
+        if length == 0 or self._file is None:
+            return
+
+        if self._count % self.interval == 0:
+            self._file.write(INDEX_ENTRY.pack(int(created * 1000), self._offset))
+        self._count += 1
+        self._offset += length
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_index(path: str) -> List[Tuple[int, int]]:
+    """Returns the (timestamp ms, offset) entries of an index file, or an empty list if there isn't one. A partly
+    written last entry is ignored"""
+
+    try:
+        with open(path, "rb") as index_file:
+            data = index_file.read()
+    except FileNotFoundError:
+        return []
+
+    usable = len(data) - len(data) % INDEX_ENTRY.size
+    return list(INDEX_ENTRY.iter_unpack(data[:usable]))
+
+
+def find_offset(entries: List[Tuple[int, int]], timestamp_ms: int, file_size: int) -> int:
+    """Returns an offset in the log file at or before the first record at timestamp_ms. Assumes records are written in
+    time order, as the logger does"""
+
+    position = bisect.bisect_left(entries, (timestamp_ms, -1))
+    if position == 0:
+        return 0
+
+    offset = entries[position - 1][1]
+    # An index that doesn't match the file, e.g. after it was truncated, is ignored
+    return offset if offset <= file_size else 0
+
+
+def scan_offsets(stream: BinaryIO, log_format: LogFormat) -> Iterator[Tuple[int, int]]:
+    """Yields the (timestamp ms, offset) of every complete record in a log file"""
+
+    offset = 0
+    if log_format == LogFormat.BINARY:
+        while True:
+            header = stream.read(BINARY_HEADER.size)
+            if len(header) < BINARY_HEADER.size:
+                return
+            body_length, timestamp_ms = BINARY_HEADER.unpack(header)[:2]
+            if len(stream.read(body_length)) < body_length:
+                return
+            yield timestamp_ms, offset
+            offset += BINARY_HEADER.size + body_length
+
+    last_time_text, last_timestamp_ms = "", 0
+    for line in iter(stream.readline, b""):
+        if not line.endswith(b"\n"):
+            return
+
+        if log_format == LogFormat.JSON_LINES:
+            # "ts" is always the first key
+            timestamp_end = line.index(b",")
+            yield int(line[6:timestamp_end]), offset
+        else:
+            match = TEXT_PREFIX.match(line.decode("utf-8", errors="replace"))
+            if match is not None:
+                time_text = match.group(1)
+                if time_text != last_time_text:
+                    last_time_text, last_timestamp_ms = time_text, int(datetime.strptime(time_text, TIMESTAMP_FORMAT).timestamp() * 1000)
+                yield last_timestamp_ms, offset
+        offset += len(line)
+
+
+def build_index(log_path: str, interval: int = 256) -> int:
+    """Rebuilds the index of a log file, optionally gzipped, from scratch. Returns the number of entries written"""
+
+    entries = 0
+    temporary_path = index_path(log_path) + ".tmp"
+    opener = gzip.open if log_path.endswith(".gz") else open
+    with opener(log_path, "rb") as log_file, open(temporary_path, "wb") as index_file:
+        for count, (timestamp_ms, offset) in enumerate(scan_offsets(cast(BinaryIO, log_file), detect_format(log_path))):
+            if count % interval == 0:
+                index_file.write(INDEX_ENTRY.pack(timestamp_ms, offset))
+                entries += 1
+    os.replace(temporary_path, index_path(log_path))
+
+    return entries
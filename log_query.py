@@ -0,0 +1,211 @@
+"""Finds records in LOGGING_DIRECTORY by time range, level and substring, and follows new records like tail -f. Only the
+daily files covering the time range are opened, and each is memory-mapped and read from the offset its sidecar index
+gives for the start of the range.
+
+Usage, from the logger's directory, or as <submodule>.log_query from the one above it:
+    python -m log_query <directory> [--since "dd-mm-YYYY HH:MM:SS"] [--until ...] [--level WARNING] [--contains TEXT]
+                                    [--follow] [--rebuild-index]
+"""
+
+import os
+import io
+import sys
+import gzip
+import mmap
+import time
+import argparse
+from datetime import datetime, timedelta
+from typing import BinaryIO, Iterator, List, Optional, Tuple, cast
+
+# Run from the logger's directory, so it isn't in a package and the modules it imports are top level ones as well
+if not __package__:
+    os.environ.setdefault("STANDALONE", "True")
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_level import LoggingLevel
+    from log_format import BINARY_HEADER, LogFormat, StructuredRecord, detect_format, read_binary, read_json_lines, read_text
+    from log_index import build_index, find_offset, index_path, read_index
+    from log_record import TIMESTAMP_FORMAT
+    from log_rotation import COMPRESSED_SUFFIX, parse_log_file_date
+else:
+    from .logging_level import LoggingLevel  # type: ignore[no-redef]
+    from .log_format import BINARY_HEADER, LogFormat, StructuredRecord, detect_format, read_binary, read_json_lines, read_text  # type: ignore[no-redef]
+    from .log_index import build_index, find_offset, index_path, read_index  # type: ignore[no-redef]
+    from .log_record import TIMESTAMP_FORMAT  # type: ignore[no-redef]
+    from .log_rotation import COMPRESSED_SUFFIX, parse_log_file_date  # type: ignore[no-redef]
+
+
+def daily_log_files(directory: str) -> List[Tuple[datetime, str]]:
+    """Returns (date, path) of the main daily log files in directory, in any format, oldest first"""
+
+    files = []
+    for filename in os.listdir(directory):
+        date = parse_log_file_date(filename)
+        if date is not None and "-birdbot-error." not in filename:
+            files.append((date, os.path.join(directory, filename)))
+
+    return sorted(files)
+
+
+def _read_from(stream: BinaryIO, log_format: LogFormat) -> Iterator[StructuredRecord]:
+    if log_format == LogFormat.BINARY:
+        return read_binary(stream)
+    if log_format == LogFormat.JSON_LINES:
+        return read_json_lines(stream)
+    return read_text(stream)
+
+
+def query_file(path: str, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Iterator[StructuredRecord]:
+    """Yields the records of one log file from start_ms up to end_ms, both inclusive"""
+
+    log_format = detect_format(path)
+    compressed = path.endswith(COMPRESSED_SUFFIX)
+    file_size = os.path.getsize(path)
+    offset = 0
+    if start_ms is not None:
+        # Offsets in the index are into the uncompressed file, which gzip seeks through
+        offset = find_offset(read_index(index_path(path)), start_ms, sys.maxsize if compressed else file_size)
+
+    with open(path, "rb") as log_file:
+        if compressed:
+            stream = cast(BinaryIO, gzip.GzipFile(fileobj=log_file))
+        elif file_size == 0:
+            return
+        else:
+            stream = cast(BinaryIO, mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ))
+        try:
+            stream.seek(offset)
+            for record in _read_from(stream, log_format):
+                if end_ms is not None and record.timestamp_ms > end_ms:
+                    return
+                if start_ms is None or record.timestamp_ms >= start_ms:
+                    yield record
+        finally:
+            stream.close()
+
+
+def _matches(record: StructuredRecord, min_level: LoggingLevel, contains: Optional[str]) -> bool:
+    return record.logging_level >= min_level and (contains is None or contains in record.message)
+
+
+def query(
+    directory: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_level: LoggingLevel = LoggingLevel.DEBUG,
+    contains: Optional[str] = None,
+) -> Iterator[StructuredRecord]:
+    """Yields records from since to until, at min_level or above and containing contains, oldest first"""
+
+    start_ms = None if since is None else int(since.timestamp() * 1000)
+    end_ms = None if until is None else int(until.timestamp() * 1000)
+
+    for date, path in daily_log_files(directory):
+        # Files are named for the local day they cover
+        if since is not None and date + timedelta(days=1) <= since:
+            continue
+        if until is not None and date > until:
+            break
+        for record in query_file(path, start_ms, end_ms):
+            if _matches(record, min_level, contains):
+                yield record
+
+
+def _complete_length(data: bytes, log_format: LogFormat) -> int:
+    """Returns the length of the complete records at the start of data. The rest is still being written"""
+
+    if log_format != LogFormat.BINARY:
+        return data.rfind(b"\n") + 1
+
+    offset = 0
+    while len(data) - offset >= BINARY_HEADER.size:
+        end = offset + BINARY_HEADER.size + BINARY_HEADER.unpack_from(data, offset)[0]
+        if end > len(data):
+            break
+        offset = end
+
+    return offset
+
+
+def follow(
+    directory: str,
+    min_level: LoggingLevel = LoggingLevel.DEBUG,
+    contains: Optional[str] = None,
+    poll_interval: float = 0.5,  # In seconds
+) -> Iterator[StructuredRecord]:
+    """Yields records as they are written to the newest daily log file, starting from its current end. Moves on to the
+    next day's file after a rollover. Never returns"""
+
+    path: Optional[str] = None
+    offset = 0
+    while True:
+        files = [file for file in daily_log_files(directory) if not file[1].endswith(COMPRESSED_SUFFIX)]
+        if path is None and files:
+            path = files[-1][1]
+            offset = os.path.getsize(path)
+
+        new_data = b""
+        if path is not None and os.path.exists(path):
+            with open(path, "rb") as log_file:
+                log_file.seek(offset)
+                new_data = log_file.read()
+
+        if path is not None and new_data:
+            log_format = detect_format(path)
+            length = _complete_length(new_data, log_format)
+            offset += length
+            for record in _read_from(io.BytesIO(new_data[:length]), log_format):
+                if _matches(record, min_level, contains):
+                    yield record
+            if length:
+                continue
+
+        # The current file is drained, so move to a newer one if it has been rolled over
+        if path is not None and files and files[-1][1] != path:
+            path, offset = files[-1][1], 0
+            continue
+
+        time.sleep(poll_interval)
+
+
+def _parse_time(text: str) -> datetime:
+    return datetime.strptime(text, TIMESTAMP_FORMAT)
+
+
+def format_record(record: StructuredRecord) -> str:
+    time_text = datetime.fromtimestamp(record.timestamp_ms / 1000).strftime(TIMESTAMP_FORMAT)
+    return f"{time_text}: {record.logging_level.name}: {record.message}"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="log_query", description="Finds records in daily log files")
+    parser.add_argument("directory", help="LOGGING_DIRECTORY to search")
+    parser.add_argument("--since", type=_parse_time, help='Start of the time range, "dd-mm-YYYY HH:MM:SS"')
+    parser.add_argument("--until", type=_parse_time, help='End of the time range, "dd-mm-YYYY HH:MM:SS"')
+    parser.add_argument("--level", default="DEBUG", choices=[level.name for level in LoggingLevel], help="Lowest level to show")
+    parser.add_argument("--contains", help="Only records whose message contains this text")
+    parser.add_argument("--follow", action="store_true", help="Show new records as they are written, like tail -f")
+    parser.add_argument("--rebuild-index", action="store_true", help="Rebuild the index of every log file from its contents")
+    arguments = parser.parse_args(argv)
+
+    min_level = LoggingLevel[arguments.level]
+
+    if arguments.rebuild_index:
+        for _, path in daily_log_files(arguments.directory):
+            print(f"{path}: {build_index(path)} index entries")
+        return
+
+    if arguments.follow:
+        records = follow(arguments.directory, min_level, arguments.contains)
+    else:
+        records = query(arguments.directory, arguments.since, arguments.until, min_level, arguments.contains)
+
+    try:
+        for record in records:
+            print(format_record(record), flush=arguments.follow)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Immutable log record, built once per log call and handed to every sink"""
+
+import os
+import time
+from datetime import datetime
+from typing import Any, NamedTuple, Tuple
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_level import LoggingLevel
+else:
+    from .logging_level import LoggingLevel  # type: ignore[no-redef]
+
+TIMESTAMP_FORMAT = "%d-%m-%Y %H:%M:%S"
+
+
+class LogRecord(NamedTuple):
+    logging_level: LoggingLevel
+    message: Any
+    created: float  # Seconds since epoch
+    time_text: str  # created formatted with TIMESTAMP_FORMAT
+    text: str  # "<time_text>: <LEVEL>: <message>", as written to file
+
+
+class TimestampCache:
+    """Formats the current time with TIMESTAMP_FORMAT, only calling strftime when the wall-clock second changes"""
+
+    def __init__(self) -> None:
+        # One attribute, so threads always see a matching second and text
+        self._cached: Tuple[int, str] = (-1, "")
+
+    def now(self) -> Tuple[float, str]:
+        """Returns the current time and its formatted text"""
+
+        now = time.time()
+        second = int(now)
+        cached = self._cached
+        if cached[0] != second:
+            cached = (second, datetime.fromtimestamp(second).strftime(TIMESTAMP_FORMAT))
+            self._cached = cached
+
+        return now, cached[1]
+
+    def format(self, created: float) -> str:
+        """Returns created formatted with TIMESTAMP_FORMAT, sharing the cache with now(). For records made elsewhere"""
+
+        second = int(created)
+        cached = self._cached
+        if cached[0] != second:
+            text = datetime.fromtimestamp(second).strftime(TIMESTAMP_FORMAT)
+            # Records can arrive slightly out of order, only newer seconds replace the cached one
+            if second > cached[0]:
+                self._cached = (second, text)
+            return text
+
+        return cached[1]
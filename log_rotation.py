@@ -0,0 +1,163 @@
+"""Daily log file rotation helpers, and a background housekeeper that compresses closed days and enforces retention so
+LOGGING_DIRECTORY never fills the disk"""
+
+import os
+import gzip
+import shutil
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Set, Tuple
+
+if os.getenv("STANDALONE", None) is not None:
+    from log_format import FILE_EXTENSIONS
+    from log_index import index_path
+else:
+    from .log_format import FILE_EXTENSIONS  # type: ignore[no-redef]
+    from .log_index import index_path  # type: ignore[no-redef]
+
+LOG_FILE_DATE_FORMAT = "%d-%m-%y"
+# In every log format
+LOG_FILE_SUFFIXES = tuple(name + extension for extension in FILE_EXTENSIONS.values() for name in ("-birdbot", "-birdbot-error"))
+COMPRESSED_SUFFIX = ".gz"
+
+
+def next_midnight(timestamp: float) -> float:
+    """Returns the local midnight following timestamp, in seconds since epoch"""
+
+    tomorrow = datetime.fromtimestamp(timestamp).date() + timedelta(days=1)
+    return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+
+def parse_log_file_date(filename: str) -> Optional[datetime]:
+    """Returns the date of a daily log file, compressed or not, or None if filename isn't one"""
+
+    name = filename[: -len(COMPRESSED_SUFFIX)] if filename.endswith(COMPRESSED_SUFFIX) else filename
+    for suffix in LOG_FILE_SUFFIXES:
+        if name.endswith(suffix):
+            try:
+                return datetime.strptime(name[: -len(suffix)], LOG_FILE_DATE_FORMAT)
+            except ValueError:
+                return None
+
+    return None
+
+
+class LogHousekeeper:
+    """Runs on its own thread so rotation never waits on it. Each pass gzips closed daily log files, deletes files older
+    than max_age_days, then deletes the oldest files until the directory holds at most max_total_bytes of logs. Files
+    returned by active_paths are never touched."""
+
+    def __init__(
+        self,
+        directory: str,
+        active_paths: Callable[[], Set[str]],
+        max_age_days: Optional[int] = None,
+        max_total_bytes: Optional[int] = None,
+        compress: bool = False,
+    ) -> None:
+        self.directory = directory
+        self.active_paths = active_paths
+        self.max_age_days = max_age_days
+        self.max_total_bytes = max_total_bytes
+        self.compress = compress
+
+        self.compressed_count = 0
+        self.deleted_count = 0
+
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._stopping = False
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Starts the housekeeping thread, which does a first pass straight away"""
+
+        self._wake.set()
+        self._worker = threading.Thread(target=self._run, name="birdbot-log-housekeeper", daemon=True)
+        self._worker.start()
+
+    def trigger(self) -> None:
+        """Asks for a housekeeping pass, e.g. after a rollover. Returns immediately"""
+
+        self._idle.clear()
+        self._wake.set()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Waits for requested passes to finish"""
+
+        return self._idle.wait(timeout)
+
+    def close(self) -> None:
+        self._stopping = True
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stopping:
+                return
+            try:
+                self.run_once()
+            except OSError as error:
+                print(f"Error while housekeeping logs: {error}")
+            if not self._wake.is_set():
+                self._idle.set()
+
+    def _log_files(self) -> List[Tuple[datetime, str]]:
+        """Returns (date, path) of every daily log file, oldest first"""
+
+        files = []
+        for filename in os.listdir(self.directory):
+            date = parse_log_file_date(filename)
+            if date is not None:
+                files.append((date, os.path.join(self.directory, filename)))
+
+        return sorted(files)
+
+    def run_once(self, now: Optional[datetime] = None) -> None:
+        """Compresses and deletes files once"""
+
+        active = {os.path.abspath(path) for path in self.active_paths()}
+
+        if self.compress:
+            for _, path in self._log_files():
+                if not path.endswith(COMPRESSED_SUFFIX) and os.path.abspath(path) not in active:
+                    self._compress(path)
+
+        files = [(date, path) for date, path in self._log_files() if os.path.abspath(path) not in active]
+
+        if self.max_age_days is not None:
+            cutoff = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=self.max_age_days)
+            for date, path in list(files):
+                if date < cutoff:
+                    self._delete(path)
+                    files.remove((date, path))
+
+        if self.max_total_bytes is not None:
+            total = sum(os.path.getsize(path) for _, path in files) + sum(os.path.getsize(path) for path in active if os.path.exists(path))
+            for _, path in files:
+                if total <= self.max_total_bytes:
+                    break
+                total -= os.path.getsize(path)
+                self._delete(path)
+
+    def _compress(self, path: str) -> None:
+        """Gzips path. Written to a temporary name and renamed, so a crash never leaves a truncated archive"""
+
+        temporary_path = path + COMPRESSED_SUFFIX + ".tmp"
+        with open(path, "rb") as source, gzip.open(temporary_path, "wb") as destination:
+            shutil.copyfileobj(source, destination, 1024 * 1024)
+        os.replace(temporary_path, path + COMPRESSED_SUFFIX)
+        os.remove(path)
+        self.compressed_count += 1
+
+    def _delete(self, path: str) -> None:
+        """Deletes a log file along with its index"""
+
+        os.remove(path)
+        if os.path.exists(index_path(path)):
+            os.remove(index_path(path))
+        self.deleted_count += 1
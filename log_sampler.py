@@ -0,0 +1,116 @@
+"""Sampling of high-frequency log calls, so DEBUG and INFO can stay enabled in the field without filling the SD card.
+
+Each call site of a sampled level keeps its own count, and only every Nth call is written, starting with the first.
+Calls with a %-format message and args are keyed by the message template, which costs one dict lookup. Other calls are
+keyed by the file, function and bytecode offset of the caller's frame. Either way the message is never rendered for
+calls that are sampled out. Only the max_sites most recently used keys are counted, so templates built at run time
+can't grow the table without limit; a key that was forgotten starts counting again from its next call. With a budget,
+N is also multiplied up while the records written from sampled sites would exceed budget per second, and back down once
+they no longer do. The multiplier is only reconsidered when a record is written, so calls that are sampled out never
+read the clock. Written records end with " [sampled 1/N]", so the number of calls can be reconstructed from them.
+"""
+
+import os
+import re
+import sys
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_level import LoggingLevel
+else:
+    from .logging_level import LoggingLevel  # type: ignore[no-redef]
+
+SAMPLE_RATE_PATTERN = re.compile(r" \[sampled 1/(\d+)\]$")
+
+
+def format_sampled(message: str, sample_rate: int) -> str:
+    return f"{message} [sampled 1/{sample_rate}]"
+
+
+def sample_rate_of(message: str) -> int:
+    """Returns the number of calls a written message stands for, 1 if it wasn't sampled"""
+
+    match = SAMPLE_RATE_PATTERN.search(message)
+    return int(match.group(1)) if match else 1
+
+
+class LogSampler:
+    """Writes 1 in rates[level] calls from each call site at the levels in rates. With budget set, in records per second,
+    the rates are multiplied up while sampled sites would write more than that, measured over window seconds. Counts are
+    not locked, so under contention a site can occasionally write one call more or less than its rate. Counts are kept for
+    up to max_sites call sites and templates, forgetting the least recently used"""
+
+    def __init__(self, rates: Dict[LoggingLevel, int], budget: float = 0, window: float = 1.0, max_sites: int = 4096) -> None:
+        self.rates = dict(rates)
+        self.budget = budget
+        self.window = window
+        self.max_sites = max_sites
+
+        # Applied to every rate by the adaptive mode
+        self.multiplier = 1
+        self.sampled_out_count = 0
+
+        # Rate of each level by its int value, 0 for levels that aren't sampled
+        self._rates: List[int] = [0] * (max(LoggingLevel) + 1)
+        for level, rate in rates.items():
+            self._rates[level] = max(1, rate)
+        # Calls seen from each template or call site, least recently used first
+        self._sites: OrderedDict[Any, int] = OrderedDict()
+        self._window_start = time.monotonic()
+        self._window_written = 0
+
+    def sample(self, logging_level: LoggingLevel, message: Any = None, args: Tuple[Any, ...] = (), depth: int = 1) -> int:
+        """Returns 0 if this call should be dropped, otherwise the sample rate to write it with, 1 if the level isn't
+        sampled. A %-format message with args is keyed by the message, other calls by their call site, the frame depth
+        levels above the caller"""
+
+        rate = self._rates[logging_level]
+        if not rate:
+            return 1
+
+        if args and type(message) is str:  # pylint: disable=unidiomatic-typecheck
+            # The template stands for its call site, and str caches its hash, so no frame is needed
+            key: Any = message
+        else:
+            frame = sys._getframe(depth + 1)  # pylint: disable=protected-access
+            # Hashing a code object hashes its bytecode, and keeping it would keep it alive, so sites are keyed by where
+            # its function starts instead
+            code = frame.f_code
+            key = (code.co_filename, code.co_firstlineno, frame.f_lasti)
+
+        sites = self._sites
+        count = sites.get(key)
+        if count is None:
+            count = 0
+            if len(sites) >= self.max_sites:
+                sites.popitem(last=False)
+        else:
+            sites.move_to_end(key)
+        sites[key] = count + 1
+
+        rate *= self.multiplier
+        if count % rate:
+            self.sampled_out_count += 1
+            return 0
+
+        if self.budget > 0:
+            self._adapt()
+        return rate
+
+    def _adapt(self) -> None:
+        """Counts a written record, and at the end of each window sets the multiplier that keeps records under budget"""
+
+        self._window_written += 1
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed < self.window:
+            return
+
+        # What would have been written at the base rates
+        base_rate = self._window_written * self.multiplier / elapsed
+        self.multiplier = max(1, math.ceil(base_rate / self.budget))
+        self._window_start = now
+        self._window_written = 0
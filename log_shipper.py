@@ -0,0 +1,238 @@
+"""Background batching shipper for remote logs. Records are queued in memory and sent in batches by a worker thread so
+the log_* functions never block on the network."""
+
+import os
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+if os.getenv("STANDALONE", None) is not None:
+    from logger_config import OverflowPolicy, ShipperConfig
+else:
+    from .logger_config import OverflowPolicy, ShipperConfig  # type: ignore[no-redef]
+
+
+class BatchQueue:
+    """Records waiting to be sent, up to config.max_queue_size, taken off in batches of config.batch_size, with counts of
+    what became of them. Has no lock of its own: LogShipper uses it under its condition, and AsyncLogShipper on its
+    event loop only"""
+
+    def __init__(self, config: ShipperConfig) -> None:
+        self.config = config
+
+        self.records: Deque[Dict[str, Any]] = deque()
+        # Records taken off the queue and not yet sent
+        self.in_flight = 0
+        self.sent_count = 0
+        self.failed_count = 0
+        self.dropped_oldest_count = 0
+        self.dropped_newest_count = 0
+
+    def add(self, record: Dict[str, Any]) -> bool:
+        """Queues record, making room by the overflow policy if the queue is full. Returns False if it was dropped"""
+
+        if len(self.records) >= self.config.max_queue_size:
+            if self.config.overflow_policy == OverflowPolicy.DROP_NEWEST:
+                self.dropped_newest_count += 1
+                return False
+            self.records.popleft()
+            self.dropped_oldest_count += 1
+
+        self.records.append(record)
+        return True
+
+    @property
+    def wakes_worker(self) -> bool:
+        """Whether the record just added started a batch or filled one"""
+
+        return len(self.records) == 1 or len(self.records) >= self.config.batch_size
+
+    @property
+    def full_batch(self) -> bool:
+        return len(self.records) >= self.config.batch_size
+
+    @property
+    def drained(self) -> bool:
+        """Whether everything queued has been sent, or has failed"""
+
+        return not self.records and not self.in_flight
+
+    def take_batch(self) -> List[Dict[str, Any]]:
+        batch = [self.records.popleft() for _ in range(min(self.config.batch_size, len(self.records)))]
+        self.in_flight += len(batch)
+        return batch
+
+    def take_all(self) -> List[Dict[str, Any]]:
+        pending = list(self.records)
+        self.records.clear()
+        return pending
+
+    def done(self, batch: List[Dict[str, Any]], success: bool) -> None:
+        """Counts a batch taken by take_batch as sent, or as failed"""
+
+        if success:
+            self.sent_count += len(batch)
+        else:
+            self.failed_count += len(batch)
+        self.in_flight -= len(batch)
+
+
+class LogShipper:
+    """Bounded in-memory queue drained by a background worker. Batches are sent when batch_size records are queued or
+    batch_interval seconds have passed since the first record of the batch was queued, whichever is first.
+    send_batch is called on the worker thread only, and should raise or return False on failure. Batches that fail are
+    handed to on_failure. When there are no live records queued the worker calls replay, at most every replay_interval
+    seconds, to deliver a backlog; replay returns True while there is more backlog it can send straight away."""
+
+    def __init__(
+        self,
+        send_batch: Callable[[List[Dict[str, Any]]], bool],
+        config: ShipperConfig = ShipperConfig(),
+        on_error: Optional[Callable[[str], None]] = None,
+        on_failure: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        replay: Optional[Callable[[], bool]] = None,
+    ) -> None:
+        self.send_batch = send_batch
+        self.on_error = on_error
+        self.on_failure = on_failure
+        self.replay = replay
+
+        self.queue = BatchQueue(config)
+        self._condition = threading.Condition()
+        self._flush_waiters = 0
+        self._stopping = False
+        self._replay_due = replay is not None
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Starts the worker thread and registers shutdown() to run at interpreter exit"""
+
+        if self._worker is not None:
+            return
+
+        self._stopping = False
+        self._worker = threading.Thread(target=self._run, name="birdbot-log-shipper", daemon=True)
+        self._worker.start()
+        atexit.register(self.shutdown)
+
+    def enqueue(self, record: Dict[str, Any]) -> bool:
+        """Queues a record for sending. Never blocks on the network. Returns False if the record was dropped"""
+
+        with self._condition:
+            if not self.queue.add(record):
+                return False
+            # Wake the worker for the first record of a batch, and again once the batch is full
+            if self.queue.wakes_worker:
+                self._condition.notify_all()
+
+        return True
+
+    def request_replay(self) -> None:
+        """Has the worker replay the backlog as soon as no live records are queued, rather than after replay_interval"""
+
+        if self.replay is None:
+            return
+        with self._condition:
+            self._replay_due = True
+            self._condition.notify_all()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.queue.records)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Asks the worker to send everything queued and waits for it. Returns True if the queue drained in time"""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._flush_waiters += 1
+            self._condition.notify_all()
+            try:
+                while not self.queue.drained:
+                    if self._worker is None or not self._worker.is_alive():
+                        return False
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+            finally:
+                self._flush_waiters -= 1
+
+        return True
+
+    def shutdown(self, timeout: Optional[float] = 5.0) -> None:
+        """Flushes outstanding records and stops the worker thread"""
+
+        if self._worker is None:
+            return
+
+        self.flush(timeout)
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._worker.join(timeout)
+        self._worker = None
+        atexit.unregister(self.shutdown)
+
+    def _next_batch(self) -> Optional[List[Dict[str, Any]]]:
+        """Waits until a batch is due, then takes it off the queue. Returns None when stopping with nothing queued, and
+        an empty batch when the queue is idle and a replay is due"""
+
+        queue = self.queue
+        with self._condition:
+            while not queue.records:
+                if self._stopping:
+                    return None
+                if self._replay_due:
+                    return []
+                if self.replay is None:
+                    self._condition.wait()
+                elif not self._condition.wait(queue.config.replay_interval):
+                    self._replay_due = True
+
+            # Wait for the batch to fill, or for the window opened by the first record to close
+            deadline = time.monotonic() + queue.config.batch_interval
+            while not queue.full_batch and not self._stopping and not self._flush_waiters:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    break
+
+            return queue.take_batch()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if not batch:
+                self._run_replay()
+                continue
+
+            try:
+                success = self.send_batch(batch)
+            except Exception as error:  # pylint: disable=broad-except
+                success = False
+                self._report_error(f"Failed to send log batch to API: {error}")
+
+            if not success and self.on_failure is not None:
+                self.on_failure(batch)
+
+            with self._condition:
+                self.queue.done(batch, success)
+                self._condition.notify_all()
+
+    def _run_replay(self) -> None:
+        """Sends one batch of backlog. Live records are always taken first, as this only runs with an empty queue"""
+
+        assert self.replay is not None
+        try:
+            self._replay_due = self.replay()
+        except Exception as error:  # pylint: disable=broad-except
+            self._replay_due = False
+            self._report_error(f"Failed to replay log backlog to API: {error}")
+
+    def _report_error(self, message: str) -> None:
+        if self.on_error is not None:
+            self.on_error(message)
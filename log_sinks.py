@@ -0,0 +1,142 @@
+"""Routing of records to sinks. Each sink is registered with the lowest level it writes, and the sinks for each level are
+worked out whenever a sink changes, so handing a record to its sinks is one list lookup"""
+
+import os
+import threading
+from typing import BinaryIO, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_level import LoggingLevel
+    from log_record import LogRecord
+else:
+    from .logging_level import LoggingLevel  # type: ignore[no-redef]
+    from .log_record import LogRecord  # type: ignore[no-redef]
+
+LocalWrite = Callable[[LogRecord], None]
+# Called with the record, and whether it was logged from a coroutine, so sending it mustn't block the event loop
+RemoteWrite = Callable[[LogRecord, bool], None]
+
+# Above every level, for when no sink is enabled
+NO_LEVEL = max(LoggingLevel) + 1
+
+
+class Sink(NamedTuple):
+    name: str
+    write: Callable[..., None]
+    level: LoggingLevel  # Lowest level written
+    remote: bool  # Only gets records whose log call set send_to_api, see RemoteWrite
+    enabled: bool
+
+
+class SinkPipeline:
+    """The sinks records are written to, in the order they were added. local[level] and remote[level] hold the write
+    functions of the enabled sinks for each level, by its int value. They are replaced rather than changed, so are read
+    without a lock. on_change is called after every change"""
+
+    def __init__(self, on_change: Optional[Callable[[], None]] = None) -> None:
+        self.on_change = on_change
+
+        self.local: List[Tuple[LocalWrite, ...]] = [()] * NO_LEVEL
+        self.remote: List[Tuple[RemoteWrite, ...]] = [()] * NO_LEVEL
+        # Lowest level any enabled local sink writes, NO_LEVEL if there is none
+        self.min_level = NO_LEVEL
+
+        self._sinks: Dict[str, Sink] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, write: Callable[..., None], level: LoggingLevel, remote: bool = False, enabled: bool = True) -> None:
+        """Adds a sink, replacing any with the same name. write is a LocalWrite, or a RemoteWrite if remote"""
+
+        with self._lock:
+            self._sinks[name] = Sink(name, write, level, remote, enabled)
+            self._rebuild()
+        self._changed()
+
+    def remove(self, name: str) -> bool:
+        """Removes a sink. Returns False if there was none by that name"""
+
+        with self._lock:
+            if self._sinks.pop(name, None) is None:
+                return False
+            self._rebuild()
+        self._changed()
+
+        return True
+
+    def set_level(self, name: str, level: LoggingLevel) -> None:
+        self._update(name, lambda sink: sink._replace(level=level))
+
+    def enable(self, name: str, enabled: bool = True) -> None:
+        self._update(name, lambda sink: sink._replace(enabled=enabled))
+
+    def get(self, name: str) -> Optional[Sink]:
+        return self._sinks.get(name)
+
+    def registered(self) -> List[Sink]:
+        with self._lock:
+            return list(self._sinks.values())
+
+    def write(self, record: LogRecord) -> None:
+        """Writes record to the local sinks for its level"""
+
+        for write in self.local[record.logging_level]:
+            write(record)
+
+    def _update(self, name: str, change: Callable[[Sink], Sink]) -> None:
+        """Replaces a sink with change(sink). Raises KeyError if there is no sink by that name"""
+
+        with self._lock:
+            self._sinks[name] = change(self._sinks[name])
+            self._rebuild()
+        self._changed()
+
+    def _rebuild(self) -> None:
+        sinks = [sink for sink in self._sinks.values() if sink.enabled]
+        self.local = [tuple(sink.write for sink in sinks if not sink.remote and level >= sink.level) for level in range(NO_LEVEL)]
+        self.remote = [tuple(sink.write for sink in sinks if sink.remote and level >= sink.level) for level in range(NO_LEVEL)]
+        self.min_level = min((int(sink.level) for sink in sinks if not sink.remote), default=NO_LEVEL)
+
+    def _changed(self) -> None:
+        if self.on_change is not None:
+            self.on_change()
+
+
+class FileSink:
+    """Appends records to a file as encode renders them. The file is opened by the first write, so it is only made once
+    there is something to put in it, and written unbuffered, so each record is on disk when write returns"""
+
+    def __init__(self, path: str, encode: Callable[[LogRecord], bytes]) -> None:
+        self.path = path
+        self.encode = encode
+
+        self.records_written = 0
+        self.bytes_written = 0
+
+        self._file: Optional[BinaryIO] = None
+        self._lock = threading.Lock()
+
+    def write(self, record: LogRecord) -> None:
+        data = self.encode(record)
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "ab", buffering=0)  # pylint: disable=consider-using-with
+            self._file.write(data)
+            self.records_written += 1
+            self.bytes_written += len(data)
+
+    def reopen(self, path: str) -> None:
+        """Switches to path, which is opened by the next write"""
+
+        with self._lock:
+            self._close()
+            self.path = path
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,177 @@
+"""Disk-backed store-and-forward spool for remote logs that could not be delivered. Records are appended to segment
+files as length-prefixed, checksummed frames so a crash mid-write loses at most the torn frame at the end."""
+
+import os
+import json
+import zlib
+import struct
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+if os.getenv("STANDALONE", None) is not None:
+    from logger_config import SpoolConfig
+else:
+    from .logger_config import SpoolConfig  # type: ignore[no-redef]
+
+SEGMENT_SUFFIX = ".seg"
+FRAME_HEADER = struct.Struct(">II")  # Payload length, CRC32 of payload
+
+
+class LogSpool:
+    """Append-only spool of log records under directory. Records are written to the newest segment, and read back
+    oldest first by a single consumer with read_batch() followed by commit_batch() once the batch has been delivered.
+    When the spool grows past max_bytes the oldest segments are deleted. Delivery is at least once: a batch read but
+    not committed before a crash is read again."""
+
+    def __init__(self, directory: str, config: SpoolConfig = SpoolConfig()) -> None:
+        self.directory = directory
+        self.config = config
+
+        self.evicted_segments = 0
+        self.evicted_bytes = 0
+
+        self._lock = threading.Lock()
+        self._read_offset = 0
+        self._pending_offset = 0
+        self._pending_segment: Optional[int] = None
+
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+        self._segments = sorted(int(name[: -len(SEGMENT_SUFFIX)]) for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+        if self._segments:
+            self._recover(self._segments[-1])
+            self._total_bytes = sum(os.path.getsize(self._segment_path(segment)) for segment in self._segments)
+        else:
+            self._segments.append(0)
+            self._total_bytes = 0
+        self._active_file = open(self._segment_path(self._segments[-1]), "ab", buffering=0)  # pylint: disable=consider-using-with
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:012d}{SEGMENT_SUFFIX}")
+
+    def _recover(self, segment: int) -> None:
+        """Truncates a torn frame left at the end of the segment by a crash mid-write"""
+
+        path = self._segment_path(segment)
+        with open(path, "rb") as segment_file:
+            data = segment_file.read()
+
+        _, valid_length = self._decode_frames(data, 0, None)
+        if valid_length < len(data):
+            with open(path, "r+b") as segment_file:
+                segment_file.truncate(valid_length)
+
+    @staticmethod
+    def _decode_frames(data: bytes, offset: int, max_records: Optional[int]) -> Tuple[List[Dict[str, Any]], int]:
+        """Decodes frames from offset until the data runs out, a frame is corrupt or max_records is reached. Returns the
+        records and the offset just past the last good frame"""
+
+        records: List[Dict[str, Any]] = []
+        while max_records is None or len(records) < max_records:
+            payload_start = offset + FRAME_HEADER.size
+            if payload_start > len(data):
+                break
+            length, checksum = FRAME_HEADER.unpack_from(data, offset)
+            payload_end = payload_start + length
+            payload = data[payload_start:payload_end]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break
+            records.append(json.loads(payload))
+            offset = payload_end
+
+        return records, offset
+
+    @property
+    def size(self) -> int:
+        """Bytes currently held in the spool"""
+
+        return self._total_bytes
+
+    def append(self, records: List[Dict[str, Any]]) -> None:
+        """Appends records to the spool with a single write"""
+
+        frames = []
+        for record in records:
+            payload = json.dumps(record).encode("utf-8")
+            frames.append(FRAME_HEADER.pack(len(payload), zlib.crc32(payload)))
+            frames.append(payload)
+        data = b"".join(frames)
+
+        with self._lock:
+            self._active_file.write(data)
+            if self.config.fsync:
+                os.fsync(self._active_file.fileno())
+            self._total_bytes += len(data)
+
+            if self._active_file.tell() >= self.config.segment_bytes:
+                self._start_segment()
+            self._evict()
+
+    def _start_segment(self) -> None:
+        self._active_file.close()
+        self._segments.append(self._segments[-1] + 1)
+        self._active_file = open(self._segment_path(self._segments[-1]), "ab", buffering=0)  # pylint: disable=consider-using-with
+
+    def _evict(self) -> None:
+        """Deletes the oldest closed segments until the spool is back under max_bytes"""
+
+        while self._total_bytes > self.config.max_bytes and len(self._segments) > 1:
+            self.evicted_bytes += self._drop_oldest_segment()
+            self.evicted_segments += 1
+
+    def _drop_oldest_segment(self) -> int:
+        """Deletes the oldest segment, returning its size"""
+
+        path = self._segment_path(self._segments.pop(0))
+        size = os.path.getsize(path)
+        os.remove(path)
+        self._total_bytes -= size
+        self._read_offset = 0
+
+        return size
+
+    def read_batch(self, max_records: int = 500) -> List[Dict[str, Any]]:
+        """Reads up to max_records of the oldest records without removing them. Call commit_batch() once delivered"""
+
+        with self._lock:
+            while True:
+                # Seal the active segment so the reader never shares a file with the writer
+                if len(self._segments) == 1:
+                    if self._active_file.tell() == 0:
+                        return []
+                    self._start_segment()
+
+                with open(self._segment_path(self._segments[0]), "rb") as segment_file:
+                    data = segment_file.read()
+
+                records, offset = self._decode_frames(data, self._read_offset, max_records)
+                if len(records) < max_records:
+                    # End of the segment, or a corrupt frame. Nothing after a corrupt frame can be framed again
+                    offset = len(data)
+                if not records:
+                    self._drop_oldest_segment()
+                    continue
+
+                self._pending_segment = self._segments[0]
+                self._pending_offset = offset
+
+                return records
+
+    def commit_batch(self) -> None:
+        """Removes the records returned by the last read_batch() from the spool"""
+
+        with self._lock:
+            # The segment may have been evicted while the batch was being delivered
+            if self._pending_segment is None or self._segments[0] != self._pending_segment:
+                return
+
+            if self._pending_offset >= os.path.getsize(self._segment_path(self._pending_segment)):
+                self._drop_oldest_segment()
+            else:
+                self._read_offset = self._pending_offset
+            self._pending_segment = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._active_file.close()
@@ -0,0 +1,326 @@
+"""Upload of whole daily log files, or byte ranges of them, to the API for post-mortems. Files are sent in chunks from a
+worker thread at low CPU priority, each gzipped unless the file already is, and paced to max_bytes_per_second of request
+body so uploads never crowd out live logging. The offset reached in each file is saved after every chunk the API
+accepts, so an upload that is interrupted, by a failure or a restart, resumes from there rather than resending.
+
+Each chunk is posted to the upload URL with headers the API puts the file back together from: X-Device-Id, X-Log-File
+(the file's name), X-Upload-Offset (of the chunk's first byte in the file), X-Upload-Length (of the chunk before
+compression), X-Upload-End (the offset the upload stops at) and, on the last chunk, X-Upload-Final: 1.
+"""
+
+import os
+import io
+import gzip
+import json
+import time
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, NamedTuple, Optional, Tuple
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_transport import HttpTransport
+    from log_rotation import COMPRESSED_SUFFIX
+    from logger_config import UploadConfig
+else:
+    from .logging_transport import HttpTransport  # type: ignore[no-redef]
+    from .log_rotation import COMPRESSED_SUFFIX  # type: ignore[no-redef]
+    from .logger_config import UploadConfig  # type: ignore[no-redef]
+
+
+class UploadJob(NamedTuple):
+    path: str
+    start: int = 0
+    end: Optional[int] = None  # None uploads up to the file's size when the upload starts
+
+
+def _exists(path: str) -> bool:
+    """Whether the file at path is there, as it is or compressed by the housekeeper"""
+
+    return os.path.exists(path) or os.path.exists(path + COMPRESSED_SUFFIX)
+
+
+class UploadCursor:
+    """Offset reached by each upload, kept as JSON in path and replaced atomically on every change. Uploads are keyed by
+    file and start offset, and remember the file's inode, so a file that has been replaced is uploaded from the start.
+    An upload whose file has since been compressed keeps its cursor, see _ChunkSender.open"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+        self._uploads: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(path, encoding="utf-8") as cursor_file:
+                self._uploads = json.load(cursor_file)
+        except (OSError, ValueError):
+            pass
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(job: UploadJob) -> str:
+        return f"{os.path.abspath(job.path)}:{job.start}"
+
+    def offset(self, job: UploadJob, inode: int) -> int:
+        """Returns where the upload of job resumes from"""
+
+        with self._lock:
+            upload = self._uploads.get(self._key(job))
+        if upload is None or upload["inode"] != inode:
+            return job.start
+        return max(job.start, int(upload["offset"]))
+
+    def unfinished_upload(self, job: UploadJob) -> Optional[Tuple[int, int]]:
+        """Returns the inode and end saved for job, if it stopped before its end"""
+
+        with self._lock:
+            upload = self._uploads.get(self._key(job))
+        if upload is None or upload["offset"] >= upload["end"]:
+            return None
+        return int(upload["inode"]), int(upload["end"])
+
+    def save(self, job: UploadJob, inode: int, offset: int, end: int) -> None:
+        """Records how far the upload of job has got. Only unfinished uploads are written to path, so the next run finds
+        just what there is to resume. Finished ones are remembered until then, so a file uploaded again after it grew
+        sends only the new bytes"""
+
+        with self._lock:
+            self._uploads[self._key(job)] = {"path": job.path, "start": job.start, "inode": inode, "offset": offset, "end": end}
+            self._uploads = {key: upload for key, upload in self._uploads.items() if _exists(upload["path"])}
+            temporary_path = self.path + ".tmp"
+            with open(temporary_path, "w", encoding="utf-8") as cursor_file:
+                json.dump({key: upload for key, upload in self._uploads.items() if upload["offset"] < upload["end"]}, cursor_file)
+                cursor_file.flush()
+                os.fsync(cursor_file.fileno())
+            os.replace(temporary_path, self.path)
+
+    def unfinished(self) -> Dict[str, UploadJob]:
+        """Returns the uploads that stopped before their end, whose files are still there, to resume"""
+
+        with self._lock:
+            uploads = list(self._uploads.items())
+        return {
+            key: UploadJob(upload["path"], upload["start"], upload["end"])
+            for key, upload in uploads
+            if upload["offset"] < upload["end"] and _exists(upload["path"])
+        }
+
+
+class _ChunkSender:
+    """Sends an upload's chunks, paced to config.max_bytes_per_second of request body, saving the cursor after each one
+    the API accepts. Waits between chunks end early once stop is set"""
+
+    def __init__(
+        self,
+        transport: HttpTransport,
+        url: str,
+        device_id: str,
+        cursor: UploadCursor,
+        config: UploadConfig,
+        on_error: Optional[Callable[[str], None]],
+        on_notice: Optional[Callable[[str], None]],
+    ) -> None:
+        self.transport = transport
+        self.url = url
+        self.device_id = device_id
+        self.cursor = cursor
+        self.config = config
+        self.on_error = on_error
+        self.on_notice = on_notice
+
+        # Bytes of the files uploaded, and of the request bodies they were sent as
+        self.bytes_uploaded = 0
+        self.bytes_sent = 0
+        self.stop = threading.Event()
+        # When the next chunk may be sent, by time.monotonic(), to keep under max_bytes_per_second
+        self._ready_at = 0.0
+
+    def upload(self, job: UploadJob) -> bool:
+        """See LogUploader.upload"""
+
+        name = os.path.basename(job.path)
+        compressed = job.path.endswith(COMPRESSED_SUFFIX)
+        try:
+            log_file, inode, size = self.open(job)
+            with log_file:
+                end = size if job.end is None else min(job.end, size)
+                offset = self.cursor.offset(job, inode)
+                log_file.seek(offset)
+
+                while offset < end:
+                    data = log_file.read(min(self.config.chunk_bytes, end - offset))
+                    body = data if compressed else gzip.compress(data, compresslevel=6)
+                    headers = {
+                        "Content-Type": "application/octet-stream",
+                        "X-Device-Id": self.device_id,
+                        "X-Log-File": name,
+                        "X-Upload-Offset": str(offset),
+                        "X-Upload-Length": str(len(data)),
+                        "X-Upload-End": str(end),
+                    }
+                    if not compressed:
+                        headers["Content-Encoding"] = "gzip"
+                    if offset + len(data) == end:
+                        headers["X-Upload-Final"] = "1"
+
+                    if self.stop.wait(max(0.0, self._ready_at - time.monotonic())):
+                        return False
+                    self._ready_at = max(self._ready_at, time.monotonic()) + len(body) / self.config.max_bytes_per_second
+
+                    result = self.transport.post_body(self.url, body, headers, len(data))
+                    if result.status_code != 200:
+                        self._report(self.on_error, f"Failed to upload {name} at offset {offset}: {result.status_code} - {result.text}")
+                        return False
+
+                    offset += len(data)
+                    self.bytes_uploaded += len(data)
+                    self.bytes_sent += len(body)
+                    self.cursor.save(job, inode, offset, end)
+        except FileNotFoundError:
+            # Deleted, or compressed by the housekeeper before its upload started. Retrying can't help
+            self._report(self.on_error, f"Failed to upload {name}: it no longer exists")
+            return True
+        except OSError as error:
+            self._report(self.on_error, f"Failed to upload {name}: {error}")
+            return False
+
+        self._report(self.on_notice, f"Uploaded {name} up to offset {end}")
+        return True
+
+    def open(self, job: UploadJob) -> Tuple[io.BufferedIOBase, int, int]:
+        """Opens the file to upload for job, and returns it with the inode and size the cursor knows it by. A file the
+        housekeeper compressed after its upload started is read back through gzip, under its first inode, so the upload
+        goes on from the same offset in the same bytes rather than from the start"""
+
+        try:
+            log_file = open(job.path, "rb")  # pylint: disable=consider-using-with
+        except FileNotFoundError:
+            compressed_path = job.path + COMPRESSED_SUFFIX
+            unfinished = None if job.path.endswith(COMPRESSED_SUFFIX) else self.cursor.unfinished_upload(job)
+            if unfinished is None or not os.path.exists(compressed_path):
+                raise
+            inode, end = unfinished
+            return gzip.open(compressed_path, "rb"), inode, end
+
+        stat = os.fstat(log_file.fileno())
+        return log_file, stat.st_ino, stat.st_size
+
+    @staticmethod
+    def _report(report: Optional[Callable[[str], None]], message: str) -> None:
+        if report is not None:
+            report(message)
+
+
+class LogUploader:
+    """Uploads the files submitted, one at a time and in order, on a worker thread. A failed upload is retried from its
+    cursor after config.retry_interval seconds, doubled on each failure in a row up to config.max_retry_interval.
+    config.niceness is applied to the worker thread where the platform allows it"""
+
+    def __init__(
+        self,
+        transport: HttpTransport,
+        url: str,
+        device_id: str,
+        cursor_path: str,
+        config: UploadConfig = UploadConfig(),
+        on_error: Optional[Callable[[str], None]] = None,
+        on_notice: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.config = config
+
+        self._sender = _ChunkSender(transport, url, device_id, UploadCursor(cursor_path), config, on_error, on_notice)
+        self._jobs: Deque[UploadJob] = deque()
+        self._busy = False
+        self._condition = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+
+    @property
+    def transport(self) -> HttpTransport:
+        return self._sender.transport
+
+    @property
+    def cursor(self) -> UploadCursor:
+        return self._sender.cursor
+
+    @property
+    def bytes_uploaded(self) -> int:
+        """Bytes of the files uploaded"""
+
+        return self._sender.bytes_uploaded
+
+    @property
+    def bytes_sent(self) -> int:
+        """Bytes of the request bodies they were sent as"""
+
+        return self._sender.bytes_sent
+
+    def submit(self, path: str, start: int = 0, end: Optional[int] = None) -> None:
+        """Queues a file, or the bytes from start up to end of it, for upload"""
+
+        with self._condition:
+            self._jobs.append(UploadJob(path, start, end))
+            self._condition.notify_all()
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="birdbot-log-upload", daemon=True)
+                self._worker.start()
+
+    def resume(self) -> int:
+        """Queues the uploads the cursor says were interrupted. Returns how many there were"""
+
+        jobs = self.cursor.unfinished().values()
+        for job in jobs:
+            self.submit(*job)
+        return len(jobs)
+
+    @property
+    def pending(self) -> int:
+        """Uploads queued or in progress"""
+
+        with self._condition:
+            return len(self._jobs) + self._busy
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits for every queued upload to finish. Returns False if they hadn't by the timeout"""
+
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._jobs and not self._busy, timeout)
+
+    def close(self) -> None:
+        """Stops after the chunk in flight. Uploads left unfinished resume from their cursor when submitted again"""
+
+        self._sender.stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._worker is not None:
+            self._worker.join()
+
+    def _run(self) -> None:
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.config.niceness)
+        except (AttributeError, OSError):
+            pass
+
+        stop = self._sender.stop
+        delay = self.config.retry_interval
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._jobs or stop.is_set())
+                if stop.is_set():
+                    return
+                job = self._jobs[0]
+                self._busy = True
+
+            done = self.upload(job)
+            with self._condition:
+                if done:
+                    self._jobs.popleft()
+                self._busy = False
+                self._condition.notify_all()
+
+            if not done and stop.wait(delay):
+                return
+            delay = self.config.retry_interval if done else min(delay * 2, self.config.max_retry_interval)
+
+    def upload(self, job: UploadJob) -> bool:
+        """Sends job from its cursor to its end. Returns True once all of it has been accepted, or the file is gone, and
+        False if a chunk failed or the uploader is closing"""
+
+        return self._sender.upload(job)
@@ -0,0 +1,143 @@
+"""Settings for the logger's optional features, one group per feature, passed to BirdbotLoggerUtils together as a
+LoggerConfig. Every group defaults to its feature being off, or working as it did before it could be configured, so
+only the groups that change anything need giving, e.g. LoggerConfig(shipper=ShipperConfig(background=True))"""
+
+import os
+from enum import Enum
+from typing import Dict, NamedTuple, Optional, Tuple
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_level import LoggingLevel
+    from log_format import LogFormat
+else:
+    from .logging_level import LoggingLevel  # type: ignore[no-redef]
+    from .log_format import LogFormat  # type: ignore[no-redef]
+
+
+class OverflowPolicy(Enum):
+    """What to do with a new record when the shipper queue is full"""
+
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+
+
+class ConsoleConfig(NamedTuple):
+    buffered: bool = False
+    colour: Optional[bool] = None  # None colours console output only when stdout is a TTY and NO_COLOR isn't set
+
+
+class FileConfig(NamedTuple):
+    log_format: LogFormat = LogFormat.TEXT
+    error_log_file: bool = True  # Also write ERROR records to the day's error log file
+    index_interval: int = 0  # Records between entries in the sidecar index log_query.py uses, 0 disables the index
+    async_writes: bool = False  # Write from a background thread, see file_writer.py. The rest only apply to it
+    flush_interval: float = 1.0  # In seconds
+    flush_bytes: int = 64 * 1024
+    fsync_on_error: bool = False
+    block_on_error: bool = False
+    max_queue_size: int = 100000
+
+
+class RetentionConfig(NamedTuple):
+    """Housekeeping of closed days, see log_rotation.py. Off unless one of these is set"""
+
+    max_age_days: Optional[int] = None
+    max_total_bytes: Optional[int] = None
+    compress: bool = False
+
+
+class HttpConfig(NamedTuple):
+    pool_size: int = 2
+    max_retries: int = 0
+    timeout: float = 10  # In seconds
+    compress_threshold: Optional[int] = None  # In bytes
+
+
+class ShipperConfig(NamedTuple):
+    """Batching of records sent to the API. Also applies to the alog_* functions, which always batch. Background sending
+    is opt-in: by default a log call that sends to the API posts the record itself, as it always has, and waits for up
+    to HttpConfig.timeout while the API doesn't answer"""
+
+    background: bool = False  # Send from a background thread, rather than in the log call
+    batch_size: int = 50
+    batch_interval: float = 1.0  # In seconds
+    max_queue_size: int = 1000
+    overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST
+    replay_interval: float = 5.0  # In seconds, how often an idle shipper replays the spool
+
+
+class CircuitConfig(NamedTuple):
+    failure_threshold: int = 5  # Failed API sends in a row that pause sending, 0 never pauses
+    backoff: float = 1.0  # In seconds, the first pause, doubled each time the API is still down after it
+    max_backoff: float = 300.0  # In seconds
+    jitter: float = 0.5  # Up to this fraction of the pause is taken off at random
+
+
+class SpoolConfig(NamedTuple):
+    enabled: bool = False
+    max_bytes: int = 50 * 1024 * 1024
+    segment_bytes: int = 1024 * 1024
+    fsync: bool = False
+    replay_batch_size: int = 500
+
+
+class UploadConfig(NamedTuple):
+    url: Optional[str] = None  # Where upload_log_file() sends files, logging_api_url + "/upload" if not set
+    max_bytes_per_second: float = 64 * 1024  # Of compressed data
+    chunk_bytes: int = 256 * 1024
+    retry_interval: float = 5.0  # In seconds
+    max_retry_interval: float = 300.0  # In seconds
+    niceness: int = 10
+
+
+class DatagramConfig(NamedTuple):
+    address: Optional[str] = None  # "udp://host:port" or "unix:///path", see datagram_transport.py. None disables datagrams
+    below: LoggingLevel = LoggingLevel.WARNING  # Records sent to the API below this go by datagram
+    max_packet_size: Optional[int] = None  # In bytes, by default sized for the MTU over UDP
+    flush_interval: float = 0.05  # In seconds
+
+
+class CoalesceConfig(NamedTuple):
+    window: float = 0  # In seconds, 0 disables coalescing of repeated messages
+    max_entries: int = 1024
+
+
+class SamplingConfig(NamedTuple):
+    rates: Optional[Dict[LoggingLevel, int]] = None  # Level: N, to write 1 in N calls from each call site
+    budget: float = 0  # Records per second from sampled call sites before their rates go up, 0 never
+    max_sites: int = 4096  # Call sites and templates counted, the least recently used are forgotten past this
+
+
+class FlightRecorderConfig(NamedTuple):
+    size: int = 0  # Recent log calls attached to errors sent to the API, 0 disables the recorder
+    level: LoggingLevel = LoggingLevel.DEBUG
+
+
+class StatsConfig(NamedTuple):
+    collect: bool = True
+    interval: float = 0  # In seconds, how often a stats record is logged if collected, 0 never
+
+
+class AggregatorConfig(NamedTuple):
+    socket: Optional[str] = None  # Unix socket path shared by the processes on a device, None logs locally
+    collector: bool = False  # Collect the other processes' records on socket, rather than send them
+    source: str = ""  # Name prefixed to this process's messages by the collector
+
+
+class LoggerConfig(NamedTuple):
+    console: ConsoleConfig = ConsoleConfig()
+    file: FileConfig = FileConfig()
+    retention: RetentionConfig = RetentionConfig()
+    http: HttpConfig = HttpConfig()
+    shipper: ShipperConfig = ShipperConfig()
+    circuit: CircuitConfig = CircuitConfig()
+    spool: SpoolConfig = SpoolConfig()
+    upload: UploadConfig = UploadConfig()
+    datagram: DatagramConfig = DatagramConfig()
+    coalesce: CoalesceConfig = CoalesceConfig()
+    sampling: SamplingConfig = SamplingConfig()
+    flight_recorder: FlightRecorderConfig = FlightRecorderConfig()
+    stats: StatsConfig = StatsConfig()
+    aggregator: AggregatorConfig = AggregatorConfig()
+    rate_limit_budgets: Optional[Dict[LoggingLevel, Tuple[float, float]]] = None  # Level: (burst, refill per second)
+    exception_window: float = 3600.0  # In seconds, repeats of an exception within it are logged without the traceback
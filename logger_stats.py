@@ -0,0 +1,131 @@
+"""Self-instrumentation for the logger: cheap counters and latency histograms, read together by get_stats().
+
+Counters are kept per thread, so counting never takes a lock or contends with other threads. A snapshot adds up every
+thread's counts. Histograms are only used on the slow API path and take a lock.
+"""
+
+import os
+import bisect
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_level import LoggingLevel
+else:
+    from .logging_level import LoggingLevel  # type: ignore[no-redef]
+
+# The logger's counters. The first ones count the records made at each level, indexed by the level
+LOGGER_COUNTERS = [f"records.{level.name}" for level in LoggingLevel] + ["sink.console", "sink.api", "sink.aggregator", "api.sent", "api.failures", "api.lost"]
+CONSOLE_WRITES, API_RECORDS, AGGREGATOR_RECORDS, API_SENT, API_FAILURES, API_LOST = range(len(LoggingLevel), len(LOGGER_COUNTERS))
+
+
+class LatencyHistogram:
+    """Counts durations into fixed buckets, in milliseconds. Percentiles are reported as the upper bound of the bucket
+    they fall in"""
+
+    BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+    def __init__(self) -> None:
+        self._counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        milliseconds = seconds * 1000
+        with self._lock:
+            self._counts[bisect.bisect_left(self.BOUNDS_MS, milliseconds)] += 1
+            self._total_ms += milliseconds
+            self._max_ms = max(self._max_ms, milliseconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total_ms = self._total_ms
+            max_ms = self._max_ms
+
+        count = sum(counts)
+        labels = [f"<={bound}" for bound in self.BOUNDS_MS] + [f">{self.BOUNDS_MS[-1]}"]
+
+        return {
+            "count": count,
+            "mean_ms": round(total_ms / count, 3) if count else 0.0,
+            "max_ms": round(max_ms, 3),
+            "p50_ms": self._percentile(counts, count, 0.5, max_ms),
+            "p90_ms": self._percentile(counts, count, 0.9, max_ms),
+            "p99_ms": self._percentile(counts, count, 0.99, max_ms),
+            "buckets": dict(zip(labels, counts)),
+        }
+
+    def _percentile(self, counts: List[int], count: int, fraction: float, max_ms: float) -> float:
+        if count == 0:
+            return 0.0
+
+        seen = 0
+        index = len(counts) - 1
+        for bucket, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= count * fraction:
+                index = bucket
+                break
+
+        # The last bucket has no upper bound, and no bucket goes higher than the largest duration seen
+        bound = float(self.BOUNDS_MS[index]) if index < len(self.BOUNDS_MS) else max_ms
+        return round(min(bound, max_ms), 3)
+
+
+class LoggerStats:
+    """Counters named by names and identified by their position in it, plus the API send latency histogram. Each
+    thread adds to its own list of counts, which are summed when read"""
+
+    def __init__(self, names: Sequence[str]) -> None:
+        self.names = tuple(names)
+        self.api_latency = LatencyHistogram()
+        # Holds the calling thread's counts as .counts
+        self.local = threading.local()
+
+        self._shards: List[List[int]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reporter: Optional[threading.Thread] = None
+
+    def report_every(self, interval: float, report: Callable[[], None]) -> None:
+        """Calls report every interval seconds, from a background thread, until close()"""
+
+        self._reporter = threading.Thread(target=self._report_periodically, args=(interval, report), name="birdbot-stats", daemon=True)
+        self._reporter.start()
+
+    def _report_periodically(self, interval: float, report: Callable[[], None]) -> None:
+        while not self._stop.wait(interval):
+            report()
+
+    def close(self) -> None:
+        """Stops reporting"""
+
+        self._stop.set()
+        if self._reporter is not None:
+            self._reporter.join()
+
+    def shard(self) -> List[int]:
+        """Returns the calling thread's counts, indexed like names. Hot paths add to it directly"""
+
+        try:
+            counts: List[int] = self.local.counts
+        except AttributeError:
+            # The only time counting takes the lock
+            counts = self.local.counts = [0] * len(self.names)
+            with self._lock:
+                self._shards.append(counts)
+
+        return counts
+
+    def increment(self, index: int, amount: int = 1) -> None:
+        self.shard()[index] += amount
+
+    def counters(self) -> Dict[str, int]:
+        """Returns every counter, summed over all threads"""
+
+        with self._lock:
+            shards = list(self._shards)
+
+        return {name: sum(counts[index] for counts in shards) for index, name in enumerate(self.names)}
@@ -0,0 +1,86 @@
+"""Pooled keep-alive HTTP transport for remote logging"""
+
+import gzip
+import json
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    import requests
+
+
+def encode_body(payload: Any, compress_threshold: Optional[int]) -> Tuple[bytes, Dict[str, str], int]:
+    """Returns payload as a JSON request body, gzipped if it is over compress_threshold bytes, with its headers and its
+    size before compression"""
+
+    body = json.dumps(payload).encode("utf-8")
+    uncompressed_size = len(body)
+    headers = {"Content-Type": "application/json"}
+
+    if compress_threshold is not None and uncompressed_size > compress_threshold:
+        body = gzip.compress(body)
+        headers["Content-Encoding"] = "gzip"
+
+    return body, headers, uncompressed_size
+
+
+class HttpTransport:
+    """Owns a requests session so connections to the logging API are reused rather than re-established (TCP and TLS)
+    for every log. Request bodies larger than compress_threshold bytes are gzipped, None disables compression."""
+
+    def __init__(
+        self,
+        pool_size: int = 2,
+        max_retries: int = 0,
+        backoff_factor: float = 0.5,  # In seconds
+        compress_threshold: Optional[int] = None,  # In bytes
+        timeout: float = 10,  # In seconds
+    ) -> None:
+        self.compress_threshold = compress_threshold
+        self.timeout = timeout
+
+        # Body bytes as sent, after compression, and before compression
+        self.bytes_sent = 0
+        self.bytes_uncompressed = 0
+        self.requests_sent = 0
+        self._counter_lock = threading.Lock()
+
+        # Imported here, as requests takes longer to import than the rest of the logger together
+        import requests  # pylint: disable=import-outside-toplevel,redefined-outer-name
+        from requests.adapters import HTTPAdapter  # pylint: disable=import-outside-toplevel
+        from urllib3.util.retry import Retry  # pylint: disable=import-outside-toplevel
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["POST"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def post(self, url: str, payload: Any) -> "requests.Response":
+        """Posts payload as JSON, compressing it if it is over the threshold"""
+
+        body, headers, uncompressed_size = encode_body(payload, self.compress_threshold)
+        return self.post_body(url, body, headers, uncompressed_size)
+
+    def post_body(self, url: str, body: bytes, headers: Dict[str, str], uncompressed_size: int) -> "requests.Response":
+        """Posts a body that is already encoded, counting it as post does"""
+
+        result = self.session.post(url, data=body, headers=headers, timeout=self.timeout)
+
+        with self._counter_lock:
+            self.requests_sent += 1
+            self.bytes_sent += len(body)
+            self.bytes_uncompressed += uncompressed_size
+
+        return result
+
+    def close(self) -> None:
+        """Closes pooled connections"""
+
+        self.session.close()
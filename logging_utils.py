@@ -1,100 +1,309 @@
 import os
+import json
 import time
 import logging
 from datetime import datetime
-from typing import Callable
-
-import requests
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
 
 if os.getenv("STANDALONE", None) is not None:
     from logging_level import LoggingLevel, convert_logging_level
+    from log_coalescer import LogCoalescer
+    from log_record import LogRecord, TimestampCache
+    from log_rotation import COMPRESSED_SUFFIX
+    from console_sink import ConsoleSink
+    from logger_stats import AGGREGATOR_RECORDS, CONSOLE_WRITES, LOGGER_COUNTERS, LoggerStats
+    from log_sampler import LogSampler
+    from log_sinks import SinkPipeline
+    from exception_groups import ExceptionGrouper
+    from log_files import HandlerFileWriter, LogFiles
+    from api_client import ApiClient
+    from remote_delivery import RemoteDelivery
+    from logger_config import LoggerConfig
 else:
     from .logging_level import LoggingLevel, convert_logging_level  # type: ignore[no-redef]
+    from .log_coalescer import LogCoalescer  # type: ignore[no-redef]
+    from .log_record import LogRecord, TimestampCache  # type: ignore[no-redef]
+    from .log_rotation import COMPRESSED_SUFFIX  # type: ignore[no-redef]
+    from .console_sink import ConsoleSink  # type: ignore[no-redef]
+    from .logger_stats import AGGREGATOR_RECORDS, CONSOLE_WRITES, LOGGER_COUNTERS, LoggerStats  # type: ignore[no-redef]
+    from .log_sampler import LogSampler  # type: ignore[no-redef]
+    from .log_sinks import SinkPipeline  # type: ignore[no-redef]
+    from .exception_groups import ExceptionGrouper  # type: ignore[no-redef]
+    from .log_files import HandlerFileWriter, LogFiles  # type: ignore[no-redef]
+    from .api_client import ApiClient  # type: ignore[no-redef]
+    from .remote_delivery import RemoteDelivery  # type: ignore[no-redef]
+    from .logger_config import LoggerConfig  # type: ignore[no-redef]
+
+# Imported when first used, as it pulls in socket, which only some configurations need
+if TYPE_CHECKING:
+    if os.getenv("STANDALONE", None) is not None:
+        from log_aggregator import AggregatedRecord
+    else:
+        from .log_aggregator import AggregatedRecord  # type: ignore[no-redef]
 
 # As this is intended to be used as a submodule, the intention is that there is a config.py file in the root dir that
 # contains the configuration values for this module along with other config values, allowing us to configure these in
-# one place.
-from config import CONFIGURED_LOGGING_LEVEL, LOGGING_DIRECTORY, ENABLE_REMOTE_LOGGING, REMOTE_LOGGING_RATE_LIMIT, LOGGING_API_URL, DEVICE_ID
+# one place. It is only read for the arguments a logger is made without, so the logger can also be configured in code,
+# without a config.py. Argument: (name in config.py, value without a config.py)
+CONFIG_VALUES: Dict[str, Tuple[str, Any]] = {
+    "logging_directory": ("LOGGING_DIRECTORY", "logs"),
+    "logging_level": ("CONFIGURED_LOGGING_LEVEL", LoggingLevel.INFO),
+    "enable_remote_logging": ("ENABLE_REMOTE_LOGGING", False),
+    "remote_logging_rate_limit": ("REMOTE_LOGGING_RATE_LIMIT", 0),
+    "logging_api_url": ("LOGGING_API_URL", ""),
+    "device_id": ("DEVICE_ID", ""),
+}
+
+
+def read_config(argument: str) -> Any:
+    """Returns the config.py value for an argument in CONFIG_VALUES"""
+
+    name, default = CONFIG_VALUES[argument]
+    try:
+        import config  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return default
+
+    return getattr(config, name, default)
+
 
 COLOUR_GREEN = "\x1b[32m"
 COLOUR_YELLOW = "\x1b[33m"
 COLOUR_RED = "\x1b[31m"
 COLOUR_RESET = "\x1b[0m"
 
+# Console colour prefix and suffix for each level
+COLOUR_CODES = {
+    LoggingLevel.DEBUG: ("", ""),
+    LoggingLevel.INFO: ("", ""),
+    LoggingLevel.NOTICE: (COLOUR_GREEN, COLOUR_RESET),
+    LoggingLevel.WARNING: (COLOUR_YELLOW, COLOUR_RESET),
+    LoggingLevel.ERROR: (COLOUR_RED, COLOUR_RESET),
+}
+
+# Shared by every logger in the process, as the time text only changes once a second whichever logger formats it
+TIMESTAMPS = TimestampCache()
+
 
 class BirdbotLoggerUtils:
     def __init__(
         self,
-        logging_directory: str = LOGGING_DIRECTORY,
-        logging_level: LoggingLevel = CONFIGURED_LOGGING_LEVEL,
-        enable_remote_logging: bool = ENABLE_REMOTE_LOGGING,
-        remote_logging_rate_limit: int = REMOTE_LOGGING_RATE_LIMIT,
-        logging_api_url: str = LOGGING_API_URL,
-        device_id: str = DEVICE_ID,
+        # These six are read from config.py when not given, see CONFIG_VALUES
+        logging_directory: Optional[str] = None,
+        logging_level: Optional[LoggingLevel] = None,
+        enable_remote_logging: Optional[bool] = None,
+        remote_logging_rate_limit: Optional[int] = None,  # In milliseconds
+        logging_api_url: Optional[str] = None,
+        device_id: Optional[str] = None,
+        quiet: bool = False,
+        config: LoggerConfig = LoggerConfig(),  # The optional features, see logger_config.py
     ) -> None:
-        self.logging_directory = logging_directory
-        self.logging_level = logging_level
-        self.enable_remote_logging = enable_remote_logging
-        self.remote_logging_rate_limit = remote_logging_rate_limit  # In milliseconds
-        self.logging_api_url = logging_api_url
-        self.device_id = device_id
-
-        self.birdbot_logger = self._setup_logger()
-        self.last_log_message_sent_ts = 0  # In milliseconds
-
+        directory: str = read_config("logging_directory") if logging_directory is None else logging_directory
+        device_id = read_config("device_id") if device_id is None else device_id
+        self._logging_level: LoggingLevel = read_config("logging_level") if logging_level is None else logging_level
+        self.enable_remote_logging: bool = read_config("enable_remote_logging") if enable_remote_logging is None else enable_remote_logging
         # If we're testing, disable remote logging
         if os.getenv("TESTING", None) is not None:
             self.enable_remote_logging = False
+        self._quiet = quiet
+
+        # Counters and histograms reported by get_stats()
+        self.stats = LoggerStats(LOGGER_COUNTERS) if config.stats.collect else None
+        # Checked once, so output piped into journald or a file has no ANSI codes
+        self.console = ConsoleSink(COLOUR_CODES, colour=config.console.colour, buffered=config.console.buffered)
+        logging.getLogger("birdbot_logger").setLevel(convert_logging_level(self._logging_level))
+        self.files = LogFiles(directory, device_id, config.file, config.retention, on_error=self._report_error)
+
+        self.remote = RemoteDelivery(
+            config,
+            ApiClient(read_config("logging_api_url") if logging_api_url is None else logging_api_url, device_id, config, self.stats, self.log_locally),
+            directory,
+            read_config("remote_logging_rate_limit") if remote_logging_rate_limit is None else remote_logging_rate_limit,
+            self.enable_remote_logging,
+            self._write_aggregated_record,
+        )
+
+        # When set, only 1 in N calls from each call site at the sampled levels is written, see log_sampler.py. A budget
+        # without rates samples DEBUG and INFO, starting from every call
+        self.log_sampler: Optional[LogSampler] = None
+        if config.sampling.rates or config.sampling.budget > 0:
+            rates = config.sampling.rates or {LoggingLevel.DEBUG: 1, LoggingLevel.INFO: 1}
+            self.log_sampler = LogSampler(rates, config.sampling.budget, max_sites=config.sampling.max_sites)
+
+        self.log_coalescer = LogCoalescer(config.coalesce.window, config.coalesce.max_entries) if config.coalesce.window > 0 else None
+        # Groups the exceptions passed to log_exception() by fingerprint, see exception_groups.py
+        self.exception_grouper = ExceptionGrouper(config.exception_window)
+
+        # Where records go, see log_sinks.py. The console and main file write from logging_level, and the error file from
+        # ERROR. birdbot_logger adds the API
+        self.sinks = SinkPipeline()
+        self.sinks.add("console", self._write_console, self._logging_level, enabled=not quiet)
+        self.sinks.add("file", self.files.write, self._logging_level)
+        if self.files.error_sink is not None:
+            self.sinks.add("error_file", self.files.write_error, LoggingLevel.ERROR)
+
+        # When set, a stats record is logged locally every config.stats.interval seconds
+        if self.stats is not None and config.stats.interval > 0:
+            self.stats.report_every(config.stats.interval, lambda: self.log_locally(f"Logger stats: {json.dumps(self.get_stats())}", LoggingLevel.INFO))
+
+        if self.enable_remote_logging:
+            self.remote.resume_uploads()
 
-    def _setup_logger(self) -> logging.Logger:
-        """Configures logger"""
+    @property
+    def logging_level(self) -> LoggingLevel:
+        """Lowest level written to the console and the main log file"""
 
-        birdbot_logger = logging.getLogger("birdbot_logger")
-        logger_filename = self.generate_log_file_name(error=False)
-        file_handler = logging.FileHandler(logger_filename)
-        birdbot_logger.setLevel(convert_logging_level(self.logging_level))
-        birdbot_logger.addHandler(file_handler)
+        return self._logging_level
 
-        return birdbot_logger
+    def set_logging_level(self, logging_level: LoggingLevel) -> None:
+        """Changes the level for the console and the main log file"""
+
+        self._logging_level = logging_level
+        logging.getLogger("birdbot_logger").setLevel(convert_logging_level(logging_level))
+        for name in ("console", "file"):
+            if self.sinks.get(name) is not None:
+                self.sinks.set_level(name, logging_level)
+
+    @property
+    def quiet(self) -> bool:
+        """Whether console output is off. The file and API are unaffected"""
+
+        return self._quiet
+
+    def set_quiet(self, quiet: bool) -> None:
+        """Turns console output off, or back on"""
+
+        self._quiet = quiet
+        if self.sinks.get("console") is not None:
+            self.sinks.enable("console", not quiet)
+
+    @property
+    def log_file_path(self) -> str:
+        """The day's log file"""
+
+        return self.files.path
+
+    @property
+    def birdbot_logger(self) -> logging.Logger:
+        """The logging logger the log file handler is on"""
+
+        return logging.getLogger("birdbot_logger")
+
+    @property
+    def file_handler(self) -> Optional[logging.FileHandler]:
+        """The handler writing the log file, or None if records are written by the async file writer"""
+
+        writer = self.files.writer
+        return writer.handler if isinstance(writer, HandlerFileWriter) else None
+
+    @property
+    def last_log_message_sent_ts(self) -> int:
+        """When a record was last sent to the API, in milliseconds"""
+
+        return self.remote.api.last_log_message_sent_ts
+
+    def make_record(self, message: Any, logging_level: LoggingLevel) -> LogRecord:
+        """Builds the record for one log call, formatted once for every sink"""
+
+        stats = self.stats
+        if stats is not None:
+            # As LoggerStats.increment, inlined as this runs for every record
+            try:
+                stats.local.counts[logging_level] += 1
+            except AttributeError:
+                stats.shard()[logging_level] += 1
+        created, time_text = TIMESTAMPS.now()
+        return LogRecord(logging_level, message, created, time_text, f"{time_text}: {logging_level.name}: {message}")
 
     def write_to_console(self, message: str, logging_level: LoggingLevel = LoggingLevel.INFO) -> None:
         """Writes message to console"""
 
         if logging_level >= self.logging_level:
-            print(self.format_text(message, colour=True, logging_level=logging_level))
+            self.write_record_to_console(self.make_record(message, logging_level))
+
+    def write_record_to_console(self, record: LogRecord) -> None:
+        """Writes record to console, coloured by level"""
+
+        if record.logging_level >= self._logging_level and not self._quiet:
+            self._write_console(record)
+
+    def _write_console(self, record: LogRecord) -> None:
+        if self.stats is not None:
+            self.stats.increment(CONSOLE_WRITES)
+        self.console.write(record)
+
+    def write_record_to_file(self, record: LogRecord) -> None:
+        """Writes record to the log file. Levels are checked by the caller"""
+
+        self.files.write(record)
+
+    def log_locally(self, message: str, logging_level: LoggingLevel) -> None:
+        """Writes message to the local sinks only. Used from background threads, which can't call the log_* functions
+        without risking a loop back into the API"""
+
+        self.sinks.write(self.make_record(message, logging_level))
+
+    def forward_to_aggregator(self, message: Any, logging_level: LoggingLevel, send_to_api: bool) -> bool:
+        """Sends a record to the collector process. Returns False if there is no collector or it didn't take the record,
+        which the caller then writes locally"""
+
+        aggregator_client = self.remote.aggregator_client
+        if aggregator_client is None or not aggregator_client.send(logging_level, str(message), time.time(), send_to_api):
+            return False
+
+        if self.stats is not None:
+            self.stats.increment(logging_level)
+            self.stats.increment(AGGREGATOR_RECORDS)
+        return True
+
+    def _write_aggregated_record(self, aggregated: "AggregatedRecord") -> None:
+        """Writes a record received from another process to the local sinks and, if asked, the API. Called from the
+        collector thread"""
+
+        message = f"{aggregated.source}: {aggregated.message}" if aggregated.source else aggregated.message
+        logging_level = aggregated.logging_level
+        if self.stats is not None:
+            self.stats.increment(logging_level)
+        time_text = TIMESTAMPS.format(aggregated.created)
+        record = LogRecord(logging_level, message, aggregated.created, time_text, f"{time_text}: {logging_level.name}: {message}")
+
+        self.sinks.write(record)
+        if aggregated.send_to_api and self.enable_remote_logging:
+            self.send_log_to_api(message, logging_level, lambda error, _: self._report_error(error), self._report_notice)
+
+    def describe_exception(self, exception: BaseException, message: str = "") -> str:
+        """Returns the message to log for exception, after message if given: its traceback the first time it is seen in
+        exception_window, and a line with its fingerprint and a count after that"""
+
+        return self.exception_grouper.capture(exception).format_message(message)
+
+    def send_log_datagram(self, record: LogRecord) -> None:
+        """Queues a record for the next datagram. Never blocks"""
+
+        self.remote.send_datagram(record)
+
+    def _report_error(self, message: str) -> None:
+        self.log_locally(message, LoggingLevel.ERROR)
+
+    def _report_notice(self, message: str) -> None:
+        self.log_locally(message, LoggingLevel.NOTICE)
 
     @staticmethod
     def format_text(message: str, colour: bool = False, logging_level: LoggingLevel = LoggingLevel.INFO) -> str:
         time = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
 
         if colour:
-            if logging_level == LoggingLevel.ERROR:
-                message = COLOUR_RED + message + COLOUR_RESET
-            elif logging_level == LoggingLevel.WARNING:
-                message = COLOUR_YELLOW + message + COLOUR_RESET
-            elif logging_level == LoggingLevel.NOTICE:
-                message = COLOUR_GREEN + message + COLOUR_RESET
-            else:
-                message = message
+            prefix, suffix = COLOUR_CODES[logging_level]
+            message = prefix + message + suffix
 
         formatted_message = f"{time}: {logging_level.name}: {message}"
 
         return formatted_message
 
-    def generate_log_file_name(self, error: bool) -> str:
-        """Generates log file name from current date"""
-
-        current_date = datetime.now()
+    def generate_log_file_name(self, error: bool, date: Optional[datetime] = None) -> str:
+        """Generates log file name from date, by default the current date. The extension depends on the log format"""
 
-        if not os.path.exists(self.logging_directory):
-            os.makedirs(self.logging_directory)
-
-        if error:
-            logging_filename = os.path.join(self.logging_directory, current_date.strftime("%d-%m-%y-birdbot-error.log"))
-        else:
-            logging_filename = os.path.join(self.logging_directory, current_date.strftime("%d-%m-%y-birdbot.log"))
-
-        return logging_filename
+        return self.files.file_name(error, date)
 
     def send_log_to_api(
         self,
@@ -103,28 +312,107 @@ class BirdbotLoggerUtils:
         error_logger: Callable[[str, bool], None],
         notice_logger: Callable[[str], None],
         override_rate_limit: bool = False,
+        attach_recent: Optional[bool] = None,
     ) -> None:
         """Sends log to API. error_logger is the log_error() function that is passed in to prevent circular imports.
-        Same for notice_logger"""
-
-        if self.remote_logging_rate_limit > 0 and not override_rate_limit:
-            if self.last_log_message_sent_ts + self.remote_logging_rate_limit > round(time.time() * 1000):
-                error_logger("Rate limit reached for remote logging", False)
-                return
-
-        data = {
-            "device_id": self.device_id,
-            "log_timestamp": round(time.time() * 1000),
-            "log_message": message,
-            "log_level": log_level.name,
+        Same for notice_logger. Records over the level's rate limit budget are counted, and a summary of them is sent
+        ahead of the next record at that level that is within budget, or by flush() or shutdown() if none comes. If the
+        flight recorder is enabled, its snapshot is sent as "recent_records" with errors, or whenever attach_recent is
+        set"""
+
+        self.remote.send(message, log_level, error_logger, notice_logger, override_rate_limit, attach_recent)
+
+    def send_log_to_api_async(self, message: str, log_level: LoggingLevel, override_rate_limit: bool = False, attach_recent: Optional[bool] = None) -> None:
+        """As send_log_to_api, but queues the records for the asyncio shipper of the running event loop. Never blocks the
+        loop. Failures are logged locally"""
+
+        self.remote.send_async(message, log_level, override_rate_limit, attach_recent)
+
+    def upload_log_file(self, date: Optional[datetime] = None, start: int = 0, end: Optional[int] = None, path: Optional[str] = None) -> Optional[str]:
+        """Queues the log file for date, by default today's, or the file at path, to be uploaded in the background from
+        byte start up to end, by default its size when the upload starts. A day that has been compressed is uploaded
+        compressed. Uploading the same file and start again carries on from where an unfinished upload got to. Returns
+        the path queued, or None if remote logging is disabled"""
+
+        if not self.enable_remote_logging:
+            return None
+        if path is None:
+            path = self.files.file_name(error=False, date=date)
+            if not os.path.exists(path) and os.path.exists(path + COMPRESSED_SUFFIX):
+                path += COMPRESSED_SUFFIX
+        self.remote.upload(path, start, end)
+
+        return path
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns a snapshot of the logger's counters, latencies and queue depths"""
+
+        counters = self.stats.counters() if self.stats is not None else {}
+        writer = self.files.writer
+        error_sink = self.files.error_sink
+        remote = self.remote
+
+        return {
+            "records": {level.name: counters.get(f"records.{level.name}", 0) for level in LoggingLevel},
+            "sinks": {
+                "console": counters.get("sink.console", 0),
+                "file": writer.records_written,
+                "error_file": error_sink.records_written if error_sink is not None else 0,
+                "api": counters.get("sink.api", 0),
+            },
+            "file": {
+                "bytes_written": writer.bytes_written,
+                "dropped": writer.dropped_count,
+                "queue_depth": writer.queue_depth,
+                "write_errors": writer.write_errors,
+            },
+            # The "api", "datagram" and "upload" sections
+            **remote.get_stats(counters),
+            "exceptions": {
+                "groups": self.exception_grouper.group_count,
+                "formatted": self.exception_grouper.formatted_count,
+                "repeats": self.exception_grouper.repeat_count,
+            },
+            "coalesced": self.log_coalescer.held_back_count if self.log_coalescer is not None else 0,
+            "sampled_out": self.log_sampler.sampled_out_count if self.log_sampler is not None else 0,
+            "aggregator": {
+                "forwarded": counters.get("sink.aggregator", 0),
+                "fallbacks": remote.aggregator_client.fallback_count if remote.aggregator_client is not None else 0,
+                "received": remote.collector.received_count if remote.collector is not None else 0,
+            },
         }
-        result = requests.post(self.logging_api_url, json=data, timeout=10)
 
-        # Set this now to prevent spamming the API, regardless of success
-        self.last_log_message_sent_ts = round(time.time() * 1000)
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits for queued file writes and remote logs to be done. Returns True if everything was written and sent
+        before the timeout"""
+
+        if self.enable_remote_logging:
+            self.remote.send_summaries()
+        self.console.flush()
+        flushed = self.files.flush(timeout)
+
+        return self.remote.flush(timeout) and flushed
+
+    async def flush_async(self, timeout: Optional[float] = None) -> bool:
+        """As flush, from a coroutine. Also waits for records queued by the alog_* functions on the running event loop to
+        be sent. The loop keeps running meanwhile"""
+
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        flushed = await self.remote.flush_async(timeout)
+
+        return await asyncio.get_running_loop().run_in_executor(None, self.flush, timeout) and flushed
 
-        if result.status_code != 200:
-            error_logger(f"Failed to send log to API: {result.status_code} - {result.text}", False)
-            return
+    def shutdown(self) -> None:
+        """Sends any queued remote logs, writes out queued file writes and stops the background threads. Also runs at
+        interpreter exit"""
 
-        notice_logger("Successfully sent log to API")
+        if self.stats is not None:
+            self.stats.close()
+        # Records already collected are handed to the sinks before they stop
+        self.remote.close_aggregator()
+        if self.enable_remote_logging:
+            self.remote.send_summaries()
+        self.remote.close()
+        self.files.close()
+        self.console.close()
@@ -0,0 +1,102 @@
+"""Token-bucket rate limiting for remote logging, with a budget per LoggingLevel. Suppressed records are counted rather
+than logged, and reported in one summary once budget returns, or when the logger is flushed."""
+
+import os
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_level import LoggingLevel
+else:
+    from .logging_level import LoggingLevel  # type: ignore[no-redef]
+
+
+class TokenBucket:
+    """Holds up to burst tokens, refilled at refill_rate tokens per second"""
+
+    def __init__(self, burst: float, refill_rate: float) -> None:
+        self.burst = burst
+        self.refill_rate = refill_rate
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+
+    def try_acquire(self) -> bool:
+        """Takes a token if one is available"""
+
+        now = time.monotonic()
+        elapsed = max(0.0, now - self.last_refill)
+        self.tokens = min(self.burst, self.tokens + elapsed * self.refill_rate)
+        self.last_refill = now
+
+        if self.tokens < 1:
+            return False
+
+        self.tokens -= 1
+        return True
+
+
+class RateLimiter:
+    """Per level token buckets. budgets maps a level to (burst, refill_rate in tokens per second), levels without a
+    budget are not limited"""
+
+    def __init__(self, budgets: Dict[LoggingLevel, Tuple[float, float]]) -> None:
+        self.buckets = {level: TokenBucket(burst, refill_rate) for level, (burst, refill_rate) in budgets.items()}
+        self.suppressed_counts = {level: 0 for level in LoggingLevel}
+        self.total_suppressed = 0
+
+        self._first_suppressed_ts = {level: 0.0 for level in LoggingLevel}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_rate_limit(cls, rate_limit: int, budgets: Optional[Dict[LoggingLevel, Tuple[float, float]]] = None) -> "RateLimiter":
+        """Builds the limiter from the REMOTE_LOGGING_RATE_LIMIT config value (in milliseconds between error logs), which
+        becomes an ERROR budget of one record per rate_limit ms. budgets are applied on top"""
+
+        default_budgets: Dict[LoggingLevel, Tuple[float, float]] = {}
+        if rate_limit > 0:
+            default_budgets[LoggingLevel.ERROR] = (1, 1000 / rate_limit)
+        default_budgets.update(budgets or {})
+
+        return cls(default_budgets)
+
+    def acquire(self, level: LoggingLevel) -> bool:
+        """Returns True if a record at level may be sent, otherwise counts it as suppressed"""
+
+        bucket = self.buckets.get(level)
+        if bucket is None:
+            return True
+
+        with self._lock:
+            if bucket.try_acquire():
+                return True
+
+            if self.suppressed_counts[level] == 0:
+                self._first_suppressed_ts[level] = time.monotonic()
+            self.suppressed_counts[level] += 1
+            self.total_suppressed += 1
+
+            return False
+
+    def take_summary(self, level: LoggingLevel) -> Optional[str]:
+        """Returns a summary of the records suppressed at level since the last summary, if there were any"""
+
+        with self._lock:
+            suppressed = self.suppressed_counts[level]
+            if suppressed == 0:
+                return None
+
+            self.suppressed_counts[level] = 0
+            window = round(time.monotonic() - self._first_suppressed_ts[level])
+
+        return f"{suppressed} {level.name} records suppressed in last {window}s"
+
+    def take_summaries(self) -> List[Tuple[LoggingLevel, str]]:
+        """Returns the level and summary of every level with records suppressed since its last summary"""
+
+        summaries = []
+        for level in LoggingLevel:
+            summary = self.take_summary(level)
+            if summary is not None:
+                summaries.append((level, summary))
+        return summaries
@@ -0,0 +1,412 @@
+"""Delivery of records to the API: posted from the log call, or queued for the background or asyncio shipper, with the
+rate limiter in front and the spool behind. Also owns the other ways records leave the process, the datagram transport,
+log file uploads and the aggregator"""
+
+import os
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+if os.getenv("STANDALONE", None) is not None:
+    from logging_level import LoggingLevel
+    from log_record import LogRecord
+    from log_shipper import LogShipper
+    from logging_transport import HttpTransport
+    from log_spool import LogSpool
+    from rate_limiter import RateLimiter
+    from logger_stats import API_LOST, API_RECORDS
+    from log_upload import LogUploader, UploadCursor
+    from api_client import ApiClient
+    from logger_config import LoggerConfig
+else:
+    from .logging_level import LoggingLevel  # type: ignore[no-redef]
+    from .log_record import LogRecord  # type: ignore[no-redef]
+    from .log_shipper import LogShipper  # type: ignore[no-redef]
+    from .logging_transport import HttpTransport  # type: ignore[no-redef]
+    from .log_spool import LogSpool  # type: ignore[no-redef]
+    from .rate_limiter import RateLimiter  # type: ignore[no-redef]
+    from .logger_stats import API_LOST, API_RECORDS  # type: ignore[no-redef]
+    from .log_upload import LogUploader, UploadCursor  # type: ignore[no-redef]
+    from .api_client import ApiClient  # type: ignore[no-redef]
+    from .logger_config import LoggerConfig  # type: ignore[no-redef]
+
+# Imported when first used, as they pull in asyncio and socket, which only some configurations need
+if TYPE_CHECKING:
+    if os.getenv("STANDALONE", None) is not None:
+        from log_aggregator import AggregatedRecord, AggregatorClient, LogCollector
+        from datagram_transport import DatagramTransport
+        from async_shipper import AsyncLogShipper
+    else:
+        from .log_aggregator import AggregatedRecord, AggregatorClient, LogCollector  # type: ignore[no-redef]
+        from .datagram_transport import DatagramTransport  # type: ignore[no-redef]
+        from .async_shipper import AsyncLogShipper  # type: ignore[no-redef]
+
+
+class RemoteDelivery:
+    """Sends records through api, with the rest of config deciding how. Only the aggregator runs unless enabled, and
+    callers only send, upload or send summaries if enabled. Records over remote_logging_rate_limit, in milliseconds
+    between errors, are held back, see rate_limiter.py. The spool and upload cursor are kept under directory. A
+    collector hands the records it receives to receive"""
+
+    def __init__(
+        self,
+        config: LoggerConfig,
+        api: ApiClient,
+        directory: str,
+        remote_logging_rate_limit: int,
+        enabled: bool,
+        receive: Callable[["AggregatedRecord"], None],
+    ) -> None:
+        self.config = config
+        self.api = api
+        self.rate_limiter = RateLimiter.from_rate_limit(remote_logging_rate_limit, config.rate_limit_budgets)
+
+        # When set, records sent to the API below config.datagram.below are packed into datagrams and sent without waiting
+        # for an answer, rather than posted. They aren't rate limited, spooled or retried
+        self.datagram: Optional["DatagramTransport"] = None
+        if config.datagram.address is not None and enabled:
+            self._start_datagram()
+
+        # When set, records that can't be delivered are kept on disk and replayed once the API is reachable again
+        self.spool: Optional[LogSpool] = None
+        if config.spool.enabled and enabled:
+            self.spool = LogSpool(os.path.join(directory, "spool"), config.spool)
+
+        # When set, send queues records for a background worker instead of posting them inline. A collector always sends
+        # from one, as the records it receives are sent from its receiving thread, and a slow post there would leave the
+        # clients timing out and writing their records locally. With a spool, the worker also replays it, so records sent
+        # inline never wait on the backlog
+        self.shipper: Optional[LogShipper] = None
+        if (config.shipper.background or self._collecting or self.spool is not None) and enabled:
+            self.shipper = LogShipper(
+                api.send_batch,
+                config.shipper,
+                on_error=self._report_error,
+                on_failure=self._keep,
+                replay=None if self.spool is None else self.replay_spool,
+            )
+            self.shipper.start()
+
+        # Records sent by the alog_* functions are queued for a shipper on the calling event loop, made on first use on
+        # each loop, and posted through the HTTP transport from a pool of config.http.pool_size threads, so the event loop
+        # never waits on the network. Batching is as for the background shipper, with up to pool_size batches in flight
+        self.async_shipper: Optional["AsyncLogShipper"] = None
+
+        # Log files queued by upload are sent in chunks by a background thread, made on first use, or by resume_uploads
+        # to resume uploads a previous run left unfinished. How far each has got is kept in the cursor
+        self.uploader: Optional[LogUploader] = None
+        self.upload_cursor_path = os.path.join(directory, "upload-cursor.json")
+
+        # When set, one process on the device collects every other process's records over config.aggregator.socket and
+        # writes them to its own sinks, sharing its rate limiter. The others send their records there, and write them
+        # locally only while the collector is unreachable
+        self.aggregator_client: Optional["AggregatorClient"] = None
+        self.collector: Optional["LogCollector"] = None
+        if config.aggregator.socket is not None:
+            self._start_aggregator(config.aggregator.socket, receive)
+
+    @property
+    def _collecting(self) -> bool:
+        return self.config.aggregator.socket is not None and self.config.aggregator.collector
+
+    def _start_datagram(self) -> None:
+        if os.getenv("STANDALONE", None) is not None:
+            from datagram_transport import DatagramTransport  # pylint: disable=import-outside-toplevel
+        else:
+            from .datagram_transport import DatagramTransport  # type: ignore[no-redef] # pylint: disable=import-outside-toplevel
+
+        datagram = self.config.datagram
+        assert datagram.address is not None
+        self.datagram = DatagramTransport(datagram.address, self.api.device_id, datagram.max_packet_size, datagram.flush_interval)
+
+    def _start_aggregator(self, socket_path: str, receive: Callable[["AggregatedRecord"], None]) -> None:
+        """Starts the collector, or connects to it. Imported here, as only multi-process setups need sockets"""
+
+        if os.getenv("STANDALONE", None) is not None:
+            from log_aggregator import AggregatorClient, LogCollector  # pylint: disable=import-outside-toplevel
+        else:
+            from .log_aggregator import AggregatorClient, LogCollector  # type: ignore[no-redef] # pylint: disable=import-outside-toplevel
+
+        if self.config.aggregator.collector:
+            self.collector = LogCollector(socket_path, receive, on_error=self._report_error)
+            self.collector.start()
+        else:
+            self.aggregator_client = AggregatorClient(socket_path, self.config.aggregator.source)
+
+    def send(
+        self,
+        message: str,
+        log_level: LoggingLevel,
+        error_logger: Callable[[str, bool], None],
+        notice_logger: Callable[[str], None],
+        override_rate_limit: bool = False,
+        attach_recent: Optional[bool] = None,
+    ) -> None:
+        """See BirdbotLoggerUtils.send_log_to_api"""
+
+        for data in self._records(message, log_level, override_rate_limit, attach_recent):
+            self._deliver(data, error_logger, notice_logger)
+
+    def send_async(self, message: str, log_level: LoggingLevel, override_rate_limit: bool = False, attach_recent: Optional[bool] = None) -> None:
+        """See BirdbotLoggerUtils.send_log_to_api_async"""
+
+        async_shipper = self._get_async_shipper()
+        for data in self._records(message, log_level, override_rate_limit, attach_recent):
+            if self.api.stats is not None:
+                self.api.stats.increment(API_RECORDS)
+            async_shipper.enqueue(data)
+
+    def send_datagram(self, record: LogRecord) -> None:
+        """Queues a record for the next datagram. Never blocks"""
+
+        if self.datagram is not None:
+            self.datagram.send(record.logging_level, str(record.message), record.created)
+
+    def send_summaries(self) -> None:
+        """Sends the summaries of records suppressed by the rate limit that no later record has carried, so a storm that
+        stops is still reported. Failures are logged locally"""
+
+        for log_level, summary in self.rate_limiter.take_summaries():
+            try:
+                self._deliver(self.api.build_record(summary, log_level), lambda error, _: self._report_error(error), self._report_notice)
+            except OSError as error:
+                self._report_error(f"Failed to send log to API: {error}")
+
+    def _records(self, message: str, log_level: LoggingLevel, override_rate_limit: bool, attach_recent: Optional[bool]) -> List[Dict[str, Any]]:
+        """Returns the records to send for one log call: none if it is over the rate limit, otherwise the record, after
+        a summary of any suppressed before it"""
+
+        if not override_rate_limit and not self.rate_limiter.acquire(log_level):
+            return []
+
+        records = []
+        summary = self.rate_limiter.take_summary(log_level)
+        if summary is not None:
+            records.append(self.api.build_record(summary, log_level))
+        records.append(self.api.build_record(message, log_level, log_level >= LoggingLevel.ERROR if attach_recent is None else attach_recent))
+
+        return records
+
+    def _deliver(self, data: Dict[str, Any], error_logger: Callable[[str, bool], None], notice_logger: Callable[[str], None]) -> None:
+        """Queues the record for the background shipper, or posts it now"""
+
+        if self.api.stats is not None:
+            self.api.stats.increment(API_RECORDS)
+
+        if self.shipper is not None and (self.config.shipper.background or self._collecting):
+            self.shipper.enqueue(data)
+            return
+
+        if not self.api.available():
+            self._keep([data])
+            return
+
+        try:
+            result = self.api.post(data)
+        except OSError:
+            # requests' exceptions are OSErrors. Without a spool, the caller reports them as before
+            if self.spool is None:
+                raise
+            self.spool.append([data])
+            self.api.mark_sent()
+            error_logger("Failed to send log to API, saved for later delivery", False)
+            return
+
+        self.api.mark_sent()
+
+        if result.status_code != 200:
+            if self.spool is not None:
+                self.spool.append([data])
+            error_logger(f"Failed to send log to API: {result.status_code} - {result.text}", False)
+            return
+
+        notice_logger("Successfully sent log to API")
+
+        # The API is reachable, so have the shipper deliver any backlog rather than waiting for its next replay
+        if self.shipper is not None and self.spool is not None and self.spool.size > 0:
+            self.shipper.request_replay()
+
+    def _keep(self, batch: List[Dict[str, Any]]) -> None:
+        """Spools records that weren't sent, when the circuit was open or a batch failed. Without a spool they are
+        counted as lost, as nothing else reports them"""
+
+        if self.spool is not None:
+            self.spool.append(batch)
+        elif self.api.stats is not None:
+            self.api.stats.increment(API_LOST, len(batch))
+
+    def replay_spool(self) -> bool:
+        """Sends the oldest batch of spooled records to the API. Returns True if it was delivered and more are waiting"""
+
+        if self.spool is None:
+            return False
+
+        batch = self.spool.read_batch(self.config.spool.replay_batch_size)
+        if not batch or not self.api.available():
+            return False
+
+        result = self.api.post(batch)
+        if result.status_code != 200:
+            return False
+
+        self.spool.commit_batch()
+
+        return self.spool.size > 0
+
+    def _get_async_shipper(self) -> "AsyncLogShipper":
+        """Returns the asyncio shipper for the running event loop, starting one if there is none for it yet. Records
+        still queued for a previous loop are moved to the new one"""
+
+        # Imported here, so programs that never log from asyncio don't pay for it
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        loop = asyncio.get_running_loop()
+        previous = self.async_shipper
+        if previous is not None and previous.loop is loop:
+            return previous
+
+        if os.getenv("STANDALONE", None) is not None:
+            from async_shipper import AsyncLogShipper  # pylint: disable=import-outside-toplevel
+        else:
+            from .async_shipper import AsyncLogShipper  # type: ignore[no-redef] # pylint: disable=import-outside-toplevel
+
+        self.async_shipper = AsyncLogShipper(
+            self.api.send_batch_async,
+            self.config.shipper,
+            max_concurrency=self.config.http.pool_size,
+            on_error=self._report_error,
+            on_failure=self._keep,
+        )
+        self.async_shipper.start()
+        if previous is not None:
+            for data in previous.take_pending():
+                self.async_shipper.enqueue(data)
+
+        return self.async_shipper
+
+    def get_uploader(self) -> LogUploader:
+        """Returns the uploader, starting it if it isn't yet"""
+
+        with self.api.lock:
+            if self.uploader is None:
+                os.makedirs(os.path.dirname(self.upload_cursor_path) or ".", exist_ok=True)
+                upload = self.config.upload
+                url = self.api.url.rstrip("/") + "/upload" if upload.url is None else upload.url
+                # A transport of its own, so uploads don't hold up records waiting for a connection
+                self.uploader = LogUploader(
+                    HttpTransport(pool_size=1, timeout=self.config.http.timeout),
+                    url,
+                    self.api.device_id,
+                    self.upload_cursor_path,
+                    upload,
+                    on_error=self._report_error,
+                    on_notice=self._report_notice,
+                )
+
+        return self.uploader
+
+    def upload(self, path: str, start: int = 0, end: Optional[int] = None) -> None:
+        """Queues the file at path to be uploaded in the background, see LogUploader.submit"""
+
+        self.get_uploader().submit(path, start, end)
+
+    def resume_uploads(self) -> None:
+        """Queues the uploads a previous run left unfinished. Checked first, so starting without uploads to resume
+        doesn't make the uploader, or import requests for it"""
+
+        if UploadCursor(self.upload_cursor_path).unfinished():
+            self.get_uploader().resume()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits for records queued for the background shipper to be sent, and sends the datagram being filled. Returns
+        False if the shipper didn't drain before the timeout"""
+
+        flushed = True
+        if self.shipper is not None:
+            flushed = self.shipper.flush(timeout)
+        if self.datagram is not None:
+            self.datagram.flush()
+
+        return flushed
+
+    async def flush_async(self, timeout: Optional[float] = None) -> bool:
+        """Waits for records queued by the alog_* functions on the running event loop to be sent. The loop keeps running
+        meanwhile"""
+
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        if self.async_shipper is None or self.async_shipper.loop is not asyncio.get_running_loop():
+            return True
+        return await self.async_shipper.flush(timeout)
+
+    def close_aggregator(self) -> None:
+        """Stops the collector, handing the records it has already received to receive, or disconnects from it"""
+
+        if self.collector is not None:
+            self.collector.close()
+        if self.aggregator_client is not None:
+            self.aggregator_client.close()
+
+    def close(self) -> None:
+        """Sends any queued records and stops the background threads. Unfinished uploads carry on from their cursor next
+        run"""
+
+        # Records the alog_* functions queued that were never sent, as their event loop stopped first
+        if self.async_shipper is not None:
+            pending = self.async_shipper.take_pending()
+            if pending:
+                try:
+                    self.api.send_batch(pending)
+                except OSError as error:
+                    self._report_error(f"Failed to send log batch to API: {error}")
+        if self.shipper is not None:
+            self.shipper.shutdown()
+        if self.datagram is not None:
+            self.datagram.close()
+        if self.uploader is not None:
+            self.uploader.close()
+            self.uploader.transport.close()
+        if self.spool is not None:
+            self.spool.close()
+        self.api.close()
+
+    def get_stats(self, counters: Dict[str, int]) -> Dict[str, Any]:
+        """Returns the "api", "datagram" and "upload" sections of the logger's stats, given its counters"""
+
+        shippers: List[Any] = [shipper for shipper in (self.shipper, self.async_shipper) if shipper is not None]
+        breaker = self.api.circuit_breaker
+        datagram = self.datagram
+        uploader = self.uploader
+        stats = self.api.stats
+
+        return {
+            "api": {
+                "sent": counters.get("api.sent", 0),
+                "failures": counters.get("api.failures", 0),
+                "rate_limited": self.rate_limiter.total_suppressed,
+                "bytes_sent": self.api.bytes_sent,
+                "latency": stats.api_latency.snapshot() if stats is not None else None,
+                "queue_depth": sum(shipper.queue_depth for shipper in shippers),
+                "dropped": sum(shipper.queue.dropped_oldest_count + shipper.queue.dropped_newest_count for shipper in shippers),
+                "spooled_bytes": self.spool.size if self.spool is not None else 0,
+                "lost": counters.get("api.lost", 0),
+                "circuit": breaker.state.value if breaker is not None else None,
+                "short_circuited": breaker.short_circuited_count if breaker is not None else 0,
+            },
+            "datagram": {
+                "records_sent": datagram.records_sent if datagram is not None else 0,
+                "packets_sent": datagram.packets_sent if datagram is not None else 0,
+                "bytes_sent": datagram.bytes_sent if datagram is not None else 0,
+                "send_failures": datagram.send_failures if datagram is not None else 0,
+                "truncated": datagram.truncated_count if datagram is not None else 0,
+            },
+            "upload": {
+                "pending": uploader.pending if uploader is not None else 0,
+                "bytes_uploaded": uploader.bytes_uploaded if uploader is not None else 0,
+                "bytes_sent": uploader.bytes_sent if uploader is not None else 0,
+            },
+        }
+
+    def _report_error(self, message: str) -> None:
+        self.api.report(message, LoggingLevel.ERROR)
+
+    def _report_notice(self, message: str) -> None:
+        self.api.report(message, LoggingLevel.NOTICE)
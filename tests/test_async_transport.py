@@ -0,0 +1,222 @@
+import os
+import sys
+import gzip
+import json
+import asyncio
+import tempfile
+import unittest
+from typing import Any, List
+from unittest.mock import Mock
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from logging_utils.py
+
+from async_shipper import AsyncLogShipper  # noqa: E402
+from async_transport import AsyncHttpTransport  # noqa: E402
+from logging_transport import HttpTransport  # noqa: E402
+from logging_utils import BirdbotLoggerUtils  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import LoggerConfig, ShipperConfig  # noqa: E402
+
+
+class AsyncApiStandIn:
+    """Logging API stand-in on the test's event loop. Records what it receives, and how many requests it was handling at
+    once"""
+
+    def __init__(self, status_code: int = 200, latency: float = 0, chunked: bool = False, close: bool = False) -> None:
+        self.status_code = status_code
+        self.latency = latency
+        self.chunked = chunked
+        self.close = close
+
+        self.received: List[Any] = []
+        self.connection_count = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}/log"
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connection_count += 1
+        try:
+            while await self._handle_request(reader, writer):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        if not await reader.readline():
+            return False
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers["content-length"]))
+        if headers.get("content-encoding") == "gzip":
+            body = gzip.decompress(body)
+        self.received.append(json.loads(body))
+
+        self.concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        await asyncio.sleep(self.latency)
+        self.concurrent -= 1
+
+        response = b"OK" if self.status_code == 200 else b"Injected error"
+        head = f"HTTP/1.1 {self.status_code} Status\r\n" + ("Connection: close\r\n" if self.close else "")
+        if self.chunked:
+            writer.write(f"{head}Transfer-Encoding: chunked\r\n\r\n".encode() + b"1\r\nO\r\n1\r\nK\r\n0\r\n\r\n")
+        else:
+            writer.write(f"{head}Content-Length: {len(response)}\r\n\r\n".encode() + response)
+        await writer.drain()
+
+        return not self.close
+
+
+class Test(unittest.IsolatedAsyncioTestCase):
+    async def start_api(self, **kwargs: Any) -> str:
+        self.api = AsyncApiStandIn(**kwargs)
+        url = await self.api.start()
+        self.addAsyncCleanup(self.api.stop)
+        return url
+
+    def make_transport(self, pool_size: int = 2, **kwargs: Any) -> AsyncHttpTransport:
+        http_transport = HttpTransport(pool_size=pool_size, **kwargs)
+        self.addCleanup(http_transport.close)
+        transport = AsyncHttpTransport(http_transport, pool_size=pool_size)
+        self.addCleanup(transport.close)
+        return transport
+
+    async def test_post_reuses_connection(self) -> None:
+        """Tests posts share one kept-alive connection and return the response"""
+
+        url = await self.start_api()
+        transport = self.make_transport()
+
+        for index in range(3):
+            response = await transport.post(url, {"log_message": f"test {index}"})
+            self.assertEqual((response.status_code, response.text), (200, "OK"))
+
+        self.assertEqual(self.api.received, [{"log_message": f"test {index}"} for index in range(3)])
+        self.assertEqual(self.api.connection_count, 1)
+
+    async def test_post_compressed_chunked_and_closed(self) -> None:
+        """Tests large bodies are gzipped, and chunked responses on connections the server closes are read"""
+
+        url = await self.start_api(chunked=True, close=True)
+        transport = self.make_transport(compress_threshold=100)
+
+        payload = [{"log_message": "x" * 50} for _ in range(10)]
+        for _ in range(2):
+            response = await transport.post(url, payload)
+            self.assertEqual((response.status_code, response.text), (200, "OK"))
+
+        self.assertEqual(self.api.received, [payload, payload])
+        self.assertEqual(self.api.connection_count, 2)
+        self.assertLess(transport.transport.bytes_sent, transport.transport.bytes_uncompressed)
+
+    async def test_post_retries(self) -> None:
+        """Tests posts are retried as the transport's max_retries says"""
+
+        url = await self.start_api(status_code=503)
+        transport = self.make_transport(max_retries=2, backoff_factor=0)
+
+        response = await transport.post(url, {"log_message": "test"})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.api.received), 3)
+
+    async def test_post_timeout(self) -> None:
+        """Tests a post that takes too long raises an OSError, as requests does"""
+
+        url = await self.start_api(latency=1)
+        transport = self.make_transport(timeout=0.05)
+
+        with self.assertRaises(OSError):
+            await transport.post(url, {"log_message": "test"})
+
+    async def test_shipper_batches_with_bounded_concurrency(self) -> None:
+        """Tests queued records are sent in batches, with no more than max_concurrency posts in flight at once"""
+
+        url = await self.start_api(latency=0.02)
+        transport = self.make_transport(pool_size=2)
+
+        async def send_batch(batch: List[Any]) -> bool:
+            return (await transport.post(url, batch)).status_code == 200
+
+        shipper = AsyncLogShipper(send_batch, max_concurrency=2, config=ShipperConfig(batch_size=10, batch_interval=10))
+        shipper.start()
+        for index in range(95):
+            self.assertTrue(shipper.enqueue({"index": index}))
+
+        self.assertTrue(await shipper.flush(timeout=5))
+        await shipper.close()
+
+        self.assertEqual(sorted(len(batch) for batch in self.api.received), [5] + [10] * 9)
+        self.assertEqual(sorted(record["index"] for batch in self.api.received for record in batch), list(range(95)))
+        self.assertEqual(self.api.max_concurrent, 2)
+        self.assertEqual(shipper.queue.sent_count, 95)
+
+    async def test_shipper_failures(self) -> None:
+        """Tests failed batches are reported and handed to on_failure"""
+
+        errors: List[str] = []
+        failed: List[Any] = []
+
+        async def send_batch(batch: List[Any]) -> bool:
+            raise ConnectionError("API unreachable")
+
+        shipper = AsyncLogShipper(send_batch, on_error=errors.append, on_failure=failed.append, config=ShipperConfig(batch_interval=0.01))
+        shipper.start()
+        shipper.enqueue({"index": 0})
+
+        self.assertTrue(await shipper.flush(timeout=5))
+        await shipper.close()
+
+        self.assertEqual(errors, ["Failed to send log batch to API: API unreachable"])
+        self.assertEqual(failed, [[{"index": 0}]])
+        self.assertEqual(shipper.queue.failed_count, 1)
+
+    async def test_send_log_to_api_async(self) -> None:
+        """Tests records queued through the logger are sent from the event loop, and failures are logged locally"""
+
+        url = await self.start_api()
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        birdbot_logger = BirdbotLoggerUtils(
+            logging_directory=directory.name,
+            logging_level=LoggingLevel.INFO,
+            enable_remote_logging=True,
+            remote_logging_rate_limit=0,
+            logging_api_url=url,
+            device_id="test_device_id",
+            quiet=True,
+            config=LoggerConfig(shipper=ShipperConfig(batch_interval=0.01)),
+        )
+        self.addCleanup(birdbot_logger.shutdown)
+
+        birdbot_logger.send_log_to_api_async("Classifier failed", LoggingLevel.ERROR)
+        self.assertTrue(await birdbot_logger.flush_async(timeout=5))
+
+        self.assertEqual(self.api.received[0][0]["log_message"], "Classifier failed")
+        self.assertEqual(birdbot_logger.get_stats()["api"]["sent"], 1)
+
+        self.api.status_code = 500
+        birdbot_logger.send_log_to_api_async("Classifier failed again", LoggingLevel.ERROR)
+        self.assertTrue(await birdbot_logger.flush_async(timeout=5))
+
+        with open(birdbot_logger.log_file_path, encoding="utf-8") as log_file:
+            self.assertIn("ERROR: Failed to send log batch to API: 500 - Injected error", log_file.read())
+        self.assertEqual(birdbot_logger.get_stats()["api"]["failures"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import sys
+import tempfile
+import unittest
+import subprocess
+from unittest.mock import Mock, patch
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from logging_utils.py
+
+import birdbot_logger  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Test(unittest.TestCase):
+    def test_import_has_no_side_effects(self) -> None:
+        """Tests importing the logger makes no directory or file, and doesn't import requests or asyncio"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            script = "import sys, birdbot_logger; print(sorted({'requests', 'asyncio', 'socket'} & set(sys.modules)))"
+            environment = dict(os.environ, PYTHONPATH=PACKAGE_DIRECTORY)
+            output = subprocess.run([sys.executable, "-c", script], cwd=directory, env=environment, capture_output=True, text=True, check=True)
+
+            self.assertEqual(output.stdout.strip(), "[]")
+            self.assertEqual(os.listdir(directory), [])
+
+    @patch.dict(sys.modules, {"config": None})
+    def test_configure(self) -> None:
+        """Tests the logger can be configured in code, without a config.py, and reconfigured"""
+
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            utils = birdbot_logger.configure(logging_directory=first, logging_level=LoggingLevel.INFO, quiet=True)
+            self.assertIs(birdbot_logger.birdbot_logger, utils)
+            self.assertEqual(os.listdir(first), [])
+
+            birdbot_logger.log_debug("not written")
+            birdbot_logger.log_info("first")
+            with open(utils.log_file_path, encoding="utf-8") as log_file:
+                self.assertTrue(log_file.read().endswith(": INFO: first\n"))
+
+            replacement = birdbot_logger.configure(logging_directory=second, logging_level=LoggingLevel.WARNING, quiet=True)
+            birdbot_logger.log_info("not written")
+            birdbot_logger.log_warning("second")
+            self.assertIsNone(utils.file_handler.stream if utils.file_handler is not None else None)
+            with open(replacement.log_file_path, encoding="utf-8") as log_file:
+                self.assertTrue(log_file.read().endswith(": WARNING: second\n"))
+            birdbot_logger.shutdown()
+
+    @patch.dict(sys.modules, {"config": None})
+    def test_deferred_messages(self) -> None:
+        """Tests args and callable messages are only rendered for records that are written, and never below the level"""
+
+        class Rendered:
+            count = 0
+
+            def __str__(self) -> str:
+                Rendered.count += 1
+                return "rendered"
+
+        with tempfile.TemporaryDirectory() as directory:
+            utils = birdbot_logger.configure(logging_directory=directory, logging_level=LoggingLevel.INFO, quiet=True)
+            message = Mock(return_value="from callable")
+
+            birdbot_logger.log_debug("value %s", args=(Rendered(),))
+            birdbot_logger.log_debug(message)
+            self.assertEqual(Rendered.count, 0)
+            message.assert_not_called()
+            self.assertFalse(os.path.exists(utils.log_file_path))
+
+            birdbot_logger.log_info("value %s", args=(Rendered(),))
+            birdbot_logger.log_info(message)
+            self.assertEqual(Rendered.count, 1)
+            message.assert_called_once_with()
+            with open(utils.log_file_path, encoding="utf-8") as log_file:
+                lines = log_file.read().splitlines()
+            self.assertEqual([line.split(": INFO: ")[1] for line in lines], ["value rendered", "from callable"])
+            birdbot_logger.shutdown()
+
+    @patch.dict(sys.modules, {"config": None})
+    @patch("builtins.print")
+    def test_bad_format_string(self, mock_print: Mock) -> None:
+        """Tests a message that doesn't match its args is reported instead of raising, and nothing is written"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            utils = birdbot_logger.configure(logging_directory=directory, logging_level=LoggingLevel.INFO, quiet=True)
+
+            birdbot_logger.log_info("%d apples", args=("many",))
+
+            mock_print.assert_called_once()
+            self.assertTrue(mock_print.call_args.args[0].startswith("Error while logging: "))
+            self.assertFalse(os.path.exists(utils.log_file_path))
+            birdbot_logger.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
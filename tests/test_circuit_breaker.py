@@ -0,0 +1,160 @@
+import os
+import sys
+import time
+import tempfile
+import unittest
+from typing import List, Tuple
+from unittest.mock import patch, MagicMock, Mock
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from logging_utils.py
+
+from benchmarks.api_stand_in import ApiStandIn  # noqa: E402
+from circuit_breaker import CircuitBreaker, CircuitState  # noqa: E402
+from logging_utils import BirdbotLoggerUtils  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import CircuitConfig, HttpConfig, LoggerConfig, ShipperConfig, SpoolConfig  # noqa: E402
+
+
+class Test(unittest.TestCase):
+    @patch("circuit_breaker.time.monotonic")
+    def test_opens_backs_off_and_probes(self, mock_monotonic: MagicMock) -> None:
+        """Tests the circuit opens after the threshold, lets one probe through once the backoff has passed, doubles the
+        backoff when the probe fails, and closes when one succeeds"""
+
+        mock_monotonic.return_value = 0.0
+        changes: List[Tuple[CircuitState, float]] = []
+        breaker = CircuitBreaker(
+            on_change=lambda state, open_for: changes.append((state, open_for)), config=CircuitConfig(failure_threshold=3, backoff=1.0, jitter=0)
+        )
+
+        for _ in range(3):
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        mock_monotonic.return_value = 1.0
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+
+        mock_monotonic.return_value = 2.5
+        self.assertFalse(breaker.allow())
+        mock_monotonic.return_value = 3.0
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertTrue(breaker.allow())
+
+        self.assertEqual(
+            changes,
+            [(CircuitState.OPEN, 1.0), (CircuitState.HALF_OPEN, 0), (CircuitState.OPEN, 2.0), (CircuitState.HALF_OPEN, 0), (CircuitState.CLOSED, 0)],
+        )
+        self.assertEqual((breaker.open_count, breaker.short_circuited_count), (2, 3))
+
+    def test_jitter_and_max_backoff(self) -> None:
+        """Tests backoffs are cut by up to the jitter fraction, and never exceed max_backoff"""
+
+        delays: List[float] = []
+        breaker = CircuitBreaker(
+            on_change=lambda state, open_for: delays.append(open_for), config=CircuitConfig(failure_threshold=1, backoff=1.0, max_backoff=4.0, jitter=0.5)
+        )
+        for _ in range(5):
+            breaker.record_failure()
+            breaker.state = CircuitState.HALF_OPEN
+
+        self.assertEqual(len(delays), 5)
+        for delay, backoff in zip(delays, [1.0, 2.0, 4.0, 4.0, 4.0]):
+            self.assertTrue(backoff * 0.5 <= delay <= backoff, (delay, backoff))
+
+    @patch("logging_transport.HttpTransport.post")
+    def test_held_back_records_counted_without_spool(self, mock_post: MagicMock) -> None:
+        """Tests records the open circuit holds back are counted as lost when there is no spool to keep them, whether
+        sent inline or by the background shipper"""
+
+        mock_post.return_value.status_code = 503
+        for background in (False, True):
+            with self.subTest(background=background), tempfile.TemporaryDirectory() as directory:
+                birdbot_logger = BirdbotLoggerUtils(
+                    logging_directory=directory,
+                    logging_level=LoggingLevel.INFO,
+                    enable_remote_logging=True,
+                    remote_logging_rate_limit=0,
+                    logging_api_url="http://test.com",
+                    device_id="test_device_id",
+                    quiet=True,
+                    config=LoggerConfig(shipper=ShipperConfig(background=background), circuit=CircuitConfig(failure_threshold=1, backoff=60)),
+                )
+                for index in range(4):
+                    birdbot_logger.send_log_to_api(f"record {index}", LoggingLevel.ERROR, MagicMock(), MagicMock())
+                    birdbot_logger.flush(timeout=5)
+                stats = birdbot_logger.get_stats()["api"]
+                birdbot_logger.shutdown()
+
+                self.assertEqual(mock_post.call_count, 1)
+                self.assertEqual((stats["circuit"], stats["failures"], stats["lost"]), ("open", 1, 4 if background else 3))
+                mock_post.reset_mock()
+
+    def test_caller_latency_stays_flat(self) -> None:
+        """Tests that once the API is known to hang or fail, log calls skip it and spool their records, then that the
+        backlog is delivered once a probe finds it back"""
+
+        with tempfile.TemporaryDirectory() as directory, ApiStandIn(hang=0.3) as api:
+            birdbot_logger = BirdbotLoggerUtils(
+                logging_directory=directory,
+                logging_level=LoggingLevel.INFO,
+                enable_remote_logging=True,
+                remote_logging_rate_limit=0,
+                logging_api_url=api.url,
+                device_id="test_device_id",
+                quiet=True,
+                config=LoggerConfig(spool=SpoolConfig(enabled=True), http=HttpConfig(timeout=0.1), circuit=CircuitConfig(failure_threshold=2, backoff=0.2)),
+            )
+            self.addCleanup(birdbot_logger.shutdown)
+            error_logger = MagicMock()
+
+            latencies = []
+            for index in range(10):
+                start = time.perf_counter()
+                birdbot_logger.send_log_to_api(f"hang {index}", LoggingLevel.ERROR, error_logger, MagicMock())
+                latencies.append(time.perf_counter() - start)
+
+            self.assertTrue(all(latency >= 0.1 for latency in latencies[:2]), latencies)
+            self.assertLess(max(latencies[2:]), 0.05, latencies)
+            self.assertEqual(api.request_count, 2)
+            self.assertEqual(error_logger.call_count, 2)
+            self.assertEqual(birdbot_logger.get_stats()["api"]["circuit"], "open")
+
+            # Server errors count too, and a failed probe backs off for longer
+            api.inject(hang=0, error_rate=1)
+            time.sleep(0.25)
+            birdbot_logger.send_log_to_api("probe", LoggingLevel.ERROR, error_logger, MagicMock())
+            birdbot_logger.send_log_to_api("skipped", LoggingLevel.ERROR, error_logger, MagicMock())
+            self.assertEqual(api.request_count, 3)
+
+            api.inject(error_rate=0)
+            time.sleep(0.45)
+            birdbot_logger.send_log_to_api("back", LoggingLevel.ERROR, error_logger, MagicMock())
+            stats = birdbot_logger.get_stats()
+
+            self.assertEqual(stats["api"]["circuit"], "closed")
+            self.assertEqual(stats["api"]["short_circuited"], 9)
+            # The probe's success has the shipper replay the spool, so everything logged while the API was down arrives
+            spool = birdbot_logger.remote.spool
+            assert spool is not None
+            for _ in range(100):
+                if spool.size == 0:
+                    break
+                time.sleep(0.01)
+            messages = [record["log_message"] for body in api.received for record in (body if isinstance(body, list) else [body])]
+            for index in range(2, 10):
+                self.assertIn(f"hang {index}", messages)
+            self.assertIn("skipped", messages)
+            with open(birdbot_logger.log_file_path, encoding="utf-8") as log_file:
+                text = log_file.read()
+            self.assertEqual(text.count("WARNING: Logging API is failing, pausing sends"), 2)
+            self.assertIn("NOTICE: Logging API is back, resuming sends", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
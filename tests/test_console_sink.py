@@ -0,0 +1,179 @@
+import io
+import os
+import sys
+import time
+import tempfile
+import unittest
+from unittest.mock import patch, Mock
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from console_sink.py
+
+from console_sink import ConsoleSink  # noqa: E402
+from log_record import LogRecord  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logging_utils import BirdbotLoggerUtils, COLOUR_CODES, COLOUR_RED, COLOUR_RESET  # noqa: E402
+
+
+class CountingStream(io.StringIO):
+    """Records how many writes and flushes reach the stream"""
+
+    def __init__(self, tty: bool = False) -> None:
+        super().__init__()
+        self.tty = tty
+        self.write_count = 0
+        self.flush_count = 0
+
+    def write(self, text: str) -> int:
+        self.write_count += 1
+        return super().write(text)
+
+    def flush(self) -> None:
+        self.flush_count += 1
+
+    def isatty(self) -> bool:
+        return self.tty
+
+
+def make_record(message: str, logging_level: LoggingLevel = LoggingLevel.INFO) -> LogRecord:
+    return LogRecord(logging_level, message, 0.0, "19-08-2023 00:00:00", f"19-08-2023 00:00:00: {logging_level.name}: {message}")
+
+
+class Test(unittest.TestCase):
+    def test_no_colour_when_not_a_tty(self) -> None:
+        """Tests output to a pipe or file has no ANSI codes"""
+
+        stream = CountingStream(tty=False)
+        sink = ConsoleSink(COLOUR_CODES, stream=stream)
+        sink.write(make_record("failure", LoggingLevel.ERROR))
+
+        self.assertEqual(stream.getvalue(), "19-08-2023 00:00:00: ERROR: failure\n")
+
+    @patch.dict(os.environ, {"NO_COLOR": ""})
+    def test_colour_when_a_tty(self) -> None:
+        """Tests output to a terminal is coloured by level"""
+
+        stream = CountingStream(tty=True)
+        sink = ConsoleSink(COLOUR_CODES, stream=stream)
+        sink.write(make_record("failure", LoggingLevel.ERROR))
+
+        self.assertEqual(stream.getvalue(), f"19-08-2023 00:00:00: ERROR: {COLOUR_RED}failure{COLOUR_RESET}\n")
+
+    @patch.dict(os.environ, {"NO_COLOR": "1"})
+    def test_no_colour_when_no_color_set(self) -> None:
+        """Tests NO_COLOR turns colour off even on a terminal"""
+
+        stream = CountingStream(tty=True)
+        sink = ConsoleSink(COLOUR_CODES, stream=stream)
+        sink.write(make_record("failure", LoggingLevel.ERROR))
+
+        self.assertEqual(stream.getvalue(), "19-08-2023 00:00:00: ERROR: failure\n")
+
+    @patch.dict(os.environ, {"NO_COLOR": ""})
+    @patch("builtins.print")
+    def test_unbuffered_console_colour_follows_stdout(self, mock_print: Mock) -> None:
+        """Tests the default, unbuffered console output is only coloured when stdout is a terminal"""
+
+        for tty, expected in ((False, "ERROR: failure"), (True, f"ERROR: {COLOUR_RED}failure{COLOUR_RESET}")):
+            with self.subTest(tty=tty), patch("sys.stdout", CountingStream(tty=tty)), tempfile.TemporaryDirectory() as directory:
+                birdbot_logger = BirdbotLoggerUtils(
+                    logging_directory=directory,
+                    logging_level=LoggingLevel.INFO,
+                    enable_remote_logging=False,
+                    remote_logging_rate_limit=0,
+                    logging_api_url="",
+                    device_id="test_device_id",
+                )
+                birdbot_logger.write_record_to_console(make_record("failure", LoggingLevel.ERROR))
+                birdbot_logger.shutdown()
+
+                self.assertEqual(mock_print.call_args.args[0], f"19-08-2023 00:00:00: {expected}")
+
+    def test_info_batched_until_interval(self) -> None:
+        """Tests lines below WARNING are buffered, then written together with one write and one flush"""
+
+        stream = CountingStream()
+        sink = ConsoleSink(COLOUR_CODES, stream=stream, flush_interval=0.2)
+        for index in range(10):
+            sink.write(make_record(f"frame {index}"))
+        self.assertEqual(stream.getvalue(), "")
+
+        deadline = time.monotonic() + 5
+        while not stream.getvalue() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(stream.getvalue().count("\n"), 10)
+        self.assertEqual((stream.write_count, stream.flush_count), (1, 1))
+
+    def test_warning_flushes_promptly_with_buffered_lines(self) -> None:
+        """Tests a WARNING is written straight away, after the lines buffered before it"""
+
+        stream = CountingStream()
+        sink = ConsoleSink(COLOUR_CODES, stream=stream, flush_interval=60)
+        sink.write(make_record("context"))
+        sink.write(make_record("careful", LoggingLevel.WARNING))
+
+        self.assertEqual(stream.getvalue(), "19-08-2023 00:00:00: INFO: context\n19-08-2023 00:00:00: WARNING: careful\n")
+        self.assertEqual(stream.write_count, 1)
+
+    def test_buffer_size_flushes_early(self) -> None:
+        """Tests a full buffer is written without waiting for the interval"""
+
+        stream = CountingStream()
+        sink = ConsoleSink(COLOUR_CODES, stream=stream, flush_interval=60, max_buffered_bytes=200)
+        for index in range(10):
+            sink.write(make_record(f"frame {index}"))
+
+        self.assertGreater(stream.getvalue().count("\n"), 0)
+
+    @patch("console_sink.atexit")
+    def test_close_drops_exit_flush(self, mock_atexit: Mock) -> None:
+        """Tests each logger's console flush registered for interpreter exit is dropped again when it shuts down, after
+        writing out what was buffered"""
+
+        stream = CountingStream()
+        sink = ConsoleSink(COLOUR_CODES, stream=stream, flush_interval=60)
+        sink.write(make_record("frame 0"))
+        sink.close()
+
+        self.assertEqual(stream.getvalue(), "19-08-2023 00:00:00: INFO: frame 0\n")
+        mock_atexit.unregister.assert_called_once_with(mock_atexit.register.call_args.args[0])
+
+        with tempfile.TemporaryDirectory() as directory:
+            for _ in range(3):
+                BirdbotLoggerUtils(
+                    logging_directory=directory,
+                    logging_level=LoggingLevel.INFO,
+                    enable_remote_logging=False,
+                    remote_logging_rate_limit=0,
+                    logging_api_url="",
+                    device_id="test_device_id",
+                    quiet=True,
+                ).shutdown()
+
+        self.assertEqual(mock_atexit.register.call_count, mock_atexit.unregister.call_count)
+
+    @patch("builtins.print")
+    def test_quiet_mode(self, mock_print: Mock) -> None:
+        """Tests quiet mode turns the console off but still writes to file"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            birdbot_logger = BirdbotLoggerUtils(
+                logging_directory=directory,
+                logging_level=LoggingLevel.INFO,
+                enable_remote_logging=False,
+                remote_logging_rate_limit=0,
+                logging_api_url="",
+                device_id="test_device_id",
+                quiet=True,
+            )
+            record = birdbot_logger.make_record("test", LoggingLevel.ERROR)
+            birdbot_logger.write_record_to_console(record)
+            birdbot_logger.write_record_to_file(record)
+
+            with open(birdbot_logger.log_file_path, encoding="utf-8") as log_file:
+                self.assertIn("ERROR: test", log_file.read())
+            birdbot_logger.shutdown()
+
+        mock_print.assert_not_called()
@@ -0,0 +1,124 @@
+import os
+import sys
+import socket
+import time
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock, Mock
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from logging_utils.py
+
+import birdbot_logger  # noqa: E402
+from datagram_transport import DatagramReceiver, DatagramTransport, decode_packet, parse_address, RECORD_HEADER  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import DatagramConfig, LoggerConfig  # noqa: E402
+
+
+def wait_for_records(receiver: DatagramReceiver, count: int, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while len(receiver.records) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+class Test(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.directory.cleanup)
+
+    def test_packs_records_up_to_packet_size(self) -> None:
+        """Tests records are packed several to a packet, no packet is over max_packet_size, and each arrives whole and in
+        order, over UDP and a Unix socket"""
+
+        for address in ("udp://127.0.0.1:0", f"unix://{self.directory.name}/telemetry.sock"):
+            with self.subTest(address=address), DatagramReceiver(address) as receiver:
+                transport = DatagramTransport(receiver.address, "test_device_id", max_packet_size=512, flush_interval=60)
+                mock_socket = transport._socket = Mock(wraps=transport._socket)  # pylint: disable=protected-access
+                for index in range(100):
+                    transport.send(LoggingLevel.INFO, f"frame {index} processed", 1692485999.5 + index)
+                transport.close()
+                sizes = [len(call.args[0]) for call in mock_socket.sendto.call_args_list]
+
+                wait_for_records(receiver, 100)
+                self.assertEqual([record.message for record in receiver.records], [f"frame {index} processed" for index in range(100)])
+                self.assertEqual(receiver.records[3].created, 1692485999.5 + 3)
+                self.assertEqual({(record.device_id, record.logging_level) for record in receiver.records}, {("test_device_id", LoggingLevel.INFO)})
+                self.assertEqual((transport.records_sent, transport.packets_sent, transport.send_failures), (100, len(sizes), 0))
+                self.assertLess(len(sizes), 10)
+                self.assertTrue(all(size <= 512 for size in sizes), sizes)
+                # Full packets have no room for another record
+                self.assertTrue(all(size > 512 - RECORD_HEADER.size - len("frame 99 processed") for size in sizes[:-1]), sizes)
+
+    def test_truncation_flush_and_no_receiver(self) -> None:
+        """Tests a message too long for a packet is cut short, partial packets go after flush_interval, and sends with no
+        receiver are dropped without raising"""
+
+        with DatagramReceiver("udp://127.0.0.1:0") as receiver:
+            transport = DatagramTransport(receiver.address, "test_device_id", max_packet_size=256, flush_interval=0.02)
+            self.addCleanup(transport.close)
+            transport.send(LoggingLevel.WARNING, "é" * 300, 0)
+            wait_for_records(receiver, 1)
+
+        self.assertEqual(transport.truncated_count, 1)
+        self.assertTrue(receiver.records[0].message.startswith("é" * 100))
+        self.assertEqual(receiver.records[0].logging_level, LoggingLevel.WARNING)
+
+        orphan = DatagramTransport(f"unix://{self.directory.name}/missing.sock", "test_device_id")
+        orphan.send(LoggingLevel.INFO, "lost", 0)
+        orphan.close()
+        self.assertEqual((orphan.packets_sent, orphan.send_failures), (0, 1))
+
+        with self.assertRaises(ValueError):
+            parse_address("tcp://127.0.0.1:9000")
+        with self.assertRaises(ValueError):
+            decode_packet(b"XX\x01\x00")
+
+    def test_host_resolved_once(self) -> None:
+        """Tests a UDP host name is looked up when the transport is made, rather than for every packet"""
+
+        with DatagramReceiver("udp://127.0.0.1:0") as receiver:
+            port = int(receiver.address.rpartition(":")[2])
+            with patch("socket.getaddrinfo", wraps=socket.getaddrinfo) as getaddrinfo:
+                transport = DatagramTransport(f"udp://localhost:{port}", "test_device_id", max_packet_size=64, flush_interval=60)
+                for index in range(20):
+                    transport.send(LoggingLevel.INFO, f"frame {index}", 0)
+                transport.close()
+            wait_for_records(receiver, 20)
+
+        getaddrinfo.assert_called_once()
+        self.assertEqual(transport.address, ("127.0.0.1", port))
+        self.assertEqual(len(receiver.records), 20)
+        self.assertGreater(transport.packets_sent, 1)
+
+    @patch.dict(sys.modules, {"config": None})
+    @patch("logging_transport.HttpTransport.post")
+    def test_selected_below_level(self, mock_post: MagicMock) -> None:
+        """Tests records sent to the API below datagram_below go by datagram, and the rest are still posted"""
+
+        mock_post.return_value.status_code = 200
+        with DatagramReceiver(f"unix://{self.directory.name}/telemetry.sock") as receiver:
+            birdbot_logger.configure(
+                logging_directory=self.directory.name,
+                quiet=True,
+                enable_remote_logging=True,
+                logging_api_url="http://127.0.0.1:9/log",
+                device_id="test_device_id",
+                config=LoggerConfig(datagram=DatagramConfig(address=receiver.address)),
+            )
+            self.addCleanup(birdbot_logger.shutdown)
+
+            birdbot_logger.log_info("frame processed", send_to_api=True)
+            birdbot_logger.log_notice("battery 80%", send_to_api=True)
+            birdbot_logger.log_info("not sent")
+            birdbot_logger.log_error("classifier failed")
+            birdbot_logger.flush()
+            wait_for_records(receiver, 2)
+
+        self.assertEqual([record.message for record in receiver.records], ["frame processed", "battery 80%"])
+        self.assertEqual([call.args[1]["log_message"] for call in mock_post.call_args_list], ["classifier failed"])
+        self.assertEqual(birdbot_logger.get_stats()["datagram"]["records_sent"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import os
+import sys
+import json
+import tempfile
+import unittest
+from typing import List
+from unittest.mock import patch, MagicMock, Mock
+from freezegun import freeze_time
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from logging_utils.py
+
+import birdbot_logger  # noqa: E402
+from exception_groups import ExceptionGrouper, fingerprint  # noqa: E402
+from logger_config import FlightRecorderConfig, LoggerConfig  # noqa: E402
+
+
+def read_sensor(value: int) -> None:
+    raise TimeoutError(f"sensor {value} didn't answer")
+
+
+def read_sensor_elsewhere(value: int) -> None:
+    raise TimeoutError(f"sensor {value} didn't answer")
+
+
+def caught(function: object, *args: object) -> BaseException:
+    try:
+        function(*args)  # type: ignore[operator]
+    except Exception as error:  # pylint: disable=broad-except
+        return error
+    raise AssertionError("Nothing raised")
+
+
+class Test(unittest.TestCase):
+    def test_fingerprint(self) -> None:
+        """Tests the fingerprint is the same for the same fault whatever its message, and differs by where it was raised
+        and what it was raised from"""
+
+        first = fingerprint(caught(read_sensor, 1))
+        self.assertEqual(first, fingerprint(caught(read_sensor, 2)))
+        self.assertNotEqual(first, fingerprint(caught(read_sensor_elsewhere, 1)))
+
+        def wrapped() -> None:
+            try:
+                read_sensor(1)
+            except TimeoutError as error:
+                raise RuntimeError("frame dropped") from error
+
+        def unwrapped() -> None:
+            raise RuntimeError("frame dropped")
+
+        self.assertNotEqual(fingerprint(caught(wrapped)), fingerprint(caught(unwrapped)))
+        self.assertRegex(first, "^[0-9a-f]{12}$")
+
+    def test_grouper_window(self) -> None:
+        """Tests the traceback comes with the first occurrence in each window, repeats are counted, and it is formatted
+        only once"""
+
+        grouper = ExceptionGrouper(window=60, max_entries=2)
+        with freeze_time("2023-08-19 12:00:00"):
+            first = grouper.capture(caught(read_sensor, 1))
+        with freeze_time("2023-08-19 12:00:30"):
+            repeat = grouper.capture(caught(read_sensor, 2))
+        with freeze_time("2023-08-19 12:01:00"):
+            next_window = grouper.capture(caught(read_sensor, 3))
+
+        self.assertIn('raise TimeoutError(f"sensor {value} didn\'t answer")', first.traceback or "")
+        self.assertTrue(first.format_message("Sensor failed").startswith(f"Sensor failed: exception {first.fingerprint}\nTraceback"))
+        self.assertIsNone(repeat.traceback)
+        self.assertEqual(
+            repeat.format_message("Sensor failed"),
+            f"Sensor failed: TimeoutError: sensor 2 didn't answer (exception {first.fingerprint}, 2 times since 12:00:00)",
+        )
+        self.assertEqual((next_window.traceback, next_window.occurrences), (first.traceback, 1))
+        self.assertEqual((grouper.formatted_count, grouper.repeat_count), (1, 1))
+
+        grouper.capture(caught(read_sensor_elsewhere, 1))
+        grouper.capture(caught(int, "not a number"))
+        self.assertEqual(grouper.group_count, 2)
+        self.assertIsNotNone(grouper.capture(caught(read_sensor, 4)).traceback)
+
+    @patch.dict(sys.modules, {"config": None})
+    @patch("logging_transport.HttpTransport.post")
+    def test_log_exception(self, mock_post: MagicMock) -> None:
+        """Tests a crash loop sends its traceback once, then one line per repeat, and that the exception being handled
+        is logged by default"""
+
+        mock_post.return_value.status_code = 200
+        with tempfile.TemporaryDirectory() as directory:
+            birdbot_logger.configure(
+                logging_directory=directory, quiet=True, enable_remote_logging=True, remote_logging_rate_limit=0, device_id="test_device_id"
+            )
+            self.addCleanup(birdbot_logger.shutdown)
+
+            for frame in range(3):
+                try:
+                    read_sensor(frame)
+                except TimeoutError:
+                    birdbot_logger.log_exception("Frame %d failed", args=(frame,))
+            birdbot_logger.log_exception("Nothing to log")
+            birdbot_logger.shutdown()
+            with open(birdbot_logger.birdbot_logger.log_file_path, encoding="utf-8") as log_file:
+                text = log_file.read()
+
+        messages: List[str] = [call.args[1]["log_message"] for call in mock_post.call_args_list]
+        self.assertEqual(len(messages), 4)
+        self.assertRegex(messages[0], r"^Frame 0 failed: exception [0-9a-f]{12}\nTraceback \(most recent call last\):\n")
+        self.assertTrue(messages[0].endswith("TimeoutError: sensor 0 didn't answer"))
+        self.assertRegex(messages[2], r"^Frame 2 failed: TimeoutError: sensor 2 didn't answer \(exception [0-9a-f]{12}, 3 times since ")
+        self.assertEqual(messages[3], "Nothing to log")
+        self.assertEqual(text.count("Traceback"), 1)
+        self.assertEqual(birdbot_logger.get_stats()["exceptions"], {"groups": 1, "formatted": 1, "repeats": 2})
+
+    @patch.dict(sys.modules, {"config": None})
+    @patch("logging_transport.HttpTransport.post")
+    def test_log_exception_with_flight_recorder(self, mock_post: MagicMock) -> None:
+        """Tests each exception is captured once with the flight recorder on, which keeps it in one line, so a repeat's
+        payload doesn't carry the traceback again"""
+
+        mock_post.return_value.status_code = 200
+        with tempfile.TemporaryDirectory() as directory:
+            birdbot_logger.configure(
+                logging_directory=directory,
+                quiet=True,
+                enable_remote_logging=True,
+                remote_logging_rate_limit=0,
+                device_id="test_device_id",
+                config=LoggerConfig(flight_recorder=FlightRecorderConfig(size=16)),
+            )
+            self.addCleanup(birdbot_logger.shutdown)
+
+            for frame in range(2):
+                try:
+                    read_sensor(frame)
+                except TimeoutError:
+                    birdbot_logger.log_exception("Frame %d failed", args=(frame,))
+            birdbot_logger.shutdown()
+
+        payloads = [call.args[1] for call in mock_post.call_args_list]
+        self.assertEqual(len(payloads), 2)
+        self.assertIn("Traceback", payloads[0]["log_message"])
+        self.assertRegex(payloads[1]["log_message"], r"^Frame 1 failed: TimeoutError: sensor 1 didn't answer \(exception [0-9a-f]{12}, 2 times since ")
+        # Each error is the last recent record sent with it, without the traceback
+        self.assertRegex(payloads[0]["recent_records"][-1]["log_message"], r"^Frame 0 failed: TimeoutError: sensor 0 didn't answer \(exception [0-9a-f]{12}\)$")
+        self.assertEqual(payloads[1]["recent_records"][-1]["log_message"], payloads[1]["log_message"])
+        self.assertNotIn("Traceback", json.dumps(payloads[1]))
+        # Its own record and three one-line recent records
+        self.assertLess(len(json.dumps(payloads[1])), 768)
+        self.assertEqual(birdbot_logger.get_stats()["exceptions"], {"groups": 1, "formatted": 1, "repeats": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
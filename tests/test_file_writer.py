@@ -0,0 +1,149 @@
+import os
+import sys
+import time
+import tempfile
+import unittest
+from unittest.mock import patch, Mock
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from file_writer.py
+
+from file_writer import AsyncFileWriter  # noqa: E402
+from log_record import LogRecord  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logging_utils import BirdbotLoggerUtils  # noqa: E402
+from logger_config import FileConfig, LoggerConfig  # noqa: E402
+
+
+def make_record(message: str, logging_level: LoggingLevel = LoggingLevel.INFO) -> LogRecord:
+    return LogRecord(logging_level, message, 0.0, "19-08-2023 00:00:00", f"19-08-2023 00:00:00: {logging_level.name}: {message}")
+
+
+class Test(unittest.TestCase):
+    """Documents the durability of each level, see file_writer.py"""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "birdbot.log")
+
+    def read(self) -> str:
+        with open(self.path, encoding="utf-8") as log_file:
+            return log_file.read()
+
+    def wait_for_lines(self, lines: int, timeout: float = 5) -> str:
+        deadline = time.monotonic() + timeout
+        while self.read().count("\n") < lines and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.read()
+
+    def test_info_buffered_until_flush_interval(self) -> None:
+        """Tests records below ERROR are held in memory and reach the file once the flush interval passes"""
+
+        writer = AsyncFileWriter(self.path, config=FileConfig(flush_interval=0.3))
+        writer.write(make_record("first"))
+        writer.write(make_record("second", LoggingLevel.WARNING))
+
+        time.sleep(0.1)
+        self.assertEqual(self.read(), "")
+        self.assertEqual(self.wait_for_lines(2), "19-08-2023 00:00:00: INFO: first\n19-08-2023 00:00:00: WARNING: second\n")
+        writer.close()
+
+    def test_byte_threshold_flushes_early(self) -> None:
+        """Tests a full buffer is written without waiting for the flush interval"""
+
+        writer = AsyncFileWriter(self.path, config=FileConfig(flush_interval=60, flush_bytes=1024))
+        for index in range(100):
+            writer.write(make_record(f"record {index}"))
+
+        self.assertTrue(self.wait_for_lines(1).startswith("19-08-2023 00:00:00: INFO: record 0\n"))
+        writer.close()
+
+    def test_error_flushes_immediately_with_everything_before_it(self) -> None:
+        """Tests an ERROR record is flushed straight away, along with the records queued before it"""
+
+        writer = AsyncFileWriter(self.path, config=FileConfig(flush_interval=60))
+        writer.write(make_record("context"))
+        writer.write(make_record("failure", LoggingLevel.ERROR))
+
+        self.assertEqual(self.wait_for_lines(2), "19-08-2023 00:00:00: INFO: context\n19-08-2023 00:00:00: ERROR: failure\n")
+        writer.close()
+
+    @patch("os.fsync")
+    def test_block_on_error_and_fsync(self, mock_fsync: Mock) -> None:
+        """Tests that with block_on_error the ERROR call only returns once the record is in the file, and that it is
+        fsynced with fsync_on_error"""
+
+        writer = AsyncFileWriter(self.path, config=FileConfig(flush_interval=60, fsync_on_error=True, block_on_error=True))
+        writer.write(make_record("failure", LoggingLevel.ERROR))
+
+        self.assertEqual(self.read(), "19-08-2023 00:00:00: ERROR: failure\n")
+        mock_fsync.assert_called_once()
+        writer.close()
+
+    def test_close_drains_queue(self) -> None:
+        """Tests closing writes out everything still queued"""
+
+        writer = AsyncFileWriter(self.path, config=FileConfig(flush_interval=60))
+        for index in range(1000):
+            writer.write(make_record(f"record {index}"))
+        writer.close()
+
+        self.assertEqual(self.read().count("\n"), 1000)
+        self.assertTrue(self.read().endswith("INFO: record 999\n"))
+
+    def test_full_queue_drops_all_but_errors(self) -> None:
+        """Tests records over max_queue_size are dropped and counted, but errors are always kept"""
+
+        writer = AsyncFileWriter(self.path, config=FileConfig(flush_interval=60, max_queue_size=2))
+        with writer._condition:  # Hold the writer thread off so the queue fills
+            for index in range(4):
+                writer.write(make_record(f"record {index}"))
+        writer.write(make_record("failure", LoggingLevel.ERROR))
+        writer.close()
+
+        self.assertEqual(writer.dropped_count, 2)
+        self.assertEqual(self.read().count("\n"), 3)
+
+    def test_write_error_keeps_writer_running(self) -> None:
+        """Tests a write the file refuses, e.g. on a full disk, is counted and reported once, and doesn't stop the writer
+        thread, so flush still returns and later records are written"""
+
+        on_error = Mock()
+        writer = AsyncFileWriter(self.path, on_error=on_error, config=FileConfig(flush_interval=60))
+        failing_stream = Mock(closed=False, **{"write.side_effect": OSError(28, "No space left on device")})
+        with patch.object(writer._file, "stream", failing_stream):
+            for message in ("lost", "also lost"):
+                writer.write(make_record(message, LoggingLevel.ERROR))
+                self.assertTrue(writer.flush(timeout=5))
+
+        self.assertEqual(writer.write_errors, 2)
+        on_error.assert_called_once()
+        self.assertIn("No space left on device", on_error.call_args.args[0])
+
+        writer.write(make_record("written", LoggingLevel.ERROR))
+        self.assertTrue(writer.flush(timeout=5))
+        writer.close()
+        self.assertEqual(self.read(), "19-08-2023 00:00:00: ERROR: written\n")
+
+    def test_utils_async_file_writes(self) -> None:
+        """Tests BirdbotLoggerUtils writes through the async writer, and flush waits for it"""
+
+        birdbot_logger = BirdbotLoggerUtils(
+            logging_directory=self.directory.name,
+            logging_level=LoggingLevel.INFO,
+            enable_remote_logging=False,
+            remote_logging_rate_limit=0,
+            logging_api_url="",
+            device_id="test_device_id",
+            config=LoggerConfig(file=FileConfig(async_writes=True, flush_interval=60)),
+        )
+        birdbot_logger.write_record_to_file(make_record("test"))
+        self.assertTrue(birdbot_logger.flush(timeout=5))
+
+        with open(birdbot_logger.log_file_path, encoding="utf-8") as log_file:
+            self.assertEqual(log_file.read(), "19-08-2023 00:00:00: INFO: test\n")
+        self.assertIsInstance(birdbot_logger.files.writer, AsyncFileWriter)
+        self.assertIsNone(birdbot_logger.file_handler)
+        birdbot_logger.shutdown()
@@ -0,0 +1,118 @@
+import gc
+import os
+import sys
+import weakref
+import threading
+import unittest
+from unittest.mock import patch, MagicMock, Mock
+from freezegun import freeze_time
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from flight_recorder.py
+
+from flight_recorder import FlightRecorder  # noqa: E402
+from logging_utils import BirdbotLoggerUtils  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import FlightRecorderConfig, LoggerConfig  # noqa: E402
+
+
+class Test(unittest.TestCase):
+    def test_keeps_most_recent_in_order(self) -> None:
+        """Tests the ring overwrites the oldest calls and the snapshot is oldest first"""
+
+        recorder = FlightRecorder(capacity=4)
+        for index in range(10):
+            recorder.record(LoggingLevel.DEBUG, f"frame {index}")
+
+        self.assertEqual([entry["log_message"] for entry in recorder.snapshot()], ["frame 6", "frame 7", "frame 8", "frame 9"])
+
+    @freeze_time("2023-08-19 00:00:00")
+    def test_renders_format_strings_on_snapshot(self) -> None:
+        """Tests format strings are rendered when a snapshot is taken, callables are never called, and long messages are
+        cut"""
+
+        def render() -> str:
+            return "rendered"
+
+        recorder = FlightRecorder(capacity=8, max_message_length=30)
+        mock_render = MagicMock(wraps=render)
+        recorder.record(LoggingLevel.DEBUG, "frame %d", (42,))
+        recorder.record(LoggingLevel.INFO, render)
+        recorder.record(LoggingLevel.INFO, mock_render)
+        recorder.record(LoggingLevel.WARNING, "x" * 40)
+        recorder.record(LoggingLevel.ERROR, "%d", ("not a number",))
+
+        snapshot = recorder.snapshot()
+
+        mock_render.assert_not_called()
+        self.assertEqual(snapshot[0], {"log_timestamp": 1692403200000, "log_level": "DEBUG", "log_message": "frame 42"})
+        self.assertEqual(
+            [entry["log_message"] for entry in snapshot[1:4]],
+            [f"<deferred message from {render.__qualname__}>", "<deferred message from MagicMock>", "x" * 30 + "..."],
+        )
+        self.assertEqual(snapshot[4]["log_message"], "<message could not be rendered...")
+
+    def test_args_kept_as_they_were_logged(self) -> None:
+        """Tests args that could change, or keep other objects alive, are kept as their repr when recorded"""
+
+        class Frame:
+            def __repr__(self) -> str:
+                return "<Frame>"
+
+        recorder = FlightRecorder(capacity=8)
+        pending = [1, 2]
+        frame = Frame()
+        recorder.record(LoggingLevel.DEBUG, "pending %s from %s", (pending, frame))
+        pending.append(3)
+        frame_reference = weakref.ref(frame)
+        del frame
+        gc.collect()
+
+        self.assertIsNone(frame_reference())
+        self.assertEqual(recorder.snapshot()[0]["log_message"], "pending [1, 2] from <Frame>")
+
+    def test_concurrent_recording(self) -> None:
+        """Tests threads recording at once never lose the ring's shape"""
+
+        recorder = FlightRecorder(capacity=64)
+
+        def record_many(thread: int) -> None:
+            for index in range(5000):
+                recorder.record(LoggingLevel.DEBUG, f"{thread} {index}")
+
+        threads = [threading.Thread(target=record_many, args=(thread,)) for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(recorder.snapshot()), 64)
+
+    @freeze_time("2023-08-19 00:00:00")
+    @patch("logging_transport.HttpTransport.post")
+    def test_snapshot_sent_with_errors(self, mock_requests: MagicMock) -> None:
+        """Tests errors sent to the API carry the recent records, other levels only when asked"""
+
+        mock_requests.return_value.status_code = 200
+        birdbot_logger = BirdbotLoggerUtils(
+            logging_directory="logs",
+            logging_level=LoggingLevel.INFO,
+            enable_remote_logging=True,
+            remote_logging_rate_limit=0,
+            logging_api_url="http://test.com",
+            device_id="test_device_id",
+            config=LoggerConfig(flight_recorder=FlightRecorderConfig(size=16)),
+        )
+        assert birdbot_logger.remote.api.flight_recorder is not None
+        birdbot_logger.remote.api.flight_recorder.record(LoggingLevel.DEBUG, "sensor read %d", (7,))
+
+        birdbot_logger.send_log_to_api("warning", LoggingLevel.WARNING, MagicMock(), MagicMock())
+        birdbot_logger.send_log_to_api("failure", LoggingLevel.ERROR, MagicMock(), MagicMock())
+        birdbot_logger.send_log_to_api("on demand", LoggingLevel.NOTICE, MagicMock(), MagicMock(), attach_recent=True)
+
+        payloads = [call.args[1] for call in mock_requests.call_args_list]
+        self.assertNotIn("recent_records", payloads[0])
+        recent = [{"log_timestamp": 1692403200000, "log_level": "DEBUG", "log_message": "sensor read 7"}]
+        self.assertEqual(payloads[1]["recent_records"], recent)
+        self.assertEqual(payloads[2]["recent_records"], recent)
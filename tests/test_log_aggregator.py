@@ -0,0 +1,163 @@
+import os
+import sys
+import socket
+import tempfile
+import threading
+import unittest
+from typing import Any, Dict, Optional, Tuple
+from unittest.mock import patch, MagicMock, Mock
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from logging_utils.py
+
+from log_aggregator import AggregatorClient, decode_datagram, encode_datagram  # noqa: E402
+from logging_utils import BirdbotLoggerUtils  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import AggregatorConfig, LoggerConfig  # noqa: E402
+
+
+class Test(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.directory.cleanup)
+        self.socket_path = os.path.join(self.directory.name, "birdbot.sock")
+
+    def make_logger(
+        self, name: str, rate_limit_budgets: Optional[Dict[LoggingLevel, Tuple[float, float]]] = None, **aggregator_settings: Any
+    ) -> BirdbotLoggerUtils:
+        logging_directory = os.path.join(self.directory.name, name)
+        birdbot_logger = BirdbotLoggerUtils(
+            logging_directory=logging_directory,
+            logging_level=LoggingLevel.INFO,
+            enable_remote_logging=True,
+            remote_logging_rate_limit=0,
+            logging_api_url="http://test.com",
+            device_id="test_device_id",
+            quiet=True,
+            config=LoggerConfig(aggregator=AggregatorConfig(socket=self.socket_path, **aggregator_settings), rate_limit_budgets=rate_limit_budgets),
+        )
+        self.addCleanup(birdbot_logger.shutdown)
+        return birdbot_logger
+
+    @staticmethod
+    def read_log(birdbot_logger: BirdbotLoggerUtils) -> str:
+        with open(birdbot_logger.log_file_path, encoding="utf-8") as log_file:
+            return log_file.read()
+
+    def test_datagram_round_trip(self) -> None:
+        """Tests a record keeps its level, message, time, API flag and source through encoding"""
+
+        data = encode_datagram(LoggingLevel.WARNING, "Temperature 40°C", 1700000000.25, True, "camera".encode())
+        record = decode_datagram(data)
+
+        self.assertEqual(record.logging_level, LoggingLevel.WARNING)
+        self.assertEqual(record.message, "Temperature 40°C")
+        self.assertEqual(record.created, 1700000000.25)
+        self.assertTrue(record.send_to_api)
+        self.assertEqual(record.source, "camera")
+
+    def test_clients_write_through_collector(self) -> None:
+        """Tests records from several client threads all end up whole in the collector's file, and none locally"""
+
+        collector = self.make_logger("collector", collector=True)
+        client = self.make_logger("client", source="camera")
+
+        def log() -> None:
+            for index in range(200):
+                self.assertTrue(client.forward_to_aggregator(f"frame {index}", LoggingLevel.INFO, False))
+
+        threads = [threading.Thread(target=log) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        collector.shutdown()
+
+        lines = self.read_log(collector).splitlines()
+        self.assertEqual(len(lines), 800)
+        self.assertTrue(all(line.endswith(": INFO: camera: frame " + line.rsplit(" ", 1)[1]) for line in lines))
+        # Nothing was written locally, so the file was never made
+        self.assertFalse(os.path.exists(client.log_file_path))
+        self.assertEqual(client.get_stats()["aggregator"]["forwarded"], 800)
+        self.assertEqual(collector.get_stats()["aggregator"]["received"], 800)
+
+    def test_falls_back_until_collector_is_back(self) -> None:
+        """Tests a client reports records for local writing while its collector is down, and goes back to it after the
+        retry interval"""
+
+        client = AggregatorClient(self.socket_path, retry_interval=0)
+        self.addCleanup(client.close)
+
+        self.assertFalse(client.send(LoggingLevel.INFO, "no collector", 0, False))
+
+        collector = self.make_logger("collector", collector=True)
+        self.assertTrue(client.send(LoggingLevel.INFO, "collector started", 0, False))
+        collector.shutdown()
+
+        self.assertFalse(client.send(LoggingLevel.INFO, "collector stopped", 0, False))
+        self.assertFalse(client.connected)
+        self.assertEqual(client.fallback_count, 2)
+
+    @patch("logging_transport.HttpTransport.post")
+    def test_rate_limit_shared_by_clients(self, mock_requests: MagicMock) -> None:
+        """Tests errors from two clients are sent to the API through the collector's one rate limiter"""
+
+        mock_requests.return_value.status_code = 200
+        collector = self.make_logger("collector", collector=True, rate_limit_budgets={LoggingLevel.ERROR: (1, 0.001)})
+        clients = [self.make_logger(name, source=name) for name in ("camera", "classifier")]
+
+        for client in clients:
+            self.assertTrue(client.forward_to_aggregator("Classifier failed", LoggingLevel.ERROR, True))
+        collector.shutdown()
+
+        # The second error is only reported in the summary shutdown sends. The collector sends in batches
+        messages = [record["log_message"] for call in mock_requests.call_args_list for record in call.args[1]]
+        self.assertEqual(len(messages), 2)
+        self.assertEqual(messages[0], "camera: Classifier failed")
+        self.assertTrue(messages[1].startswith("1 ERROR records suppressed"))
+        self.assertEqual(collector.remote.rate_limiter.total_suppressed, 1)
+        self.assertEqual(self.read_log(collector).count(": ERROR: "), 2)
+
+    @patch("logging_transport.HttpTransport.post")
+    def test_slow_api_does_not_hold_up_collector(self, mock_requests: MagicMock) -> None:
+        """Tests records for the API are sent from the shipper, so the collector keeps writing while a post is stuck"""
+
+        release = threading.Event()
+        self.addCleanup(release.set)
+        mock_requests.side_effect = lambda url, batch: release.wait(5) and Mock(status_code=200)
+        collector = self.make_logger("collector", collector=True)
+        client = self.make_logger("client", source="camera")
+
+        for index in range(3):
+            self.assertTrue(client.forward_to_aggregator(f"Capture failed {index}", LoggingLevel.ERROR, True))
+        assert collector.remote.collector is not None
+        for _ in range(100):
+            if collector.remote.collector.received_count == 3:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(collector.remote.collector.received_count, 3)
+
+        release.set()
+        collector.shutdown()
+        self.assertEqual(client.get_stats()["aggregator"]["fallbacks"], 0)
+        self.assertEqual(self.read_log(collector).count(": ERROR: camera: Capture failed"), 3)
+
+    def test_second_collector_refused(self) -> None:
+        """Tests a collector doesn't take over the socket of one that is still listening, but replaces a stale one"""
+
+        # A socket file nobody is bound to, as left by a collector that was killed
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as stale:
+            stale.bind(self.socket_path)
+        first = self.make_logger("first", collector=True)
+        with self.assertRaises(OSError):
+            self.make_logger("second", collector=True)
+
+        client = self.make_logger("client")
+        self.assertTrue(client.forward_to_aggregator("still collected", LoggingLevel.INFO, False))
+        first.shutdown()
+        self.assertIn(": INFO: still collected", self.read_log(first))
+
+
+if __name__ == "__main__":
+    unittest.main()
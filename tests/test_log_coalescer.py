@@ -0,0 +1,83 @@
+import os
+import unittest
+from freezegun import freeze_time
+
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from log_coalescer.py
+
+from log_coalescer import LogCoalescer, RepeatSummary  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+
+
+class Test(unittest.TestCase):
+    def test_first_occurrence_emitted_repeats_held_back(self) -> None:
+        """Tests the first occurrence of a message passes through and exact repeats are held back"""
+
+        coalescer = LogCoalescer(window=60)
+        with freeze_time("2023-08-19 00:00:00"):
+            self.assertEqual(coalescer.admit(LoggingLevel.ERROR, "sensor failed"), (True, []))
+            self.assertEqual(coalescer.admit(LoggingLevel.ERROR, "sensor failed"), (False, []))
+            self.assertEqual(coalescer.admit(LoggingLevel.ERROR, "sensor failed"), (False, []))
+            # Same message at another level is a different record
+            self.assertEqual(coalescer.admit(LoggingLevel.WARNING, "sensor failed"), (True, []))
+
+        self.assertEqual(coalescer.held_back_count, 2)
+
+    def test_summary_when_message_goes_quiet(self) -> None:
+        """Tests one summary with the repeat count and first/last timestamps once a message has been quiet for a window"""
+
+        coalescer = LogCoalescer(window=60)
+        with freeze_time("2023-08-19 00:00:00"):
+            coalescer.admit(LoggingLevel.ERROR, "sensor failed", send_to_api=True)
+        with freeze_time("2023-08-19 00:00:10"):
+            coalescer.admit(LoggingLevel.ERROR, "sensor failed")
+        with freeze_time("2023-08-19 00:00:20"):
+            coalescer.admit(LoggingLevel.ERROR, "sensor failed")
+        with freeze_time("2023-08-19 00:05:00"):
+            emit, summaries = coalescer.admit(LoggingLevel.INFO, "something else")
+
+        self.assertTrue(emit)
+        self.assertEqual(len(summaries), 1)
+        summary = summaries[0]
+        self.assertEqual((summary.logging_level, summary.message, summary.repeats, summary.send_to_api), (LoggingLevel.ERROR, "sensor failed", 2, True))
+        self.assertEqual(summary.last_ts - summary.first_ts, 10)
+
+    def test_continuous_repeats_reported_once_per_window(self) -> None:
+        """Tests a message that never stops repeating is still summarised once per window"""
+
+        coalescer = LogCoalescer(window=60)
+        summaries = []
+        for second in range(0, 180, 5):
+            with freeze_time(f"2023-08-19 00:{second // 60:02d}:{second % 60:02d}"):
+                summaries.extend(coalescer.admit(LoggingLevel.ERROR, "sensor failed")[1])
+
+        self.assertEqual([summary.repeats for summary in summaries], [12, 12])
+
+    def test_lru_eviction_bounds_memory(self) -> None:
+        """Tests the table never holds more than max_entries messages, evicting the least recently seen"""
+
+        coalescer = LogCoalescer(window=60, max_entries=2)
+        with freeze_time("2023-08-19 00:00:00"):
+            coalescer.admit(LoggingLevel.ERROR, "a")
+            coalescer.admit(LoggingLevel.ERROR, "a")
+            coalescer.admit(LoggingLevel.ERROR, "b")
+            coalescer.admit(LoggingLevel.ERROR, "a")
+            _, summaries = coalescer.admit(LoggingLevel.ERROR, "c")
+
+            self.assertEqual([summary.message for summary in summaries], [])
+            _, summaries = coalescer.admit(LoggingLevel.ERROR, "d")
+
+        self.assertEqual([(summary.message, summary.repeats) for summary in summaries], [("a", 2)])
+        self.assertEqual(len(coalescer.drain()), 0)
+
+    @freeze_time("2023-08-19 00:00:00")
+    def test_drain_and_format(self) -> None:
+        """Tests drain returns held back repeats and the summary reads as a log message"""
+
+        coalescer = LogCoalescer(window=60)
+        coalescer.admit(LoggingLevel.ERROR, "sensor failed")
+        coalescer.admit(LoggingLevel.ERROR, "sensor failed")
+
+        summaries = coalescer.drain()
+
+        self.assertEqual(summaries, [RepeatSummary(LoggingLevel.ERROR, "sensor failed", 1, summaries[0].first_ts, summaries[0].first_ts, False)])
+        self.assertEqual(summaries[0].format_message(), "Last message repeated 1 times between 19-08-2023 00:00:00 and 19-08-2023 00:00:00: sensor failed")
@@ -0,0 +1,109 @@
+import io
+import os
+import sys
+import gzip
+import tempfile
+import unittest
+from typing import List
+from unittest.mock import Mock
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from log_format.py
+
+from log_format import LogFormat, StructuredRecord, make_encoder, read_binary, read_records  # noqa: E402
+from log_record import LogRecord  # noqa: E402
+from log_rotation import parse_log_file_date  # noqa: E402
+from logging_utils import BirdbotLoggerUtils  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import FileConfig, LoggerConfig  # noqa: E402
+
+CREATED = 1692403200.123
+
+
+def make_record(message: str, logging_level: LoggingLevel = LoggingLevel.INFO) -> LogRecord:
+    return LogRecord(logging_level, message, CREATED, "19-08-2023 00:00:00", f"19-08-2023 00:00:00: {logging_level.name}: {message}")
+
+
+class Test(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write_file(self, name: str, log_format: LogFormat, records: List[LogRecord]) -> str:
+        path = os.path.join(self.directory.name, name)
+        encode = make_encoder(log_format, "test_device_id")
+        with open(path, "wb") as log_file:
+            for record in records:
+                log_file.write(encode(record))
+
+        return path
+
+    def test_structured_round_trip(self) -> None:
+        """Tests JSON lines and binary files read back exactly, including messages with newlines and non-ASCII"""
+
+        records = [make_record("first"), make_record("line one\nline two", LoggingLevel.ERROR), make_record('quote " and é', LoggingLevel.WARNING)]
+        expected = [StructuredRecord(1692403200123, record.logging_level, "test_device_id", record.message) for record in records]
+
+        for log_format, name in ((LogFormat.JSON_LINES, "19-08-23-birdbot.jsonl"), (LogFormat.BINARY, "19-08-23-birdbot.binlog")):
+            with self.subTest(log_format=log_format):
+                path = self.write_file(name, log_format, records)
+                self.assertEqual(list(read_records(path)), expected)
+
+    def test_text_continuation_lines(self) -> None:
+        """Tests text lines without a timestamp are joined onto the record before"""
+
+        path = self.write_file("19-08-23-birdbot.log", LogFormat.TEXT, [make_record("line one\nline two"), make_record("next", LoggingLevel.NOTICE)])
+        records = list(read_records(path))
+
+        self.assertEqual(
+            [(record.logging_level, record.message) for record in records], [(LoggingLevel.INFO, "line one\nline two"), (LoggingLevel.NOTICE, "next")]
+        )
+        self.assertEqual(records[0].timestamp_ms % 1000, 0)
+
+    def test_gzipped_file(self) -> None:
+        """Tests compressed old log files are read directly"""
+
+        path = self.write_file("19-08-23-birdbot.binlog", LogFormat.BINARY, [make_record("first"), make_record("second")])
+        with open(path, "rb") as source, gzip.open(path + ".gz", "wb") as destination:
+            destination.write(source.read())
+
+        self.assertEqual([record.message for record in read_records(path + ".gz")], ["first", "second"])
+
+    def test_binary_reader_small_chunks_and_torn_tail(self) -> None:
+        """Tests records spanning read chunks are reassembled, and a record cut short by a crash is skipped"""
+
+        encode = make_encoder(LogFormat.BINARY, "test_device_id")
+        data = b"".join(encode(make_record(f"record {index}")) for index in range(20))
+        torn = encode(make_record("torn"))[:-2]
+
+        records = list(read_binary(io.BytesIO(data + torn), chunk_size=7))
+
+        self.assertEqual([record.message for record in records], [f"record {index}" for index in range(20)])
+
+    def test_utils_writes_format(self) -> None:
+        """Tests the log file name and contents follow log_format, with the file handler and the async writer"""
+
+        for async_file_writes in (False, True):
+            with self.subTest(async_file_writes=async_file_writes):
+                directory = os.path.join(self.directory.name, str(async_file_writes))
+                birdbot_logger = BirdbotLoggerUtils(
+                    logging_directory=directory,
+                    logging_level=LoggingLevel.INFO,
+                    enable_remote_logging=False,
+                    remote_logging_rate_limit=0,
+                    logging_api_url="",
+                    device_id="test_device_id",
+                    config=LoggerConfig(file=FileConfig(async_writes=async_file_writes, log_format=LogFormat.BINARY)),
+                )
+                birdbot_logger.write_record_to_file(birdbot_logger.make_record("hello", LoggingLevel.WARNING))
+                birdbot_logger.shutdown()
+
+                self.assertTrue(birdbot_logger.log_file_path.endswith("-birdbot.binlog"))
+                self.assertIsNotNone(parse_log_file_date(os.path.basename(birdbot_logger.log_file_path)))
+                records = list(read_records(birdbot_logger.log_file_path))
+                self.assertEqual(
+                    [(record.logging_level, record.device_id, record.message) for record in records], [(LoggingLevel.WARNING, "test_device_id", "hello")]
+                )
@@ -0,0 +1,204 @@
+import os
+import sys
+import time
+import tempfile
+import subprocess
+import threading
+import unittest
+from datetime import datetime
+from typing import Any, List
+from unittest.mock import patch, Mock
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from log_query.py
+
+from log_format import LogFormat, StructuredRecord, make_encoder  # noqa: E402
+from log_index import INDEX_ENTRY, build_index, find_offset, index_path, read_index  # noqa: E402
+from log_query import follow, main, query  # noqa: E402
+from log_record import LogRecord, TIMESTAMP_FORMAT  # noqa: E402
+from log_rotation import LogHousekeeper  # noqa: E402
+from logging_utils import BirdbotLoggerUtils  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import FileConfig, LoggerConfig  # noqa: E402
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LEVELS = [LoggingLevel.INFO, LoggingLevel.WARNING, LoggingLevel.ERROR]
+
+
+def record_at(created: float, message: str, logging_level: LoggingLevel = LoggingLevel.INFO) -> LogRecord:
+    time_text = datetime.fromtimestamp(created).strftime(TIMESTAMP_FORMAT)
+    return LogRecord(logging_level, message, created, time_text, f"{time_text}: {logging_level.name}: {message}")
+
+
+class Test(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.directory.cleanup)
+        # Whole seconds, as text files only keep those
+        self.start = float(int(time.time()) - 2000)
+
+    def make_logger(self, **file_settings: Any) -> BirdbotLoggerUtils:
+        birdbot_logger = BirdbotLoggerUtils(
+            logging_directory=self.directory.name,
+            logging_level=LoggingLevel.INFO,
+            enable_remote_logging=False,
+            remote_logging_rate_limit=0,
+            logging_api_url="",
+            device_id="test_device_id",
+            config=LoggerConfig(file=FileConfig(index_interval=10, **file_settings)),
+        )
+        self.addCleanup(birdbot_logger.shutdown)
+        return birdbot_logger
+
+    def write_records(self, birdbot_logger: BirdbotLoggerUtils, count: int = 1000) -> List[LogRecord]:
+        records = [record_at(self.start + index, f"frame {index}\nsecond line", LEVELS[index % 3]) for index in range(count)]
+        for record in records:
+            birdbot_logger.write_record_to_file(record)
+        birdbot_logger.flush()
+        return records
+
+    def test_query_by_time_level_and_text(self) -> None:
+        """Tests a query returns the same records as filtering every record, in each format and file writer"""
+
+        for log_format in LogFormat:
+            for async_file_writes in (False, True):
+                with self.subTest(log_format=log_format, async_file_writes=async_file_writes):
+                    for filename in os.listdir(self.directory.name):
+                        os.remove(os.path.join(self.directory.name, filename))
+                    birdbot_logger = self.make_logger(log_format=log_format, async_writes=async_file_writes)
+                    records = self.write_records(birdbot_logger)
+
+                    since = datetime.fromtimestamp(self.start + 500)
+                    until = datetime.fromtimestamp(self.start + 600)
+                    results = list(query(self.directory.name, since, until, LoggingLevel.WARNING, "frame 5"))
+
+                    expected = [
+                        record.message
+                        for record in records
+                        if self.start + 500 <= record.created <= self.start + 600
+                        and record.logging_level >= LoggingLevel.WARNING
+                        and "frame 5" in record.message
+                    ]
+                    self.assertEqual([record.message for record in results], expected)
+                    self.assertGreater(len(expected), 0)
+                    birdbot_logger.shutdown()
+
+    def test_index_built_while_writing(self) -> None:
+        """Tests the logger writes an index entry every interval records, and a query starts near the range"""
+
+        birdbot_logger = self.make_logger()
+        self.write_records(birdbot_logger)
+
+        entries = read_index(index_path(birdbot_logger.log_file_path))
+        self.assertEqual(len(entries), 100)
+        self.assertEqual(entries[0], (int(self.start * 1000), 0))
+
+        file_size = os.path.getsize(birdbot_logger.log_file_path)
+        offset = find_offset(entries, int((self.start + 500) * 1000), file_size)
+        self.assertGreater(offset, file_size * 0.45)
+        with open(birdbot_logger.log_file_path, "rb") as log_file:
+            log_file.seek(offset)
+            self.assertTrue(log_file.readline().decode().endswith(": frame 490\n"))
+
+    def test_rebuild_index_matches(self) -> None:
+        """Tests an index rebuilt from the log file is the same as the one written while logging"""
+
+        for log_format in LogFormat:
+            with self.subTest(log_format=log_format):
+                birdbot_logger = self.make_logger(log_format=log_format)
+                self.write_records(birdbot_logger, 95)
+                birdbot_logger.shutdown()
+                path = birdbot_logger.log_file_path
+
+                written = read_index(index_path(path))
+                os.remove(index_path(path))
+                self.assertEqual(build_index(path, interval=10), 10)
+                self.assertEqual(read_index(index_path(path)), written)
+                os.remove(path)
+                os.remove(index_path(path))
+
+    def test_mismatched_index_ignored(self) -> None:
+        """Tests offsets past the end of the file, e.g. from an index that no longer matches it, are not used"""
+
+        entries = [(1000, 0), (2000, 500), (3000, 5000)]
+
+        self.assertEqual(find_offset(entries, 2500, 1000), 500)
+        self.assertEqual(find_offset(entries, 3500, 1000), 0)
+        self.assertEqual(find_offset(entries, 500, 1000), 0)
+
+    def test_torn_index_entry(self) -> None:
+        """Tests a partly written last index entry is ignored"""
+
+        path = os.path.join(self.directory.name, "test.idx")
+        with open(path, "wb") as index_file:
+            index_file.write(INDEX_ENTRY.pack(1000, 0) + INDEX_ENTRY.pack(2000, 10)[:5])
+
+        self.assertEqual(read_index(path), [(1000, 0)])
+
+    def test_housekeeper_deletes_index(self) -> None:
+        """Tests a log file deleted by retention takes its index with it"""
+
+        birdbot_logger = self.make_logger()
+        self.write_records(birdbot_logger, 20)
+        old_path = os.path.join(self.directory.name, "01-01-20-birdbot.log")
+        os.rename(birdbot_logger.log_file_path, old_path)
+        os.rename(index_path(birdbot_logger.log_file_path), index_path(old_path))
+
+        LogHousekeeper(self.directory.name, set, max_age_days=30).run_once()
+
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_follow_across_rollover(self) -> None:
+        """Tests follow starts at the end of the newest file, then picks up new records and the next day's file"""
+
+        encode = make_encoder(LogFormat.BINARY, "test_device_id")
+        today = os.path.join(self.directory.name, "19-08-23-birdbot.binlog")
+        tomorrow = os.path.join(self.directory.name, "20-08-23-birdbot.binlog")
+        with open(today, "wb") as log_file:
+            log_file.write(encode(record_at(self.start, "old")))
+
+        def write_later() -> None:
+            with open(today, "ab") as log_file:
+                data = encode(record_at(self.start + 1, "new"))
+                # Half a record first, as if it were still being written
+                log_file.write(data[:10])
+                log_file.flush()
+                time.sleep(0.05)
+                log_file.write(data[10:])
+            with open(tomorrow, "wb") as log_file:
+                log_file.write(encode(record_at(self.start + 2, "next day", LoggingLevel.ERROR)))
+
+        records = follow(self.directory.name, poll_interval=0.01)
+        threading.Timer(0.1, write_later).start()
+
+        self.assertEqual(next(records), StructuredRecord(int((self.start + 1) * 1000), LoggingLevel.INFO, "test_device_id", "new"))
+        self.assertEqual(next(records).message, "next day")
+
+    def test_command_line(self) -> None:
+        """Tests the command line entry point prints matching records"""
+
+        birdbot_logger = self.make_logger()
+        self.write_records(birdbot_logger, 30)
+        since = datetime.fromtimestamp(self.start + 10)
+
+        with patch("builtins.print") as mock_print:
+            main([self.directory.name, "--since", since.strftime(TIMESTAMP_FORMAT), "--level", "ERROR", "--contains", "frame 2"])
+
+        printed = [call.args[0] for call in mock_print.call_args_list]
+        self.assertEqual(
+            [line.split(": ", 2)[2] for line in printed], ["frame 20\nsecond line", "frame 23\nsecond line", "frame 26\nsecond line", "frame 29\nsecond line"]
+        )
+
+    def test_run_as_module(self) -> None:
+        """Tests python -m log_query runs from the logger's directory, without STANDALONE set, as the usage says"""
+
+        birdbot_logger = self.make_logger()
+        self.write_records(birdbot_logger, 3)
+
+        environment = {name: value for name, value in os.environ.items() if name != "STANDALONE"}
+        command = [sys.executable, "-m", "log_query", self.directory.name, "--contains", "frame 1"]
+        output = subprocess.run(command, cwd=PACKAGE_DIRECTORY, env=environment, capture_output=True, text=True, check=True)
+
+        self.assertEqual(output.stdout.split(": ", 2)[2], "frame 1\nsecond line\n")
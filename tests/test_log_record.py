@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import Mock
+from freezegun import freeze_time
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from logging_utils.py
+
+from log_record import LogRecord, TimestampCache  # noqa: E402
+from logging_utils import BirdbotLoggerUtils  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+
+
+class Test(unittest.TestCase):
+    def test_timestamp_cache_formats_once_per_second(self) -> None:
+        """Tests strftime only runs again once the wall-clock second changes"""
+
+        cache = TimestampCache()
+        with freeze_time("2023-08-19 00:00:00.100"):
+            first = cache.now()[1]
+        with freeze_time("2023-08-19 00:00:00.900"):
+            same_second = cache.now()[1]
+        with freeze_time("2023-08-19 00:00:01.000"):
+            next_second = cache.now()[1]
+
+        self.assertEqual(first, "19-08-2023 00:00:00")
+        # Reused, not reformatted, within the same second
+        self.assertIs(same_second, first)
+        self.assertEqual(next_second, "19-08-2023 00:00:01")
+
+    @freeze_time("2023-08-19 00:00:00")
+    def test_make_record(self) -> None:
+        """Tests a record carries the level, message, timestamp and the text written to file"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            birdbot_logger = BirdbotLoggerUtils(
+                logging_directory=directory,
+                logging_level=LoggingLevel.INFO,
+                enable_remote_logging=False,
+                remote_logging_rate_limit=0,
+                logging_api_url="",
+                device_id="test_device_id",
+            )
+            record = birdbot_logger.make_record("test", LoggingLevel.WARNING)
+
+        self.assertEqual(record, LogRecord(LoggingLevel.WARNING, "test", 1692403200.0, "19-08-2023 00:00:00", "19-08-2023 00:00:00: WARNING: test"))
+
+    @freeze_time("2023-08-19 00:00:00")
+    def test_write_record_to_file(self) -> None:
+        """Tests the record's text is written to the day's log file as a line"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            birdbot_logger = BirdbotLoggerUtils(
+                logging_directory=directory,
+                logging_level=LoggingLevel.INFO,
+                enable_remote_logging=False,
+                remote_logging_rate_limit=0,
+                logging_api_url="",
+                device_id="test_device_id",
+            )
+            birdbot_logger.write_record_to_file(birdbot_logger.make_record("first", LoggingLevel.INFO))
+            birdbot_logger.write_record_to_file(birdbot_logger.make_record("second", LoggingLevel.ERROR))
+            assert birdbot_logger.file_handler is not None
+            birdbot_logger.birdbot_logger.removeHandler(birdbot_logger.file_handler)
+            birdbot_logger.file_handler.close()
+
+            with open(os.path.join(directory, "19-08-23-birdbot.log"), encoding="utf-8") as log_file:
+                self.assertEqual(log_file.read(), "19-08-2023 00:00:00: INFO: first\n19-08-2023 00:00:00: ERROR: second\n")
@@ -0,0 +1,153 @@
+import os
+import sys
+import gzip
+import tempfile
+import threading
+import unittest
+from typing import Any
+from datetime import datetime
+from unittest.mock import patch, Mock
+from freezegun import freeze_time
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from logging_utils.py
+
+from log_rotation import LogHousekeeper, next_midnight, parse_log_file_date  # noqa: E402
+from logging_utils import BirdbotLoggerUtils  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import FileConfig, LoggerConfig, RetentionConfig  # noqa: E402
+
+
+class Test(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.directory.cleanup)
+
+    def make_logger(self, **kwargs: Any) -> BirdbotLoggerUtils:
+        birdbot_logger = BirdbotLoggerUtils(
+            logging_directory=self.directory.name,
+            logging_level=LoggingLevel.INFO,
+            enable_remote_logging=False,
+            remote_logging_rate_limit=0,
+            logging_api_url="",
+            device_id="test_device_id",
+            **kwargs,
+        )
+        self.addCleanup(birdbot_logger.shutdown)
+        return birdbot_logger
+
+    def read(self, filename: str) -> str:
+        with open(os.path.join(self.directory.name, filename), encoding="utf-8") as log_file:
+            return log_file.read()
+
+    def write_log_file(self, filename: str, size: int = 100) -> None:
+        with open(os.path.join(self.directory.name, filename), "w", encoding="utf-8") as log_file:
+            log_file.write("x" * size)
+
+    def test_next_midnight(self) -> None:
+        """Tests the next rollover is the following local midnight"""
+
+        self.assertEqual(next_midnight(datetime(2023, 8, 19, 23, 59, 59).timestamp()), datetime(2023, 8, 20).timestamp())
+        self.assertEqual(next_midnight(datetime(2023, 8, 20).timestamp()), datetime(2023, 8, 21).timestamp())
+
+    def test_parse_log_file_date(self) -> None:
+        """Tests daily log files, compressed or not, are recognised by name"""
+
+        self.assertEqual(parse_log_file_date("19-08-23-birdbot.log"), datetime(2023, 8, 19))
+        self.assertEqual(parse_log_file_date("19-08-23-birdbot-error.log.gz"), datetime(2023, 8, 19))
+        self.assertIsNone(parse_log_file_date("notes.log"))
+        self.assertIsNone(parse_log_file_date("99-99-99-birdbot.log"))
+
+    def test_rotation_at_midnight(self) -> None:
+        """Tests records after midnight go to the next day's file"""
+
+        with freeze_time("2023-08-19 23:59:59"):
+            birdbot_logger = self.make_logger()
+            birdbot_logger.write_record_to_file(birdbot_logger.make_record("before midnight", LoggingLevel.INFO))
+        with freeze_time("2023-08-20 00:00:00"):
+            birdbot_logger.write_record_to_file(birdbot_logger.make_record("after midnight", LoggingLevel.INFO))
+
+        self.assertEqual(self.read("19-08-23-birdbot.log"), "19-08-2023 23:59:59: INFO: before midnight\n")
+        self.assertEqual(self.read("20-08-23-birdbot.log"), "20-08-2023 00:00:00: INFO: after midnight\n")
+
+    def test_rotation_at_midnight_async_writer(self) -> None:
+        """Tests the async writer switches files exactly between the records either side of midnight"""
+
+        with freeze_time("2023-08-19 23:59:59"):
+            birdbot_logger = self.make_logger(config=LoggerConfig(file=FileConfig(async_writes=True, flush_interval=60)))
+            birdbot_logger.write_record_to_file(birdbot_logger.make_record("before midnight", LoggingLevel.INFO))
+        with freeze_time("2023-08-20 00:00:00"):
+            birdbot_logger.write_record_to_file(birdbot_logger.make_record("after midnight", LoggingLevel.INFO))
+        self.assertTrue(birdbot_logger.flush(timeout=5))
+
+        self.assertEqual(self.read("19-08-23-birdbot.log"), "19-08-2023 23:59:59: INFO: before midnight\n")
+        self.assertEqual(self.read("20-08-23-birdbot.log"), "20-08-2023 00:00:00: INFO: after midnight\n")
+
+    def test_rollover_compression_async_writer(self) -> None:
+        """Tests the closed day is only compressed once the async writer has written the records queued for it"""
+
+        with freeze_time("2023-08-19 23:59:59"):
+            config = LoggerConfig(file=FileConfig(async_writes=True, flush_interval=60), retention=RetentionConfig(compress=True))
+            birdbot_logger = self.make_logger(config=config)
+            assert birdbot_logger.files.housekeeper is not None
+            birdbot_logger.files.housekeeper.wait_idle(timeout=5)
+            for index in range(5):
+                birdbot_logger.write_record_to_file(birdbot_logger.make_record(f"before midnight {index}", LoggingLevel.INFO))
+        with freeze_time("2023-08-20 00:00:00"):
+            birdbot_logger.write_record_to_file(birdbot_logger.make_record("after midnight", LoggingLevel.INFO))
+        self.assertTrue(birdbot_logger.flush(timeout=5))
+        self.assertTrue(birdbot_logger.files.housekeeper.wait_idle(timeout=5))
+
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["19-08-23-birdbot.log.gz", "20-08-23-birdbot.log"])
+        with gzip.open(os.path.join(self.directory.name, "19-08-23-birdbot.log.gz"), "rt") as compressed:
+            self.assertEqual(compressed.read(), "".join(f"19-08-2023 23:59:59: INFO: before midnight {index}\n" for index in range(5)))
+
+    def test_housekeeping_compresses_closed_days(self) -> None:
+        """Tests closed days are gzipped and the active file is left alone"""
+
+        self.write_log_file("18-08-23-birdbot.log")
+        self.write_log_file("19-08-23-birdbot.log")
+        active = os.path.join(self.directory.name, "19-08-23-birdbot.log")
+
+        housekeeper = LogHousekeeper(self.directory.name, lambda: {active}, compress=True)
+        housekeeper.run_once()
+
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["18-08-23-birdbot.log.gz", "19-08-23-birdbot.log"])
+        with gzip.open(os.path.join(self.directory.name, "18-08-23-birdbot.log.gz"), "rt") as compressed:
+            self.assertEqual(compressed.read(), "x" * 100)
+
+    def test_housekeeping_retention_by_age_and_size(self) -> None:
+        """Tests files older than the retention period are deleted, then the oldest until under the size cap"""
+
+        for day in range(10, 20):
+            self.write_log_file(f"{day}-08-23-birdbot.log")
+        self.write_log_file("unrelated.txt", size=10000)
+        active = os.path.join(self.directory.name, "19-08-23-birdbot.log")
+
+        housekeeper = LogHousekeeper(self.directory.name, lambda: {active}, max_age_days=7, max_total_bytes=350)
+        housekeeper.run_once(now=datetime(2023, 8, 19, 12))
+
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["17-08-23-birdbot.log", "18-08-23-birdbot.log", "19-08-23-birdbot.log", "unrelated.txt"])
+        self.assertEqual(housekeeper.deleted_count, 7)
+
+    def test_rollover_does_not_wait_for_compression(self) -> None:
+        """Tests rolling over returns while compression of the closed day is still running"""
+
+        release = threading.Event()
+        with freeze_time("2023-08-19 23:59:59"):
+            birdbot_logger = self.make_logger(config=LoggerConfig(retention=RetentionConfig(compress=True)))
+            assert birdbot_logger.files.housekeeper is not None
+            birdbot_logger.files.housekeeper.wait_idle(timeout=5)
+            birdbot_logger.write_record_to_file(birdbot_logger.make_record("before midnight", LoggingLevel.INFO))
+
+        with patch.object(LogHousekeeper, "_compress", side_effect=lambda path: release.wait(5)):
+            with freeze_time("2023-08-20 00:00:00"):
+                birdbot_logger.write_record_to_file(birdbot_logger.make_record("after midnight", LoggingLevel.INFO))
+            # The write has returned while compression is still blocked
+            compressing = not birdbot_logger.files.housekeeper.wait_idle(timeout=0.2)
+            release.set()
+            self.assertTrue(birdbot_logger.files.housekeeper.wait_idle(timeout=5))
+
+        self.assertTrue(compressing)
+        self.assertEqual(self.read("20-08-23-birdbot.log"), "20-08-2023 00:00:00: INFO: after midnight\n")
@@ -0,0 +1,96 @@
+import os
+import sys
+import unittest
+from typing import List
+from unittest.mock import patch, MagicMock, Mock
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from logging_utils.py
+
+from log_sampler import LogSampler, format_sampled, sample_rate_of  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+
+
+class Test(unittest.TestCase):
+    def test_fixed_rate_per_call_site(self) -> None:
+        """Tests each call site writes its own first call and every Nth after it, and other levels are not sampled"""
+
+        sampler = LogSampler({LoggingLevel.DEBUG: 10})
+        first: List[int] = []
+        second: List[int] = []
+        for _ in range(25):
+            first.append(sampler.sample(LoggingLevel.DEBUG, depth=0))
+            second.append(sampler.sample(LoggingLevel.DEBUG, depth=0))
+
+        self.assertEqual([index for index, rate in enumerate(first) if rate], [0, 10, 20])
+        self.assertEqual(first, second)
+        self.assertEqual(first[0], 10)
+        self.assertEqual(sampler.sampled_out_count, 44)
+        self.assertEqual(sampler.sample(LoggingLevel.ERROR, depth=0), 1)
+
+    def test_template_keys_calls_with_args(self) -> None:
+        """Tests calls with a format string and args are sampled by the format string, wherever they come from"""
+
+        sampler = LogSampler({LoggingLevel.DEBUG: 3})
+        rates = [sampler.sample(LoggingLevel.DEBUG, "Processed frame %d", (index,)) for index in range(3)]
+        rates.extend(sampler.sample(LoggingLevel.DEBUG, "Processed frame %d", (index,)) for index in range(3))
+
+        self.assertEqual(rates, [3, 0, 0, 3, 0, 0])
+        self.assertEqual(sampler.sample(LoggingLevel.DEBUG, "Dropped frame %d", (1,)), 3)
+
+    def test_call_site_is_callers_caller(self) -> None:
+        """Tests calls through a wrapper, like log_debug, are keyed by where the wrapper was called from"""
+
+        sampler = LogSampler({LoggingLevel.INFO: 2})
+
+        def log_info() -> int:
+            return sampler.sample(LoggingLevel.INFO, depth=1)
+
+        self.assertEqual([log_info(), log_info(), log_info()], [2, 2, 2])
+
+    def test_least_recently_used_sites_forgotten(self) -> None:
+        """Tests templates made at run time don't grow the counts past max_sites, and a site in use keeps its count"""
+
+        sampler = LogSampler({LoggingLevel.DEBUG: 3}, max_sites=8)
+        rates = []
+        for index in range(100):
+            rates.append(sampler.sample(LoggingLevel.DEBUG, "Processed frame %d", (index,)))
+            sampler.sample(LoggingLevel.DEBUG, f"Camera {index}: %s", ("ready",))
+
+        self.assertEqual(len(sampler._sites), 8)  # pylint: disable=protected-access
+        self.assertEqual([index for index, rate in enumerate(rates) if rate], list(range(0, 100, 3)))
+
+    @patch("log_sampler.time.monotonic")
+    def test_adaptive_rate(self, mock_monotonic: MagicMock) -> None:
+        """Tests rates go up while sampled sites write more than the budget, and back down once they don't"""
+
+        mock_monotonic.return_value = 0.0
+        sampler = LogSampler({LoggingLevel.DEBUG: 1}, budget=10)
+
+        def run_for_a_second(calls: int) -> int:
+            written = 0
+            for _ in range(calls):
+                mock_monotonic.return_value += 1 / calls
+                written += sampler.sample(LoggingLevel.DEBUG, depth=0) > 0
+            return written
+
+        self.assertEqual(run_for_a_second(100), 100)
+        self.assertEqual(sampler.multiplier, 10)
+        self.assertLessEqual(run_for_a_second(100), 11)
+        self.assertEqual(sampler.multiplier, 10)
+
+        # Only reconsidered when a record is written, so it takes a few seconds at 5 calls a second
+        for _ in range(4):
+            run_for_a_second(5)
+        self.assertEqual(sampler.multiplier, 1)
+
+    def test_sample_rate_round_trip(self) -> None:
+        """Tests the sample rate written with a message can be read back to reconstruct counts"""
+
+        self.assertEqual(sample_rate_of(format_sampled("Processed frame 42", 30)), 30)
+        self.assertEqual(sample_rate_of("Processed frame 42"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
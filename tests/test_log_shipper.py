@@ -0,0 +1,209 @@
+import os
+import sys
+import time
+import threading
+import unittest
+from typing import Any, Dict, List
+from unittest.mock import patch, MagicMock, Mock
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from logging_utils.py
+
+from log_shipper import LogShipper  # noqa: E402
+from logging_utils import BirdbotLoggerUtils  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import LoggerConfig, OverflowPolicy, ShipperConfig  # noqa: E402
+
+
+class RecordingSender:
+    """Stands in for the API. Records every batch, optionally blocking until released"""
+
+    def __init__(self, result: bool = True) -> None:
+        self.result = result
+        self.batches: List[List[Dict[str, Any]]] = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, batch: List[Dict[str, Any]]) -> bool:
+        self.release.wait()
+        self.batches.append(batch)
+        return self.result
+
+
+class Test(unittest.TestCase):
+    def test_batches_by_count(self) -> None:
+        """Tests records are grouped into batches of batch_size"""
+
+        sender = RecordingSender()
+        shipper = LogShipper(sender, config=ShipperConfig(batch_size=3, batch_interval=60))
+        shipper.start()
+        for index in range(6):
+            shipper.enqueue({"log_message": index})
+
+        self.assertTrue(shipper.flush(timeout=5))
+        shipper.shutdown()
+
+        self.assertEqual([[record["log_message"] for record in batch] for batch in sender.batches], [[0, 1, 2], [3, 4, 5]])
+        self.assertEqual(shipper.queue.sent_count, 6)
+
+    def test_batches_by_time_window(self) -> None:
+        """Tests a partial batch is sent once the batch interval has passed, without a flush"""
+
+        sender = RecordingSender()
+        shipper = LogShipper(sender, config=ShipperConfig(batch_size=100, batch_interval=0.05))
+        shipper.start()
+        shipper.enqueue({"log_message": "test"})
+
+        deadline = time.monotonic() + 5
+        while not sender.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        shipper.shutdown()
+
+        self.assertEqual(sender.batches, [[{"log_message": "test"}]])
+
+    def test_overflow_drop_oldest(self) -> None:
+        """Tests the oldest queued records are dropped and counted when the queue is full"""
+
+        sender = RecordingSender()
+        shipper = LogShipper(sender, config=ShipperConfig(batch_size=10, max_queue_size=3, overflow_policy=OverflowPolicy.DROP_OLDEST))
+        for index in range(5):
+            self.assertTrue(shipper.enqueue({"log_message": index}))
+
+        shipper.start()
+        shipper.shutdown()
+
+        self.assertEqual(shipper.queue.dropped_oldest_count, 2)
+        self.assertEqual(shipper.queue.dropped_newest_count, 0)
+        self.assertEqual([record["log_message"] for record in sender.batches[0]], [2, 3, 4])
+
+    def test_overflow_drop_newest(self) -> None:
+        """Tests new records are rejected and counted when the queue is full"""
+
+        sender = RecordingSender()
+        shipper = LogShipper(sender, config=ShipperConfig(batch_size=10, max_queue_size=3, overflow_policy=OverflowPolicy.DROP_NEWEST))
+        results = [shipper.enqueue({"log_message": index}) for index in range(5)]
+
+        shipper.start()
+        shipper.shutdown()
+
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertEqual(shipper.queue.dropped_newest_count, 2)
+        self.assertEqual([record["log_message"] for record in sender.batches[0]], [0, 1, 2])
+
+    def test_failed_send_is_counted_and_reported(self) -> None:
+        """Tests a batch that raises is counted as failed and reported through on_error"""
+
+        on_error = MagicMock()
+        shipper = LogShipper(MagicMock(side_effect=ConnectionError("unreachable")), on_error=on_error, config=ShipperConfig(batch_size=2))
+        shipper.start()
+        shipper.enqueue({"log_message": "a"})
+        shipper.enqueue({"log_message": "b"})
+        shipper.shutdown()
+
+        self.assertEqual(shipper.queue.failed_count, 2)
+        self.assertEqual(shipper.queue.sent_count, 0)
+        on_error.assert_called_once_with("Failed to send log batch to API: unreachable")
+
+    def test_enqueue_does_not_block_on_slow_send(self) -> None:
+        """Tests enqueue returns straight away while the worker is stuck sending"""
+
+        sender = RecordingSender()
+        sender.release.clear()
+        shipper = LogShipper(sender, config=ShipperConfig(batch_size=1))
+        shipper.start()
+        shipper.enqueue({"log_message": "stuck"})
+
+        start = time.perf_counter()
+        for index in range(100):
+            shipper.enqueue({"log_message": index})
+        elapsed = time.perf_counter() - start
+
+        sender.release.set()
+        shipper.shutdown()
+
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(shipper.queue.sent_count, 101)
+
+    def test_failed_batch_handed_to_on_failure(self) -> None:
+        """Tests a batch the API rejects is passed to on_failure, e.g. to be spooled"""
+
+        on_failure = MagicMock()
+        shipper = LogShipper(RecordingSender(result=False), on_failure=on_failure, config=ShipperConfig(batch_size=2))
+        shipper.start()
+        shipper.enqueue({"log_message": "a"})
+        shipper.enqueue({"log_message": "b"})
+        shipper.shutdown()
+
+        on_failure.assert_called_once_with([{"log_message": "a"}, {"log_message": "b"}])
+
+    def test_replay_runs_only_when_idle(self) -> None:
+        """Tests backlog replay runs while the queue is empty and keeps going while it reports more backlog"""
+
+        backlog = [3, 2, 1]
+        replayed = threading.Event()
+
+        def replay() -> bool:
+            backlog.pop()
+            if not backlog:
+                replayed.set()
+            return bool(backlog)
+
+        shipper = LogShipper(RecordingSender(), replay=replay, config=ShipperConfig(replay_interval=60))
+        shipper.start()
+        self.assertTrue(replayed.wait(timeout=5))
+        shipper.shutdown()
+
+        self.assertEqual(backlog, [])
+
+    @patch("logging_transport.HttpTransport.post")
+    def test_inline_delivery_by_default(self, mock_requests: MagicMock) -> None:
+        """Tests background sending is opt-in: by default send_log_to_api posts the record before returning"""
+
+        mock_requests.return_value.status_code = 200
+        birdbot_logger = BirdbotLoggerUtils(
+            logging_directory="logs",
+            logging_level=LoggingLevel.INFO,
+            enable_remote_logging=True,
+            remote_logging_rate_limit=0,
+            logging_api_url="http://test.com",
+            device_id="test_device_id",
+        )
+        self.addCleanup(birdbot_logger.shutdown)
+        log_notice = MagicMock()
+
+        birdbot_logger.send_log_to_api("test", LoggingLevel.ERROR, MagicMock(), log_notice)
+
+        self.assertFalse(ShipperConfig().background)
+        self.assertIsNone(birdbot_logger.remote.shipper)
+        mock_requests.assert_called_once()
+        self.assertEqual(mock_requests.call_args.args[1]["log_message"], "test")
+        log_notice.assert_called_once_with("Successfully sent log to API")
+
+    @patch("logging_transport.HttpTransport.post")
+    def test_background_delivery_send_log_to_api(self, mock_requests: MagicMock) -> None:
+        """Tests send_log_to_api queues the record in background mode and flush posts it as a batch"""
+
+        mock_requests.return_value.status_code = 200
+        birdbot_logger = BirdbotLoggerUtils(
+            logging_directory="logs",
+            logging_level=LoggingLevel.INFO,
+            enable_remote_logging=True,
+            remote_logging_rate_limit=0,
+            logging_api_url="http://test.com",
+            device_id="test_device_id",
+            config=LoggerConfig(shipper=ShipperConfig(background=True, batch_interval=60)),
+        )
+        log_error = MagicMock()
+        log_notice = MagicMock()
+
+        birdbot_logger.send_log_to_api("test", LoggingLevel.ERROR, log_error, log_notice)
+        mock_requests.assert_not_called()
+
+        self.assertTrue(birdbot_logger.flush(timeout=5))
+        birdbot_logger.shutdown()
+
+        mock_requests.assert_called_once()
+        batch = mock_requests.call_args.args[1]
+        self.assertEqual([(record["log_message"], record["log_level"]) for record in batch], [("test", "ERROR")])
+        log_error.assert_not_called()
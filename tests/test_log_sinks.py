@@ -0,0 +1,145 @@
+import os
+import sys
+import tempfile
+import unittest
+from typing import Any, List
+from unittest.mock import patch, MagicMock, Mock
+from freezegun import freeze_time
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from logging_utils.py
+
+import birdbot_logger  # noqa: E402
+from log_record import LogRecord  # noqa: E402
+from log_sinks import NO_LEVEL, SinkPipeline  # noqa: E402
+from logging_utils import BirdbotLoggerUtils  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import FileConfig, LoggerConfig  # noqa: E402
+
+
+class Test(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.directory.cleanup)
+
+    def make_logger(self, **kwargs: Any) -> BirdbotLoggerUtils:
+        utils = BirdbotLoggerUtils(
+            logging_directory=self.directory.name,
+            logging_level=LoggingLevel.INFO,
+            enable_remote_logging=False,
+            remote_logging_rate_limit=0,
+            logging_api_url="",
+            device_id="test_device_id",
+            quiet=True,
+            **kwargs,
+        )
+        self.addCleanup(utils.shutdown)
+        return utils
+
+    def read(self, filename: str) -> str:
+        with open(os.path.join(self.directory.name, filename), encoding="utf-8") as log_file:
+            return log_file.read()
+
+    def test_dispatch_table(self) -> None:
+        """Tests each level's table holds the enabled sinks at or below it, in the order they were added, and is rebuilt
+        on every change"""
+
+        changes: List[None] = []
+        pipeline = SinkPipeline(on_change=lambda: changes.append(None))
+        written: List[str] = []
+
+        def console(record: LogRecord) -> None:
+            written.append(f"console {record.message}")
+
+        def errors(record: LogRecord) -> None:
+            written.append(f"errors {record.message}")
+
+        def remote(_record: LogRecord, _asynchronous: bool) -> None:
+            pass
+
+        pipeline.add("console", console, LoggingLevel.INFO)
+        pipeline.add("errors", errors, LoggingLevel.ERROR)
+        pipeline.add("remote", remote, LoggingLevel.DEBUG, remote=True)
+
+        self.assertEqual(pipeline.local[LoggingLevel.DEBUG], ())
+        self.assertEqual(pipeline.local[LoggingLevel.WARNING], (console,))
+        self.assertEqual(pipeline.local[LoggingLevel.ERROR], (console, errors))
+        self.assertEqual(pipeline.remote[LoggingLevel.DEBUG], (remote,))
+        self.assertEqual(pipeline.min_level, LoggingLevel.INFO)
+
+        pipeline.write(LogRecord(LoggingLevel.ERROR, "failed", 0, "", ""))
+        self.assertEqual(written, ["console failed", "errors failed"])
+
+        pipeline.set_level("errors", LoggingLevel.WARNING)
+        pipeline.enable("console", False)
+        self.assertEqual(pipeline.local[LoggingLevel.WARNING], (errors,))
+        self.assertEqual(pipeline.min_level, LoggingLevel.WARNING)
+
+        self.assertTrue(pipeline.remove("errors"))
+        self.assertFalse(pipeline.remove("errors"))
+        self.assertEqual(pipeline.min_level, NO_LEVEL)
+        with self.assertRaises(KeyError):
+            pipeline.set_level("errors", LoggingLevel.INFO)
+        self.assertEqual(len(changes), 6)
+
+    def test_error_log_file(self) -> None:
+        """Tests ERROR records are also written to the day's error file, which switches at midnight with the main file"""
+
+        with freeze_time("2023-08-19 23:59:59"):
+            utils = self.make_logger()
+            utils.log_locally("started", LoggingLevel.INFO)
+            utils.log_locally("failed", LoggingLevel.ERROR)
+        with freeze_time("2023-08-20 00:00:00"):
+            utils.log_locally("failed again", LoggingLevel.ERROR)
+        utils.shutdown()
+
+        self.assertEqual(self.read("19-08-23-birdbot.log"), "19-08-2023 23:59:59: INFO: started\n19-08-2023 23:59:59: ERROR: failed\n")
+        self.assertEqual(self.read("19-08-23-birdbot-error.log"), "19-08-2023 23:59:59: ERROR: failed\n")
+        self.assertEqual(self.read("20-08-23-birdbot-error.log"), "20-08-2023 00:00:00: ERROR: failed again\n")
+        self.assertEqual(utils.get_stats()["sinks"]["error_file"], 2)
+
+    def test_error_log_file_disabled(self) -> None:
+        """Tests no error file is written when it is turned off"""
+
+        utils = self.make_logger(config=LoggerConfig(file=FileConfig(error_log_file=False)))
+        utils.log_locally("failed", LoggingLevel.ERROR)
+        utils.shutdown()
+
+        self.assertEqual(os.listdir(self.directory.name), [os.path.basename(utils.log_file_path)])
+
+    @patch.dict(sys.modules, {"config": None})
+    @patch("logging_transport.HttpTransport.post")
+    def test_added_sinks_and_levels(self, mock_post: MagicMock) -> None:
+        """Tests a sink added to the logger gets the log_* calls at its level, levels are set per sink, and only calls
+        with send_to_api reach the API"""
+
+        mock_post.return_value.status_code = 200
+        birdbot_logger.configure(logging_directory=self.directory.name, logging_level=LoggingLevel.WARNING, quiet=True, enable_remote_logging=True)
+        self.addCleanup(birdbot_logger.shutdown)
+        records: List[LogRecord] = []
+        birdbot_logger.add_sink("memory", records.append, LoggingLevel.DEBUG)
+
+        birdbot_logger.log_debug("frame")
+        birdbot_logger.log_info("started")
+        birdbot_logger.log_warning("slow", send_to_api=True)
+        self.assertEqual([record.message for record in records], ["frame", "started", "slow", "Successfully sent log to API"])
+        self.assertEqual(mock_post.call_count, 1)
+
+        birdbot_logger.set_sink_level("memory", LoggingLevel.ERROR)
+        birdbot_logger.set_sink_level("file", LoggingLevel.DEBUG)
+        birdbot_logger.log_info("not kept")
+        birdbot_logger.log_debug("kept in file")
+        self.assertTrue(birdbot_logger.remove_sink("memory"))
+        birdbot_logger.log_error("not kept", send_to_api=False)
+        birdbot_logger.shutdown()
+
+        self.assertEqual(len(records), 4)
+        self.assertEqual(
+            [line.split(": ", 1)[1] for line in self.read(os.path.basename(birdbot_logger.birdbot_logger.log_file_path)).splitlines()],
+            ["WARNING: slow", "INFO: not kept", "DEBUG: kept in file", "ERROR: not kept"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+import os
+import sys
+import time
+import signal
+import tempfile
+import threading
+import subprocess
+import unittest
+from typing import Any, Dict, List
+from unittest.mock import patch, MagicMock, Mock
+
+import requests
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from logging_utils.py
+
+from log_spool import LogSpool  # noqa: E402
+from logging_utils import BirdbotLoggerUtils  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import LoggerConfig, SpoolConfig  # noqa: E402
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Appends numbered records one at a time, forever, until it is killed
+SPOOL_WRITER = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from log_spool import LogSpool
+from logger_config import SpoolConfig
+
+spool = LogSpool(sys.argv[2], config=SpoolConfig(segment_bytes=64 * 1024))
+sequence = 0
+while True:
+    spool.append([{"sequence": sequence, "log_message": "x" * 200}])
+    if sequence == 0:
+        print("ready", flush=True)
+    sequence += 1
+"""
+
+
+class Test(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.directory.cleanup)
+
+    def _drain(self, spool: LogSpool) -> List[Dict[str, Any]]:
+        records: List[Dict[str, Any]] = []
+        while True:
+            batch = spool.read_batch(max_records=7)
+            if not batch:
+                return records
+            records.extend(batch)
+            spool.commit_batch()
+
+    def test_round_trip_across_segments(self) -> None:
+        """Tests records come back oldest first across several segments, and are removed once committed"""
+
+        spool = LogSpool(self.directory.name, config=SpoolConfig(segment_bytes=256))
+        self.addCleanup(spool.close)
+        for index in range(50):
+            spool.append([{"log_message": index}])
+
+        self.assertEqual([record["log_message"] for record in self._drain(spool)], list(range(50)))
+        self.assertEqual(spool.size, 0)
+        self.assertEqual(spool.read_batch(), [])
+
+    def test_uncommitted_batch_is_read_again(self) -> None:
+        """Tests a batch that was read but not committed, e.g. because sending failed, is returned again"""
+
+        spool = LogSpool(self.directory.name)
+        self.addCleanup(spool.close)
+        spool.append([{"log_message": "a"}, {"log_message": "b"}])
+
+        self.assertEqual(spool.read_batch(max_records=1), [{"log_message": "a"}])
+        self.assertEqual(spool.read_batch(max_records=1), [{"log_message": "a"}])
+        spool.commit_batch()
+        self.assertEqual(spool.read_batch(max_records=1), [{"log_message": "b"}])
+
+    def test_oldest_segments_evicted_over_cap(self) -> None:
+        """Tests the oldest records are evicted first once the spool grows past max_bytes"""
+
+        spool = LogSpool(self.directory.name, config=SpoolConfig(max_bytes=2048, segment_bytes=512))
+        self.addCleanup(spool.close)
+        for index in range(200):
+            spool.append([{"log_message": index}])
+        self.assertLessEqual(spool.size, 2048)
+        self.assertGreater(spool.evicted_segments, 0)
+
+        records = [record["log_message"] for record in self._drain(spool)]
+        self.assertEqual(records, list(range(200 - len(records), 200)))
+
+    def test_torn_frame_is_discarded_on_reopen(self) -> None:
+        """Tests a partially written frame at the end of the spool is dropped, and that appends after it still work"""
+
+        spool = LogSpool(self.directory.name)
+        spool.append([{"log_message": "complete"}])
+        spool.close()
+
+        segment = os.path.join(self.directory.name, os.listdir(self.directory.name)[0])
+        with open(segment, "ab") as segment_file:
+            segment_file.write(b"\x00\x00\x00\x40\x12\x34")
+
+        spool = LogSpool(self.directory.name)
+        self.addCleanup(spool.close)
+        spool.append([{"log_message": "after restart"}])
+
+        self.assertEqual(self._drain(spool), [{"log_message": "complete"}, {"log_message": "after restart"}])
+
+    def test_recovery_after_kill_mid_write(self) -> None:
+        """Tests killing a process while it is appending leaves a spool whose records are an unbroken prefix of what
+        was written"""
+
+        with subprocess.Popen([sys.executable, "-c", SPOOL_WRITER, REPOSITORY_ROOT, self.directory.name], stdout=subprocess.PIPE, text=True) as writer:
+            assert writer.stdout is not None
+            self.assertEqual(writer.stdout.readline().strip(), "ready")
+            time.sleep(0.2)
+            writer.send_signal(signal.SIGKILL)
+            writer.wait()
+
+        spool = LogSpool(self.directory.name)
+        self.addCleanup(spool.close)
+        sequences = [record["sequence"] for record in self._drain(spool)]
+
+        self.assertGreater(len(sequences), 1)
+        self.assertEqual(sequences, list(range(len(sequences))))
+
+    @patch("logging_transport.HttpTransport.post")
+    def test_failed_send_is_spooled_and_replayed(self, mock_post: MagicMock) -> None:
+        """Tests send_log_to_api spools a record when the API is unreachable, and the shipper replays it after the next
+        success"""
+
+        birdbot_logger = BirdbotLoggerUtils(
+            logging_directory=self.directory.name,
+            logging_level=LoggingLevel.INFO,
+            enable_remote_logging=True,
+            remote_logging_rate_limit=0,
+            logging_api_url="http://test.com",
+            device_id="test_device_id",
+            config=LoggerConfig(spool=SpoolConfig(enabled=True)),
+        )
+        log_error = MagicMock()
+        log_notice = MagicMock()
+
+        mock_post.side_effect = requests.ConnectionError("offline")
+        birdbot_logger.send_log_to_api("while offline", LoggingLevel.ERROR, log_error, log_notice)
+        log_error.assert_called_once_with("Failed to send log to API, saved for later delivery", False)
+
+        mock_post.side_effect = None
+        mock_post.return_value.status_code = 200
+        birdbot_logger.send_log_to_api("back online", LoggingLevel.ERROR, log_error, log_notice)
+
+        spool = birdbot_logger.remote.spool
+        assert spool is not None
+        for _ in range(100):
+            if spool.size == 0:
+                break
+            time.sleep(0.01)
+        self.assertEqual(spool.size, 0)
+        replayed = mock_post.call_args.args[1]
+        self.assertEqual([record["log_message"] for record in replayed], ["while offline"])
+        birdbot_logger.shutdown()
+
+    @patch("logging_transport.HttpTransport.post")
+    def test_replay_does_not_hold_up_send(self, mock_post: MagicMock) -> None:
+        """Tests a record sent inline returns while the backlog it found is still being replayed"""
+
+        birdbot_logger = BirdbotLoggerUtils(
+            logging_directory=self.directory.name,
+            logging_level=LoggingLevel.INFO,
+            enable_remote_logging=True,
+            remote_logging_rate_limit=0,
+            logging_api_url="http://test.com",
+            device_id="test_device_id",
+            config=LoggerConfig(spool=SpoolConfig(enabled=True)),
+        )
+        self.addCleanup(birdbot_logger.shutdown)
+        spool = birdbot_logger.remote.spool
+        assert spool is not None
+        spool.append([{"log_message": "while offline"}])
+
+        replaying = threading.Event()
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def post(_url: str, data: Any) -> Mock:
+            if isinstance(data, list):
+                replaying.set()
+                release.wait(5)
+            return Mock(status_code=200)
+
+        mock_post.side_effect = post
+        birdbot_logger.send_log_to_api("back online", LoggingLevel.ERROR, MagicMock(), MagicMock())
+
+        self.assertTrue(replaying.wait(5))
+        self.assertGreater(spool.size, 0)
+        release.set()
@@ -0,0 +1,219 @@
+import os
+import sys
+import gzip
+import time
+import tempfile
+import unittest
+from datetime import datetime
+from typing import Dict, List, Tuple
+from unittest.mock import Mock
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from logging_utils.py
+
+from benchmarks.api_stand_in import ApiStandIn  # noqa: E402
+from log_upload import LogUploader, UploadJob  # noqa: E402
+from logging_transport import HttpTransport  # noqa: E402
+from logging_utils import BirdbotLoggerUtils  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import LoggerConfig, UploadConfig  # noqa: E402
+
+
+def reassemble(uploads: List[Tuple[Dict[str, str], bytes, bool]]) -> bytes:
+    """Puts a file back together from the chunks the stand-in accepted, as the API would"""
+
+    data = bytearray()
+    for headers, body, failed in uploads:
+        if failed:
+            continue
+        assert int(headers["X-Upload-Offset"]) == len(data), (headers, len(data))
+        assert int(headers["X-Upload-Length"]) == len(body)
+        data += body
+    return bytes(data)
+
+
+class Test(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.directory.cleanup)
+        self.api = ApiStandIn().start()
+        self.addCleanup(self.api.stop)
+        self.cursor_path = os.path.join(self.directory.name, "upload-cursor.json")
+
+    def make_uploader(self, **kwargs: float) -> LogUploader:
+        transport = HttpTransport(pool_size=1, timeout=5)
+        self.addCleanup(transport.close)
+        settings = {"chunk_bytes": 1024, "max_bytes_per_second": 10**9, **kwargs}
+        uploader = LogUploader(transport, self.api.url, "test_device_id", self.cursor_path, config=UploadConfig(**settings))  # type: ignore[arg-type]
+        self.addCleanup(uploader.close)
+        return uploader
+
+    def write_log(self, filename: str, size: int) -> str:
+        path = os.path.join(self.directory.name, filename)
+        with open(path, "wb") as log_file:
+            log_file.write(b"".join(b"%06d: INFO: frame processed\n" % index for index in range(size // 28 + 1))[:size])
+        return path
+
+    def test_resumes_after_failure(self) -> None:
+        """Tests an upload that fails partway resumes from the last chunk accepted, in a new uploader as after a restart,
+        without resending what was already accepted"""
+
+        path = self.write_log("19-08-23-birdbot.log", 5000)
+        self.api.inject(error_rate=0.5)
+        self.assertFalse(self.make_uploader().upload(UploadJob(path)))
+        self.assertEqual(self.api.request_count, 2)
+
+        self.api.inject(error_rate=0)
+        uploader = self.make_uploader()
+        self.assertEqual(uploader.resume(), 1)
+        self.assertTrue(uploader.wait(5))
+
+        with open(path, "rb") as log_file:
+            self.assertEqual(reassemble(self.api.uploads), log_file.read())
+        self.assertEqual([headers["X-Upload-Offset"] for headers, _, _ in self.api.uploads], ["0", "1024", "1024", "2048", "3072", "4096"])
+        headers = self.api.uploads[-1][0]
+        self.assertEqual((headers["X-Upload-Final"], headers["X-Upload-End"], headers["X-Log-File"]), ("1", "5000", "19-08-23-birdbot.log"))
+        self.assertEqual(uploader.bytes_uploaded, 5000 - 1024)
+        self.assertEqual(uploader.cursor.unfinished(), {})
+
+        # Appended to since, so uploading it again sends only the new bytes
+        with open(path, "ab") as log_file:
+            log_file.write(b"more\n")
+        uploader.submit(path)
+        self.assertTrue(uploader.wait(5))
+        self.assertEqual(self.api.uploads[-1][0]["X-Upload-Offset"], "5000")
+        self.assertEqual(self.api.uploads[-1][1], b"more\n")
+
+    def test_resumes_after_compression(self) -> None:
+        """Tests an unfinished upload whose file the housekeeper compressed before the restart goes on from the offset
+        reached, under the file's first name"""
+
+        path = self.write_log("19-08-23-birdbot.log", 5000)
+        self.api.inject(error_rate=0.5)
+        self.assertFalse(self.make_uploader().upload(UploadJob(path)))
+        with open(path, "rb") as log_file, gzip.open(path + ".gz", "wb") as compressed_file:
+            data = log_file.read()
+            compressed_file.write(data)
+        os.remove(path)
+
+        self.api.inject(error_rate=0)
+        uploader = self.make_uploader()
+        self.assertEqual(uploader.resume(), 1)
+        self.assertTrue(uploader.wait(5))
+
+        self.assertEqual(reassemble(self.api.uploads), data)
+        self.assertEqual([headers["X-Upload-Offset"] for headers, _, _ in self.api.uploads], ["0", "1024", "1024", "2048", "3072", "4096"])
+        self.assertEqual({headers["X-Log-File"] for headers, _, _ in self.api.uploads}, {"19-08-23-birdbot.log"})
+        self.assertEqual(uploader.cursor.unfinished(), {})
+
+    def test_range_and_compressed_file(self) -> None:
+        """Tests a byte range of a file is uploaded alone, and a compressed file is sent as it is"""
+
+        path = self.write_log("18-08-23-birdbot.log", 3000)
+        with open(path, "rb") as log_file:
+            data = log_file.read()
+        with gzip.open(path + ".gz", "wb") as compressed_file:
+            compressed_file.write(data)
+
+        uploader = self.make_uploader()
+        self.assertTrue(uploader.upload(UploadJob(path, 1000, 2500)))
+        self.assertEqual([headers["X-Upload-Offset"] for headers, _, _ in self.api.uploads], ["1000", "2024"])
+        self.assertEqual(b"".join(body for _, body, _ in self.api.uploads), data[1000:2500])
+
+        del self.api.uploads[:]
+        self.assertTrue(uploader.upload(UploadJob(path + ".gz")))
+        self.assertNotIn("Content-Encoding", self.api.uploads[0][0])
+        self.assertEqual(gzip.decompress(b"".join(body for _, body, _ in self.api.uploads)), data)
+
+    def test_bandwidth_cap(self) -> None:
+        """Tests chunks are paced to keep the request bodies under max_bytes_per_second"""
+
+        path = os.path.join(self.directory.name, "random.log")
+        with open(path, "wb") as log_file:
+            # Incompressible, so the bodies are as big as the chunks
+            log_file.write(os.urandom(8 * 1024))
+
+        uploader = self.make_uploader(max_bytes_per_second=32 * 1024)
+        start = time.monotonic()
+        self.assertTrue(uploader.upload(UploadJob(path)))
+        elapsed = time.monotonic() - start
+
+        # The first chunk goes at once and each of the other seven waits for the one before's share of the second
+        self.assertGreaterEqual(elapsed, 7 * uploader.bytes_sent / 8 / (32 * 1024) - 0.01)
+        self.assertEqual(self.api.request_count, 8)
+
+    def test_upload_log_file(self) -> None:
+        """Tests the logger uploads a day's file, and resumes an unfinished upload when it is next made"""
+
+        self.api.inject(error_rate=0.5)
+        utils = BirdbotLoggerUtils(
+            logging_directory=self.directory.name,
+            logging_level=LoggingLevel.INFO,
+            enable_remote_logging=True,
+            remote_logging_rate_limit=0,
+            logging_api_url=self.api.url,
+            device_id="test_device_id",
+            quiet=True,
+            config=LoggerConfig(upload=UploadConfig(url=self.api.url, chunk_bytes=1024)),
+        )
+        path = self.write_log("19-08-23-birdbot.log", 3000)
+        self.assertEqual(utils.upload_log_file(datetime(2023, 8, 19)), path)
+        deadline = time.monotonic() + 5
+        while self.api.request_count < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        utils.shutdown()
+        stats = utils.get_stats()["upload"]
+        self.assertEqual((stats["pending"], stats["bytes_uploaded"]), (1, 1024))
+        self.assertLess(stats["bytes_sent"], 1024)
+
+        self.api.inject(error_rate=0)
+        utils = BirdbotLoggerUtils(
+            logging_directory=self.directory.name,
+            logging_level=LoggingLevel.INFO,
+            enable_remote_logging=True,
+            remote_logging_rate_limit=0,
+            logging_api_url=self.api.url,
+            device_id="test_device_id",
+            quiet=True,
+        )
+        self.addCleanup(utils.shutdown)
+        assert utils.remote.uploader is not None
+        self.assertTrue(utils.remote.uploader.wait(5))
+
+        with open(path, "rb") as log_file:
+            self.assertEqual(reassemble(self.api.uploads), log_file.read())
+        with open(utils.log_file_path, encoding="utf-8") as log_file:
+            self.assertIn("NOTICE: Uploaded 19-08-23-birdbot.log up to offset 3000", log_file.read())
+        with open(self.cursor_path, encoding="utf-8") as cursor_file:
+            self.assertEqual(cursor_file.read(), "{}")
+
+    def test_no_upload_without_remote_logging(self) -> None:
+        """Tests a logger with remote logging disabled neither queues uploads nor resumes them, and that one with nothing
+        to resume doesn't make an uploader"""
+
+        path = self.write_log("19-08-23-birdbot.log", 3000)
+        self.make_uploader().cursor.save(UploadJob(path), os.stat(path).st_ino, 1024, 3000)
+        settings = {
+            "logging_directory": self.directory.name,
+            "logging_level": LoggingLevel.INFO,
+            "remote_logging_rate_limit": 0,
+            "logging_api_url": self.api.url,
+            "device_id": "test_device_id",
+            "quiet": True,
+        }
+
+        utils = BirdbotLoggerUtils(enable_remote_logging=False, **settings)  # type: ignore[arg-type]
+        self.addCleanup(utils.shutdown)
+        self.assertIsNone(utils.upload_log_file(datetime(2023, 8, 19)))
+        self.assertIsNone(utils.remote.uploader)
+
+        os.remove(path)
+        utils = BirdbotLoggerUtils(enable_remote_logging=True, **settings)  # type: ignore[arg-type]
+        self.addCleanup(utils.shutdown)
+        self.assertIsNone(utils.remote.uploader)
+        self.assertEqual(self.api.request_count, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import sys
+import json
+import tempfile
+import threading
+import unittest
+from typing import Any
+from unittest.mock import patch, MagicMock, Mock
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from logging_utils.py
+
+from logger_stats import LatencyHistogram, LoggerStats  # noqa: E402
+from logging_utils import BirdbotLoggerUtils  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+from logger_config import LoggerConfig, StatsConfig  # noqa: E402
+
+
+class Test(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(self.directory.cleanup)
+
+    def make_logger(self, **kwargs: Any) -> BirdbotLoggerUtils:
+        birdbot_logger = BirdbotLoggerUtils(
+            logging_directory=self.directory.name,
+            logging_level=LoggingLevel.INFO,
+            enable_remote_logging=True,
+            remote_logging_rate_limit=0,
+            logging_api_url="http://test.com",
+            device_id="test_device_id",
+            **kwargs,
+        )
+        self.addCleanup(birdbot_logger.shutdown)
+        return birdbot_logger
+
+    def test_counters_summed_over_threads(self) -> None:
+        """Tests counts made on several threads, each with its own counters, are all included"""
+
+        stats = LoggerStats(["records", "bytes"])
+
+        def count() -> None:
+            for _ in range(10000):
+                stats.increment(0)
+
+        threads = [threading.Thread(target=count) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats.increment(1, 5)
+
+        self.assertEqual(stats.counters(), {"records": 80000, "bytes": 5})
+
+    def test_histogram(self) -> None:
+        """Tests durations land in the right buckets and percentiles come from the bucket bounds"""
+
+        histogram = LatencyHistogram()
+        for _ in range(98):
+            histogram.observe(0.003)
+        histogram.observe(0.150)
+        histogram.observe(30)
+
+        snapshot = histogram.snapshot()
+
+        self.assertEqual(snapshot["count"], 100)
+        self.assertEqual((snapshot["p50_ms"], snapshot["p90_ms"], snapshot["p99_ms"]), (5.0, 5.0, 200.0))
+        self.assertEqual(snapshot["max_ms"], 30000.0)
+        self.assertEqual(snapshot["buckets"]["<=5"], 98)
+        self.assertEqual(snapshot["buckets"][">10000"], 1)
+
+    @patch("logging_transport.HttpTransport.post")
+    def test_get_stats(self, mock_requests: MagicMock) -> None:
+        """Tests records, sinks, bytes written, API outcomes and rate limiting are all reported"""
+
+        birdbot_logger = self.make_logger(quiet=True, config=LoggerConfig(rate_limit_budgets={LoggingLevel.WARNING: (1, 0.001)}))
+        for level in (LoggingLevel.INFO, LoggingLevel.INFO, LoggingLevel.ERROR):
+            record = birdbot_logger.make_record("test", level)
+            birdbot_logger.write_record_to_console(record)
+            birdbot_logger.write_record_to_file(record)
+
+        mock_requests.return_value.status_code = 200
+        birdbot_logger.send_log_to_api("sent", LoggingLevel.ERROR, MagicMock(), MagicMock())
+        mock_requests.return_value.status_code = 500
+        birdbot_logger.send_log_to_api("failed", LoggingLevel.WARNING, MagicMock(), MagicMock())
+        birdbot_logger.send_log_to_api("rate limited", LoggingLevel.WARNING, MagicMock(), MagicMock())
+
+        stats = birdbot_logger.get_stats()
+
+        self.assertEqual(stats["records"], {"DEBUG": 0, "INFO": 2, "NOTICE": 0, "WARNING": 0, "ERROR": 1})
+        self.assertEqual(stats["sinks"], {"console": 0, "file": 3, "error_file": 0, "api": 2})
+        self.assertEqual(stats["file"]["bytes_written"], os.path.getsize(birdbot_logger.log_file_path))
+        self.assertEqual((stats["api"]["sent"], stats["api"]["failures"], stats["api"]["rate_limited"]), (1, 1, 1))
+        self.assertEqual(stats["api"]["latency"]["count"], 2)
+        json.dumps(stats)
+
+    def test_periodic_stats_record(self) -> None:
+        """Tests a stats record is written to the log file every stats_interval"""
+
+        birdbot_logger = self.make_logger(quiet=True, config=LoggerConfig(stats=StatsConfig(interval=0.05)))
+        birdbot_logger.write_record_to_file(birdbot_logger.make_record("test", LoggingLevel.INFO))
+        threading.Event().wait(0.2)
+        birdbot_logger.shutdown()
+
+        with open(birdbot_logger.log_file_path, encoding="utf-8") as log_file:
+            stats_lines = [line for line in log_file if ": INFO: Logger stats: " in line]
+        self.assertGreater(len(stats_lines), 1)
+        self.assertEqual(json.loads(stats_lines[0].split("Logger stats: ", 1)[1])["records"]["INFO"], 1)
+
+    def test_stats_disabled(self) -> None:
+        """Tests get_stats still works without counters"""
+
+        birdbot_logger = self.make_logger(config=LoggerConfig(stats=StatsConfig(collect=False)))
+        birdbot_logger.write_record_to_file(birdbot_logger.make_record("test", LoggingLevel.INFO))
+
+        self.assertEqual(birdbot_logger.get_stats()["records"]["INFO"], 0)
@@ -10,11 +10,12 @@ os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from loggin
 
 from logging_utils import BirdbotLoggerUtils, COLOUR_GREEN, COLOUR_YELLOW, COLOUR_RESET, COLOUR_RED  # noqa: E402
 from logging_level import LoggingLevel  # noqa: E402
+from logger_config import ConsoleConfig, LoggerConfig  # noqa: E402
 
 
 class Test(unittest.TestCase):
     @freeze_time("2023-08-19 00:00:00")
-    @patch("requests.post")
+    @patch("logging_transport.HttpTransport.post")
     def test_send_log_to_api_normal_conditions(self, mock_requests: MagicMock) -> None:
         """Tests send_log_to_api under normal conditions"""
 
@@ -38,20 +39,19 @@ class Test(unittest.TestCase):
         # Check results
         mock_requests.assert_called_once_with(
             "http://test.com",
-            json={
+            {
                 "device_id": "test_device_id",
                 "log_timestamp": 1692403200000,
                 "log_message": "test",
                 "log_level": "ERROR",
             },
-            timeout=10,
         )
         log_error.assert_not_called()
         log_notice.assert_called_once_with("Successfully sent log to API")
         self.assertEqual(birdbot_logger.last_log_message_sent_ts, 1692403200000)
 
     @freeze_time("2023-08-19 00:00:00")
-    @patch("requests.post")
+    @patch("logging_transport.HttpTransport.post")
     def test_send_log_to_api_failed_call(self, mock_requests: MagicMock) -> None:
         """Tests send_log_to_api when the call fails."""
 
@@ -76,19 +76,18 @@ class Test(unittest.TestCase):
         # Check results
         mock_requests.assert_called_once_with(
             "http://test.com",
-            json={
+            {
                 "device_id": "test_device_id",
                 "log_timestamp": 1692403200000,
                 "log_message": "test",
                 "log_level": "ERROR",
             },
-            timeout=10,
         )
         log_error.assert_called_once_with("Failed to send log to API: 404 - Not found", False)
         log_notice.assert_not_called()
         self.assertEqual(birdbot_logger.last_log_message_sent_ts, 1692403200000)
 
-    @patch("requests.post")
+    @patch("logging_transport.HttpTransport.post")
     def test_send_log_to_api_hitting_rate_limit(self, mock_requests: MagicMock) -> None:
         """Tests send_log_to_api when the call fails."""
 
@@ -114,13 +113,12 @@ class Test(unittest.TestCase):
             # Check results
             mock_requests.assert_called_once_with(
                 "http://test.com",
-                json={
+                {
                     "device_id": "test_device_id",
                     "log_timestamp": 1692403200000,
                     "log_message": "test",
                     "log_level": "ERROR",
                 },
-                timeout=10,
             )
             log_error.assert_not_called()
             log_notice.assert_called_once_with("Successfully sent log to API")
@@ -134,13 +132,14 @@ class Test(unittest.TestCase):
             # Run test
             birdbot_logger.send_log_to_api("test", LoggingLevel.ERROR, log_error, log_notice)
 
-            # Check results
+            # Check results. Suppressed records are counted, not logged
             mock_requests.assert_not_called()
-            log_error.assert_called_once_with("Rate limit reached for remote logging", False)
+            log_error.assert_not_called()
             log_notice.assert_not_called()
             self.assertEqual(birdbot_logger.last_log_message_sent_ts, 1692403200000)
+            self.assertEqual(birdbot_logger.remote.rate_limiter.suppressed_counts[LoggingLevel.ERROR], 1)
 
-    @patch("requests.post")
+    @patch("logging_transport.HttpTransport.post")
     def test_send_log_to_api_rate_limit_ok(self, mock_requests: MagicMock) -> None:
         """Tests send_log_to_api with multiple calls, but not hitting the rate limit."""
 
@@ -166,13 +165,12 @@ class Test(unittest.TestCase):
             # Check results
             mock_requests.assert_called_once_with(
                 "http://test.com",
-                json={
+                {
                     "device_id": "test_device_id",
                     "log_timestamp": 1692403200000,
                     "log_message": "test",
                     "log_level": "ERROR",
                 },
-                timeout=10,
             )
             log_error.assert_not_called()
             log_notice.assert_called_once_with("Successfully sent log to API")
@@ -191,18 +189,102 @@ class Test(unittest.TestCase):
             # Check results
             mock_requests.assert_called_once_with(
                 "http://test.com",
-                json={
+                {
                     "device_id": "test_device_id",
                     "log_timestamp": 1692406800000,
                     "log_message": "test",
                     "log_level": "ERROR",
                 },
-                timeout=10,
             )
             log_error.assert_not_called()
             log_notice.assert_called_once_with("Successfully sent log to API")
             self.assertEqual(birdbot_logger.last_log_message_sent_ts, 1692406800000)
 
+    @patch("logging_transport.HttpTransport.post")
+    def test_send_log_to_api_summary_after_rate_limit(self, mock_requests: MagicMock) -> None:
+        """Tests records suppressed by the rate limit are reported in one summary once budget returns."""
+
+        birdbot_logger = BirdbotLoggerUtils(
+            logging_directory="logs",
+            logging_level=LoggingLevel.INFO,
+            enable_remote_logging=True,
+            remote_logging_rate_limit=5000,  # 5 seconds
+            logging_api_url="http://test.com",
+            device_id="test_device_id",
+        )
+        log_error = MagicMock()
+        log_notice = MagicMock()
+        mock_requests.return_value.status_code = 200
+
+        with freeze_time("2023-08-19 00:00:00"):
+            for _ in range(4):
+                birdbot_logger.send_log_to_api("test", LoggingLevel.ERROR, log_error, log_notice)
+        self.assertEqual(mock_requests.call_count, 1)
+
+        with freeze_time("2023-08-19 00:01:00"):
+            mock_requests.reset_mock()
+            birdbot_logger.send_log_to_api("test", LoggingLevel.ERROR, log_error, log_notice)
+
+        self.assertEqual([call.args[1]["log_message"] for call in mock_requests.call_args_list], ["3 ERROR records suppressed in last 60s", "test"])
+        self.assertEqual(birdbot_logger.remote.rate_limiter.suppressed_counts[LoggingLevel.ERROR], 0)
+        log_error.assert_not_called()
+
+    @patch("logging_transport.HttpTransport.post")
+    def test_rate_limit_summary_sent_by_flush(self, mock_requests: MagicMock) -> None:
+        """Tests records suppressed by the rate limit are still reported when no later record comes to carry the summary."""
+
+        birdbot_logger = BirdbotLoggerUtils(
+            logging_directory="logs",
+            logging_level=LoggingLevel.INFO,
+            enable_remote_logging=True,
+            remote_logging_rate_limit=0,
+            logging_api_url="http://test.com",
+            device_id="test_device_id",
+            config=LoggerConfig(rate_limit_budgets={LoggingLevel.WARNING: (1, 0.001)}),
+        )
+        mock_requests.return_value.status_code = 200
+
+        for _ in range(3):
+            birdbot_logger.send_log_to_api("storm", LoggingLevel.WARNING, MagicMock(), MagicMock())
+        self.assertEqual(mock_requests.call_count, 1)
+
+        mock_requests.reset_mock()
+        birdbot_logger.flush()
+        self.assertEqual(
+            [(call.args[1]["log_level"], call.args[1]["log_message"]) for call in mock_requests.call_args_list],
+            [("WARNING", "2 WARNING records suppressed in last 0s")],
+        )
+
+        # Nothing was suppressed since
+        mock_requests.reset_mock()
+        birdbot_logger.shutdown()
+        mock_requests.assert_not_called()
+
+    @patch("logging_transport.HttpTransport.post")
+    def test_send_log_to_api_per_level_budgets(self, mock_requests: MagicMock) -> None:
+        """Tests each level is limited by its own budget, and levels without one are not limited."""
+
+        birdbot_logger = BirdbotLoggerUtils(
+            logging_directory="logs",
+            logging_level=LoggingLevel.INFO,
+            enable_remote_logging=True,
+            remote_logging_rate_limit=0,
+            logging_api_url="http://test.com",
+            device_id="test_device_id",
+            config=LoggerConfig(rate_limit_budgets={LoggingLevel.WARNING: (2, 0.1)}),
+        )
+        mock_requests.return_value.status_code = 200
+
+        with freeze_time("2023-08-19 00:00:00"):
+            for _ in range(5):
+                birdbot_logger.send_log_to_api("test", LoggingLevel.WARNING, MagicMock(), MagicMock())
+                birdbot_logger.send_log_to_api("test", LoggingLevel.ERROR, MagicMock(), MagicMock())
+
+        sent_levels = [call.args[1]["log_level"] for call in mock_requests.call_args_list]
+        self.assertEqual(sent_levels.count("WARNING"), 2)
+        self.assertEqual(sent_levels.count("ERROR"), 5)
+        self.assertEqual(birdbot_logger.remote.rate_limiter.suppressed_counts[LoggingLevel.WARNING], 3)
+
     @freeze_time("2023-08-19 00:00:00")
     @patch("builtins.print")
     def test_write_to_console_level_debug_message_info(self, mock_print: MagicMock) -> None:
@@ -285,6 +367,7 @@ class Test(unittest.TestCase):
             remote_logging_rate_limit=100,
             logging_api_url="",
             device_id="test_device_id",
+            config=LoggerConfig(console=ConsoleConfig(colour=True)),
         )
         birdbot_logger.write_to_console("test", LoggingLevel.NOTICE)
         mock_print.assert_called_once_with(f"19-08-2023 00:00:00: NOTICE: {COLOUR_GREEN}test{COLOUR_RESET}")
@@ -303,6 +386,7 @@ class Test(unittest.TestCase):
             remote_logging_rate_limit=100,
             logging_api_url="",
             device_id="test_device_id",
+            config=LoggerConfig(console=ConsoleConfig(colour=True)),
         )
         birdbot_logger.write_to_console("test", LoggingLevel.WARNING)
         mock_print.assert_called_once_with(f"19-08-2023 00:00:00: WARNING: {COLOUR_YELLOW}test{COLOUR_RESET}")
@@ -321,6 +405,7 @@ class Test(unittest.TestCase):
             remote_logging_rate_limit=100,
             logging_api_url="",
             device_id="test_device_id",
+            config=LoggerConfig(console=ConsoleConfig(colour=True)),
         )
         birdbot_logger.write_to_console("test", LoggingLevel.ERROR)
         mock_print.assert_called_once_with(f"19-08-2023 00:00:00: ERROR: {COLOUR_RED}test{COLOUR_RESET}")
@@ -355,6 +440,7 @@ class Test(unittest.TestCase):
             remote_logging_rate_limit=100,
             logging_api_url="",
             device_id="test_device_id",
+            config=LoggerConfig(console=ConsoleConfig(colour=True)),
         )
         birdbot_logger.write_to_console("test", LoggingLevel.WARNING)
         mock_print.assert_called_once_with(f"19-08-2023 00:00:00: WARNING: {COLOUR_YELLOW}test{COLOUR_RESET}")
@@ -389,6 +475,7 @@ class Test(unittest.TestCase):
             remote_logging_rate_limit=100,
             logging_api_url="",
             device_id="test_device_id",
+            config=LoggerConfig(console=ConsoleConfig(colour=True)),
         )
         birdbot_logger.write_to_console("test", LoggingLevel.ERROR)
         mock_print.assert_called_once_with(f"19-08-2023 00:00:00: ERROR: {COLOUR_RED}test{COLOUR_RESET}")
@@ -423,6 +510,7 @@ class Test(unittest.TestCase):
             remote_logging_rate_limit=100,
             logging_api_url="",
             device_id="test_device_id",
+            config=LoggerConfig(console=ConsoleConfig(colour=True)),
         )
         birdbot_logger.write_to_console("test", LoggingLevel.ERROR)
         mock_print.assert_called_once_with(f"19-08-2023 00:00:00: ERROR: {COLOUR_RED}test{COLOUR_RESET}")
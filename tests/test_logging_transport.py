@@ -0,0 +1,65 @@
+import os
+import unittest
+
+import requests
+
+os.environ["STANDALONE"] = "True"
+
+from benchmarks.api_stand_in import ApiStandIn  # noqa: E402
+from logging_transport import HttpTransport  # noqa: E402
+
+
+class Test(unittest.TestCase):
+    def test_connections_are_reused(self) -> None:
+        """Tests several posts share one kept-alive connection"""
+
+        transport = HttpTransport()
+        with ApiStandIn() as api:
+            for index in range(5):
+                result = transport.post(api.url, {"log_message": index})
+                self.assertEqual(result.status_code, 200)
+            transport.close()
+
+            self.assertEqual(api.connection_count, 1)
+            self.assertEqual(api.received, [{"log_message": index} for index in range(5)])
+
+    def test_large_payload_is_compressed(self) -> None:
+        """Tests payloads over the threshold are gzipped, and that bytes on the wire are counted"""
+
+        payload = [{"log_message": "Classifier failed to load model"} for _ in range(100)]
+        transport = HttpTransport(compress_threshold=1024)
+        with ApiStandIn() as api:
+            transport.post(api.url, payload)
+            transport.close()
+
+            self.assertEqual(api.received, [payload])
+
+        self.assertEqual(transport.requests_sent, 1)
+        self.assertLess(transport.bytes_sent, transport.bytes_uncompressed)
+
+    def test_small_payload_is_not_compressed(self) -> None:
+        """Tests payloads under the threshold are sent as plain JSON"""
+
+        transport = HttpTransport(compress_threshold=1024)
+        with ApiStandIn() as api:
+            transport.post(api.url, {"log_message": "test"})
+            transport.close()
+
+        self.assertEqual(transport.bytes_sent, transport.bytes_uncompressed)
+        self.assertEqual(transport.bytes_sent, len(b'{"log_message": "test"}'))
+
+    def test_stand_in_injects_errors_and_timeouts(self) -> None:
+        """Tests the stand-in fails the requested share of requests, and can hang until the client times out"""
+
+        transport = HttpTransport(timeout=0.05)
+        with ApiStandIn(error_rate=0.5) as api:
+            status_codes = [transport.post(api.url, {"log_message": index}).status_code for index in range(4)]
+            self.assertEqual(status_codes, [200, 500, 200, 500])
+
+            api.inject(error_rate=0, hang=0.2)
+            with self.assertRaises(requests.exceptions.RequestException):
+                transport.post(api.url, {"log_message": "hung"})
+
+            api.inject(hang=0)
+            self.assertEqual(transport.post(api.url, {"log_message": "recovered"}).status_code, 200)
+            transport.close()
@@ -0,0 +1,175 @@
+import os
+import logging
+import sys
+import tempfile
+import threading
+import unittest
+from collections import Counter
+from typing import List
+from unittest.mock import Mock
+from freezegun import freeze_time
+
+# Mock config file
+sys.modules["config"] = Mock()
+os.environ["STANDALONE"] = "True"  # Used to import logging_level.py from logging_utils.py
+
+from thread_buffers import ThreadBuffers  # noqa: E402
+from logging_utils import BirdbotLoggerUtils  # noqa: E402
+from logging_level import LoggingLevel  # noqa: E402
+
+
+class Test(unittest.TestCase):
+    def test_drain_order_and_ended_threads(self) -> None:
+        """Tests items staged by several threads drain in the order they were appended, and the buffers of threads that
+        have ended are forgotten once empty"""
+
+        buffers: ThreadBuffers[str] = ThreadBuffers()
+
+        def stage(name: str) -> None:
+            for index in range(2):
+                buffers.append(f"{name} {index}")
+
+        buffers.append("main 0")
+        for name in ("a", "b"):
+            thread = threading.Thread(target=stage, args=(name,))
+            thread.start()
+            thread.join()
+        buffers.append("main 1")
+
+        self.assertTrue(buffers.pending)
+        self.assertEqual(buffers.drain(), ["main 0", "a 0", "a 1", "b 0", "b 1", "main 1"])
+        self.assertFalse(buffers.pending)
+        self.assertEqual(buffers.drain(), [])
+        self.assertEqual(len(buffers._buffers), 1)  # pylint: disable=protected-access
+
+    def test_combine_never_waits(self) -> None:
+        """Tests a thread that finds the lock taken returns with its item staged, and the holder writes it"""
+
+        buffers: ThreadBuffers[str] = ThreadBuffers()
+        lock = threading.RLock()
+        written: List[List[str]] = []
+
+        with lock:
+            thread = threading.Thread(target=buffers.combine, args=("other", lock, written.append))
+            thread.start()
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+            self.assertEqual(written, [])
+
+        buffers.combine("mine", lock, written.append)
+        self.assertEqual(written, [["other", "mine"]])
+
+    def test_threads_logging_to_file(self) -> None:
+        """Tests every record logged from 16 threads at once is in the file exactly once and whole"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            utils = BirdbotLoggerUtils(
+                logging_directory=directory,
+                logging_level=LoggingLevel.INFO,
+                enable_remote_logging=False,
+                remote_logging_rate_limit=0,
+                logging_api_url="",
+                device_id="test_device_id",
+                quiet=True,
+            )
+            self.addCleanup(utils.shutdown)
+
+            def worker(index: int) -> None:
+                for record in range(200):
+                    utils.log_locally(f"worker {index} record {record}", LoggingLevel.INFO)
+
+            workers = [threading.Thread(target=worker, args=(index,)) for index in range(16)]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+
+            with open(utils.log_file_path, encoding="utf-8") as log_file:
+                lines = Counter(line.split(": INFO: ", 1)[1] for line in log_file.read().splitlines())
+
+        self.assertEqual(lines, Counter(f"worker {index} record {record}" for index in range(16) for record in range(200)))
+        self.assertEqual(utils.get_stats()["sinks"]["file"], 16 * 200)
+
+    def test_staged_records_written_by_flush_and_shutdown(self) -> None:
+        """Tests records staged while something other than a write held the handler's lock are written by flush() and
+        shutdown(), rather than left for a write that may never come"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            utils = BirdbotLoggerUtils(
+                logging_directory=directory,
+                logging_level=LoggingLevel.INFO,
+                enable_remote_logging=False,
+                remote_logging_rate_limit=0,
+                logging_api_url="",
+                device_id="test_device_id",
+                quiet=True,
+            )
+            handler = utils.file_handler
+            assert handler is not None
+
+            def hold_lock(holding: threading.Event, release: threading.Event) -> None:
+                with handler.lock:  # type: ignore[union-attr]
+                    holding.set()
+                    release.wait(5)
+
+            for action in (utils.flush, utils.shutdown):
+                holding, release = threading.Event(), threading.Event()
+                holder = threading.Thread(target=hold_lock, args=(holding, release))
+                holder.start()
+                holding.wait(5)
+                utils.log_locally(f"staged before {action.__name__}", LoggingLevel.INFO)
+                release.set()
+                holder.join()
+
+                action()
+                with open(utils.log_file_path, encoding="utf-8") as log_file:
+                    self.assertIn(f"INFO: staged before {action.__name__}", log_file.read())
+            handler.close()
+
+    def test_records_reach_other_handlers(self) -> None:
+        """Tests records written straight to the file still reach handlers users attach to the logger, and those on the
+        root logger it propagates to, without being written to the file twice"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            utils = BirdbotLoggerUtils(
+                logging_directory=directory,
+                logging_level=LoggingLevel.INFO,
+                enable_remote_logging=False,
+                remote_logging_rate_limit=0,
+                logging_api_url="",
+                device_id="test_device_id",
+                quiet=True,
+            )
+            self.addCleanup(utils.shutdown)
+            attached, propagated = Mock(level=logging.NOTSET), Mock(level=logging.NOTSET)
+            utils.birdbot_logger.addHandler(attached)
+            self.addCleanup(utils.birdbot_logger.removeHandler, attached)
+            logging.getLogger().addHandler(propagated)
+            self.addCleanup(logging.getLogger().removeHandler, propagated)
+
+            utils.log_locally("battery low", LoggingLevel.WARNING)
+            with open(utils.log_file_path, encoding="utf-8") as log_file:
+                text = log_file.read()
+
+        for handler in (attached, propagated):
+            log_record = handler.handle.call_args.args[0]
+            self.assertEqual((log_record.levelno, log_record.name), (logging.WARNING, "birdbot_logger"))
+            self.assertTrue(log_record.getMessage().endswith(": WARNING: battery low"))
+        self.assertEqual(text.count("battery low"), 1)
+
+    def test_last_sent_only_moves_forward(self) -> None:
+        """Tests a send finishing after a later one doesn't move the last sent timestamp back"""
+
+        utils = BirdbotLoggerUtils(
+            logging_directory="", logging_level=LoggingLevel.INFO, enable_remote_logging=False, remote_logging_rate_limit=0, logging_api_url="", device_id=""
+        )
+        self.addCleanup(utils.shutdown)
+        with freeze_time("2023-08-19 00:00:01"):
+            utils.remote.api.mark_sent()
+        with freeze_time("2023-08-19 00:00:00"):
+            utils.remote.api.mark_sent()
+        self.assertEqual(utils.last_log_message_sent_ts, 1692403201000)
+
+
+if __name__ == "__main__":
+    unittest.main()
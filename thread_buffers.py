@@ -0,0 +1,87 @@
+"""Per-thread staging buffers, so threads logging at once don't queue up behind each other's I/O. Each thread appends
+to its own buffer without taking a lock, and a single consumer drains them all, in the order the items were appended
+across threads. With combine, the consumer is whichever thread finds the write lock free: a thread that finds it taken
+leaves its item staged and returns, and the thread holding the lock writes it before letting go."""
+
+import heapq
+import itertools
+import threading
+from collections import deque
+from typing import Callable, Deque, Generic, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class ThreadBuffers(Generic[T]):
+    """Items staged by each thread, drained in the order they were appended"""
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        # Shared by every thread. next() on it is atomic, so items are numbered in the order they were appended
+        self._sequence = itertools.count()
+        self._buffers: List[Tuple[threading.Thread, Deque[Tuple[int, T]]]] = []
+        # The same buffers, without their threads, as checking them is on the hot path
+        self._deques: List[Deque[Tuple[int, T]]] = []
+        # Only taken when a thread appends for the first time, and to forget the buffers of threads that have ended
+        self._register_lock = threading.Lock()
+
+    def append(self, item: T) -> None:
+        try:
+            buffer: Deque[Tuple[int, T]] = self._local.buffer
+        except AttributeError:
+            buffer = self._register()
+        buffer.append((next(self._sequence), item))
+
+    def _register(self) -> Deque[Tuple[int, T]]:
+        buffer: Deque[Tuple[int, T]] = deque()
+        self._local.buffer = buffer
+        with self._register_lock:
+            self._buffers.append((threading.current_thread(), buffer))
+            self._deques.append(buffer)
+        return buffer
+
+    @property
+    def pending(self) -> bool:
+        return any(self._deques)
+
+    def drain(self) -> List[T]:
+        """Takes everything staged so far. Only one thread may drain at a time"""
+
+        batches = []
+        ended = False
+        for thread, buffer in list(self._buffers):
+            # Appends may carry on meanwhile, and are left for the next drain
+            taken = [buffer.popleft() for _ in range(len(buffer))]
+            if taken:
+                batches.append(taken)
+            elif not thread.is_alive():
+                ended = True
+        if ended:
+            with self._register_lock:
+                self._buffers = [(thread, buffer) for thread, buffer in self._buffers if buffer or thread.is_alive()]
+                self._deques = [buffer for _, buffer in self._buffers]
+
+        if len(batches) == 1:
+            return [item for _, item in batches[0]]
+        # Each thread's items are already in order, and sequence numbers are unique, so items are never compared
+        return [item for _, item in heapq.merge(*batches)]
+
+    def combine(self, item: T, lock: "threading.RLock", write: Callable[[List[T]], None]) -> None:
+        """Writes item, after anything other threads have staged, with lock held. If another thread holds lock, item is
+        staged instead, and that thread is bound to see it once it has written its own batch, and write it too. Either
+        way lock is never waited on"""
+
+        if lock.acquire(blocking=False):
+            # Uncontended, the item is written straight away, after anything other threads left
+            try:
+                write(self.drain() + [item] if any(self._deques) else [item])
+            finally:
+                lock.release()
+        else:
+            self.append(item)
+
+        while any(self._deques) and lock.acquire(blocking=False):
+            try:
+                write(self.drain())
+            finally:
+                lock.release()